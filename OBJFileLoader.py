@@ -1,22 +1,24 @@
-import os, pygame
+import os, io, ctypes, pygame
+from operator import itemgetter
+import numpy as np
 from OpenGL.GL import *
 
+from textures import texture_manager
+from glstate import render_state
+from simplify import load_lods
+
+TEXTURE_DIR = "./resources/textures/"
+
+# Texture id for an image file; decoded and uploaded once per process
 def load_texture(image_path):
-    surf = pygame.image.load(image_path)
-    image = pygame.image.tobytes(surf, 'RGBA', 1)
-    width, height = surf.get_rect().size
-    texid = glGenTextures(1)
-    glBindTexture(GL_TEXTURE_2D, texid)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
-    glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
-    glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA,
-                 GL_UNSIGNED_BYTE, image)
-    return texid
+    return texture_manager.load(image_path)
 
-def MTL(filename):
+TEXTURE_KEYS = ('map_Kd', 'map_Bump', 'map_Ks', 'map_Ke', 'map_Ka', 'map_d', 'refl')
+
+# Parse a material library without touching OpenGL; texture maps stay file names
+def parse_mtl(filename):
     contents = {}
     mtl = None
-    texture_keys = {'map_Kd', 'map_Bump', 'map_Ks', 'map_Ke', 'map_Ka', 'map_d', 'refl'}
 
     for line in open(filename, "r"):
         line = line.strip()
@@ -29,15 +31,9 @@ def MTL(filename):
             mtl = contents[values[1]] = {}
         elif mtl is None:
             raise ValueError("MTL file doesn't start with newmtl statement.")
-        elif key in texture_keys:
+        elif key in TEXTURE_KEYS:
             tex_filename = ' '.join(values[1:]).replace('\\', '/')
             mtl[key] = tex_filename  # store the path
-            tex_path = os.path.join("./resources/textures/", tex_filename)
-            try:
-                mtl[f'texture_{key}'] = load_texture(tex_path)
-            except pygame.error as e:
-                print(f"Failed to load texture for {key}: {tex_path} ({e})")
-                mtl[f'texture_{key}'] = None
         else:
             # Try to parse as floats, fallback to raw string if fails
             try:
@@ -46,15 +42,139 @@ def MTL(filename):
                 mtl[key] = values[1:] if len(values) > 1 else values[1]
     return contents
 
+# Image files referenced by parsed materials
+def texture_paths(materials):
+    return [os.path.join(TEXTURE_DIR, mtl[key]) for mtl in materials.values()
+            for key in TEXTURE_KEYS if key in mtl]
+
+# Upload the textures of parsed materials, storing their ids as texture_<key>
+def load_material_textures(materials):
+    # Decode every referenced image in parallel, then upload them here (GL thread)
+    textures = [(mtl, key) for mtl in materials.values() for key in TEXTURE_KEYS if key in mtl]
+    texture_manager.prefetch(texture_paths(materials))
+    for mtl, key in textures:
+        tex_path = os.path.join(TEXTURE_DIR, mtl[key])
+        try:
+            mtl[f'texture_{key}'] = load_texture(tex_path)
+        except (pygame.error, FileNotFoundError) as e:
+            print(f"Failed to load texture for {key}: {tex_path} ({e})")
+            mtl[f'texture_{key}'] = None
+    return materials
+
+def MTL(filename):
+    return load_material_textures(parse_mtl(filename))
+
+# Release the textures referenced by materials returned from MTL()
+def delete_textures(materials):
+    for mtl in materials.values():
+        for key, value in mtl.items():
+            if key.startswith('texture_') and value:
+                texture_manager.release(value)
+
+# Interleaved vertex layout used by the VBO renderer: position, normal, texcoord
+VERTEX_FLOATS = 8
+VERTEX_STRIDE = VERTEX_FLOATS * 4
+NORMAL_OFFSET = 3 * 4
+TEXCOORD_OFFSET = 6 * 4
+
+# 1-based OBJ index, with negative indices counted back from the last of `count`
+def _absolute(index, count):
+    return index + count + 1 if index < 0 else index
+
+# Parse the first `width` numbers of the selected "v"/"vn"/"vt" lines in one go
+def _parse_floats(lines, selected, prefix, width):
+    if not len(selected):
+        return np.zeros((0, width), dtype=np.float32)
+    text = b'\n'.join([lines[i] for i in selected])
+    # Numbers per line, to split the values evenly
+    buf = np.frombuffer(text, dtype=np.uint8)
+    blank = np.ones(len(buf) + 1, dtype=bool)
+    blank[1:] = (buf == ord(' ')) | (buf == ord('\t')) | (buf == ord('\r')) | (buf == ord('\n'))
+    word_starts = np.flatnonzero(blank[:-1] & ~blank[1:])
+    line_of_word = np.searchsorted(np.flatnonzero(buf == ord('\n')), word_starts)
+    counts = np.bincount(line_of_word, minlength=len(selected)) - 1
+    if counts.min() == counts.max() >= width:
+        values = np.loadtxt(io.BytesIO(text.replace(prefix, b' ').replace(b'\r', b' ')),
+                            dtype=np.float64, ndmin=2)
+        return values[:, :width].astype(np.float32)
+    # Uneven records (e.g. an optional w on some lines)
+    return np.array([lines[i].split()[1:width + 1] for i in selected], dtype=np.float64).astype(np.float32)
+
+# Parse the selected face lines in one go: empty fields ("v//vn") become 0,
+#   all indices are read as one run of integers, and the bytes are only
+#   scanned to see where each corner starts (a number not preceded by '/')
+#   and which face (line) it is on.
+#   Returns ((corners, 3) int32 v/vt/vn ids, 1-based, 0: none; face sizes)
+def _parse_faces(lines, selected, before):
+    if not len(selected):
+        return np.zeros((0, 3), dtype=np.int32), np.zeros(0, dtype=np.int32)
+    data = b'\n'.join(itemgetter(*selected)(lines) if len(selected) > 1 else [lines[selected[0]]])
+    data = data.replace(b'f', b' ').replace(b'//', b'/0/') + b'\n'
+    # Read as one row, as faces differ in size; a malformed number raises
+    #   ValueError instead of silently ending the run
+    values = np.loadtxt(io.BytesIO(data.replace(b'/', b' ').replace(b'\n', b' ').replace(b'\r', b' ')),
+                        dtype=np.int64, ndmin=1)
+
+    buf = np.frombuffer(data, dtype=np.uint8)
+    number = np.zeros(len(buf) + 1, dtype=bool)
+    number[1:] = ((buf >= ord('0')) & (buf <= ord('9'))) | (buf == ord('-'))
+    starts = np.flatnonzero(number[1:] & ~number[:-1])
+    if len(starts) != len(values):
+        raise ValueError("Unreadable face record")
+
+    # Tokens of a corner are its v, vt, vn ids in order
+    corner_first = buf[starts - 1] != ord('/')
+    corner_first[0] = True
+    corner_of_token = np.cumsum(corner_first) - 1
+    field = np.arange(len(starts)) - np.flatnonzero(corner_first)[corner_of_token]
+    keep = field < 3
+
+    corner_starts = starts[corner_first]
+    face_of_corner = np.searchsorted(np.flatnonzero(buf == ord('\n')), corner_starts)
+    if len(values) == 3 * len(corner_starts) and keep.all():
+        corners = values.reshape(-1, 3)   # every corner is v/vt/vn
+    else:
+        corners = np.zeros((len(corner_starts), 3), dtype=np.int64)
+        corners[corner_of_token[keep], field[keep]] = values[keep]
+    if values.min() < 0:
+        for column, count in enumerate(before):
+            negative = corners[:, column] < 0
+            corners[negative, column] += count[face_of_corner[negative]] + 1
+    sizes = np.bincount(face_of_corner, minlength=len(selected))
+    return corners.astype(np.int32), sizes.astype(np.int32)
+
 class OBJ:
-    def __init__(self, filename, swapyz=False):
+    # renderer = "list" (immediate-mode display list) or "vbo" (indexed vertex buffers)
+    #   parser = "text" (line by line into lists) or "numpy" (bulk, into arrays;
+    #   see parse_arrays)
+    #   upload=False only parses the files, so it can run on a worker thread;
+    #   upload() then has to be called on the GL thread before rendering
+    def __init__(self, filename, swapyz=False, renderer="list", upload=True, parser="text"):
+        if renderer not in ("list", "vbo"):
+            raise ValueError(f"Unknown renderer: {renderer}")
+        if parser not in ("text", "numpy"):
+            raise ValueError(f"Unknown parser: {parser}")
+        self.renderer = renderer
+        self.parser = parser
+        self.mtl = {}
+        self.lod_arrays = []    # simplified build_arrays() levels, see make_lods
+
+        if parser == "numpy":
+            self.parse_arrays(filename, swapyz)
+        else:
+            self.parse_text(filename, swapyz)
+
+        if upload:
+            self.upload()
+
+    # Line-by-line parser: geometry as lists, faces as
+    #   [(vertex ids, normal ids, texcoord ids, material)] with 1-based ids (0: none)
+    def parse_text(self, filename, swapyz=False):
         self.vertices = []
         self.normals = []
         self.texcoords = []
         self.faces = []
-
         material = None
-        self.mtl = {}
 
         for line in open(filename, "r"):
             if line.startswith('#'):
@@ -77,21 +197,97 @@ class OBJ:
             elif values[0] in ('usemtl', 'usemat'):
                 material = values[1]
             elif values[0] == 'mtllib':
-                mtl_path = os.path.join("./resources/models/", values[1])
-                self.mtl = MTL(mtl_path)
+                self.mtl = parse_mtl(os.path.join(os.path.dirname(filename), values[1]))
             elif values[0] == 'f':
                 face = []
                 texcoords = []
                 norms = []
                 for v in values[1:]:
                     w = v.split('/')
-                    face.append(int(w[0]))
-                    texcoords.append(int(w[1]) if len(w) > 1 and w[1] else 0)
-                    norms.append(int(w[2]) if len(w) > 2 and w[2] else 0)
+                    face.append(_absolute(int(w[0]), len(self.vertices)))
+                    texcoords.append(_absolute(int(w[1]), len(self.texcoords)) if len(w) > 1 and w[1] else 0)
+                    norms.append(_absolute(int(w[2]), len(self.normals)) if len(w) > 2 and w[2] else 0)
                 self.faces.append((face, norms, texcoords, material))
 
-        # Build initial display list
-        self.rebuild_gl_list()
+    # Bulk parser: the file is classified and tokenized with NumPy instead of
+    #   line by line. Geometry ends up in float32 arrays and faces in int32
+    #   arrays (see face_arrays); the vertex arrays built from them are the same
+    #   as with parse_text.
+    def parse_arrays(self, filename, swapyz=False):
+        with open(filename, "rb") as f:
+            data = f.read()
+        lines = data.split(b'\n')
+        buf = np.frombuffer(data + b'\n\n\n', dtype=np.uint8)
+        starts = np.zeros(len(lines), dtype=np.int64)
+        starts[1:] = np.flatnonzero(buf[:len(data)] == ord('\n')) + 1
+        c0, c1, c2 = buf[starts], buf[starts + 1], buf[starts + 2]
+        space = lambda c: (c == ord(' ')) | (c == ord('\t'))
+        is_v = (c0 == ord('v')) & space(c1)
+        is_vn = (c0 == ord('v')) & (c1 == ord('n')) & space(c2)
+        is_vt = (c0 == ord('v')) & (c1 == ord('t')) & space(c2)
+        is_f = (c0 == ord('f')) & space(c1)
+
+        self.vertices = _parse_floats(lines, np.flatnonzero(is_v), b'v', 3)
+        self.normals = _parse_floats(lines, np.flatnonzero(is_vn), b'vn', 3)
+        self.texcoords = _parse_floats(lines, np.flatnonzero(is_vt), b'vt', 2)
+        if swapyz:
+            self.vertices = np.ascontiguousarray(self.vertices[:, [0, 2, 1]])
+            self.normals = np.ascontiguousarray(self.normals[:, [0, 2, 1]])
+
+        # Materials: the few usemtl/mtllib lines are read one by one
+        names = {None: 0}
+        material_lines = [0]    # line where each material switch happens
+        switches = [0]          # material index switched to
+        for i in np.flatnonzero((c0 == ord('u')) | (c0 == ord('m'))):
+            values = lines[i].decode().split()
+            if not values:
+                continue
+            if values[0] in ('usemtl', 'usemat'):
+                material_lines.append(i)
+                switches.append(names.setdefault(values[1], len(names)))
+            elif values[0] == 'mtllib':
+                self.mtl = parse_mtl(os.path.join(os.path.dirname(filename), values[1]))
+        self.material_names = list(names)
+
+        face_lines = np.flatnonzero(is_f)
+        # Ids counted so far at each face, for negative (relative) indices
+        before = [np.cumsum(kind)[face_lines] for kind in (is_v, is_vt, is_vn)]
+        self.corners, self.face_sizes = _parse_faces(lines, face_lines, before)
+        current = np.searchsorted(material_lines, face_lines, side='right') - 1
+        self.face_materials = np.array(switches, dtype=np.int32)[current]
+
+    # Upload the textures and build the initial GPU representation
+    #   arrays: output of build_arrays(), if already computed off the GL thread
+    def upload(self, arrays=None):
+        load_material_textures(self.mtl)
+        self.rebuild(arrays)
+
+    # (Re)build whichever GPU representation this mesh was created with
+    def rebuild(self, arrays=None):
+        if self.renderer == "vbo":
+            self.rebuild_buffers(arrays)
+        else:
+            self.rebuild_gl_list()
+
+    # lod: level of detail to draw (0 is the full mesh), see make_lods; the
+    #   display list renderer always draws the full mesh
+    def render(self, lod=0):
+        if self.renderer == "vbo":
+            self.draw_buffers(lod)
+        else:
+            glCallList(self.gl_list)
+            render_state.invalidate() # the list binds textures and colors itself
+
+    # Free the display list or buffers owned by this mesh
+    def release(self):
+        if hasattr(self, 'gl_list'):
+            glDeleteLists(self.gl_list, 1)
+            del self.gl_list
+        if hasattr(self, 'vbo'):
+            glDeleteBuffers(2, [self.vbo, self.ibo])
+            if self.vao:
+                glDeleteVertexArrays(1, [self.vao])
+            del self.vbo, self.ibo, self.vao
 
     # (Re)complile the OpenGL display list based on current geometry and materials
     def rebuild_gl_list(self):
@@ -103,17 +299,28 @@ class OBJ:
         glEnable(GL_TEXTURE_2D)
         glFrontFace(GL_CCW)
 
-        for face in self.faces:
-            vertices, normals, texture_coords, material = face
-            mtl = self.mtl.get(material, {})
+        # Faces grouped by material (in order of first use), so the texture
+        #   and color are set once per material rather than once per face
+        faces = self.face_list()
+        first_use = {}
+        for face in faces:
+            first_use.setdefault(face[3], len(first_use))
+        faces = sorted(faces, key=lambda face: first_use[face[3]])
 
-            tex_id = mtl.get('texture_map_Kd')
-            if tex_id:
-                glBindTexture(GL_TEXTURE_2D, tex_id)
-                glColor3f(1.0, 1.0, 1.0)
-            else:
-                kd = mtl.get('Kd', [1.0, 1.0, 1.0])
-                glColor3f(*kd)
+        material = object()
+        for face in faces:
+            vertices, normals, texture_coords = face[:3]
+            if face[3] != material:
+                material = face[3]
+                mtl = self.mtl.get(material, {})
+
+                tex_id = mtl.get('texture_map_Kd')
+                if tex_id:
+                    glBindTexture(GL_TEXTURE_2D, tex_id)
+                    glColor3f(1.0, 1.0, 1.0)
+                else:
+                    kd = mtl.get('Kd', [1.0, 1.0, 1.0])
+                    glColor3f(*kd)
 
             glBegin(GL_POLYGON)
             for i in range(len(vertices)):
@@ -127,18 +334,219 @@ class OBJ:
         glDisable(GL_TEXTURE_2D)
         glEndList()    
 
+    # Faces as arrays, whichever parser was used: ((corners, 3) int32 v/vt/vn
+    #   ids, 1-based with 0 for none; corners per face; material index per
+    #   face; material names)
+    def face_arrays(self):
+        if self.parser == "numpy":
+            return self.corners, self.face_sizes, self.face_materials, self.material_names
+        names = {}
+        corners = []
+        sizes = []
+        materials = []
+        for vertices, normals, texture_coords, material in self.faces:
+            corners += zip(vertices, texture_coords, normals)
+            sizes.append(len(vertices))
+            materials.append(names.setdefault(material, len(names)))
+        return (np.array(corners, dtype=np.int32).reshape(-1, 3), np.array(sizes, dtype=np.int32),
+                np.array(materials, dtype=np.int32), list(names))
+
+    # Faces as parse_text lists, for the display list renderer
+    def face_list(self):
+        if self.parser == "text":
+            return self.faces
+        ends = np.cumsum(self.face_sizes)
+        faces = []
+        for start, end, material in zip((ends - self.face_sizes).tolist(), ends.tolist(), self.face_materials.tolist()):
+            v, vt, vn = self.corners[start:end].T.tolist()
+            faces.append((v, vn, vt, self.material_names[material]))
+        return faces
+
+    # Triangulate faces (as fans) and de-duplicate (v, vt, vn) corners into
+    #   vertex/index arrays, with one contiguous index range per material in
+    #   order of first use. Vertices are numbered in order of first use, too.
+    #   Returns (float32 interleaved vertices, uint32 indices, [(material, first, count)])
+    def build_arrays(self):
+        corners, sizes, face_materials, names = self.face_arrays()
+        corners = corners.astype(np.int64)
+
+        # One integer key per distinct corner, numbered by first occurrence
+        spans = corners.max(axis=0, initial=0) + 1
+        keys = (corners[:, 0] * spans[1] + corners[:, 1]) * spans[2] + corners[:, 2]
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        order = np.argsort(first)
+        renumber = np.empty_like(order)
+        renumber[order] = np.arange(len(order))
+        ids = renumber[inverse.ravel()]
+        v, vt, vn = corners[first[order]].T
+
+        data = np.zeros((len(order), VERTEX_FLOATS), dtype=np.float32)
+        if len(order):
+            data[:, 0:3] = np.asarray(self.vertices, dtype=np.float32)[v - 1]
+            # Corners without a normal/texcoord keep zeros, like a face that never
+            #   called glNormal/glTexCoord in the display list path
+            if len(self.normals):
+                has = vn > 0
+                data[has, 3:6] = np.asarray(self.normals, dtype=np.float32)[vn[has] - 1]
+            if len(self.texcoords):
+                has = vt > 0
+                data[has, 6:8] = np.asarray(self.texcoords, dtype=np.float32)[vt[has] - 1]
+
+        # Fans (first, i, i + 1) of every face
+        fans = np.maximum(sizes.astype(np.int64) - 2, 0)
+        face_starts = np.cumsum(sizes, dtype=np.int64) - sizes
+        face_of_triangle = np.repeat(np.arange(len(sizes)), fans)
+        i = np.arange(len(face_of_triangle)) - np.repeat(np.cumsum(fans) - fans, fans) + 1
+        apex = face_starts[face_of_triangle]
+        triangles = np.stack([ids[apex], ids[apex + i], ids[apex + i + 1]], axis=1)
+
+        # Group the triangles by material, materials in order of first use
+        used, first_face = np.unique(face_materials, return_index=True)
+        used = used[np.argsort(first_face)]
+        rank = np.empty(len(names), dtype=np.int64)
+        rank[used] = np.arange(len(used))
+        grouped = np.argsort(rank[face_materials[face_of_triangle]], kind='stable')
+        counts = np.bincount(rank[face_materials[face_of_triangle]], minlength=len(used)) * 3
+        ranges = [(names[m], int(start), int(count))
+                  for m, start, count in zip(used, np.cumsum(counts) - counts, counts)]
+        return data, triangles[grouped].astype(np.uint32).ravel(), ranges
+
+    # Simplified levels of detail for the buffer renderer (see simplify), read
+    #   from or saved to the LOD cache; they are uploaded with the full mesh by
+    #   the next upload()/rebuild() and kept by later rebuilds. Geometry edits
+    #   other than obstacles.apply_transform_to_mesh need make_lods again.
+    def make_lods(self, filename, arrays=None):
+        self.lod_arrays = load_lods(filename, arrays or self.build_arrays())
+
+    # (Re)upload interleaved vertex and index buffers; when vertex array objects
+    #   are available the pointer setup is recorded once in a VAO
+    #   The levels of detail share the buffers: their vertices and indices
+    #   follow the full mesh's
+    def rebuild_buffers(self, arrays=None):
+        self.release()
+        levels = [arrays or self.build_arrays()] + self.lod_arrays
+        bases = np.cumsum([0] + [len(level[0]) for level in levels])
+        data = np.concatenate([level[0] for level in levels])
+        indices = np.concatenate([level[1] + np.uint32(base) for level, base in zip(levels, bases)])
+
+        self.vao = glGenVertexArrays(1) if bool(glGenVertexArrays) else 0
+        if self.vao:
+            glBindVertexArray(self.vao)
+        self.vbo, self.ibo = glGenBuffers(2)
+        glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+        glBufferData(GL_ARRAY_BUFFER, data.nbytes, data, GL_STATIC_DRAW)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+        glBufferData(GL_ELEMENT_ARRAY_BUFFER, indices.nbytes, indices, GL_STATIC_DRAW)
+        if self.vao:
+            self._set_vertex_pointers()
+            glBindVertexArray(0)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+
+        # Per-material draw commands of each level: (texture id or None,
+        #   diffuse color, byte offset, count); part i is the same material
+        #   in every level
+        self.lods = []
+        offset = 0
+        for level in levels:
+            draws = []
+            for material, first, count in level[2]:
+                mtl = self.mtl.get(material, {})
+                tex_id = mtl.get('texture_map_Kd')
+                color = (1.0, 1.0, 1.0) if tex_id else tuple(mtl.get('Kd', [1.0, 1.0, 1.0]))
+                draws.append((tex_id, color, (offset + first) * 4, count))
+            self.lods.append(draws)
+            offset += len(level[1])
+        self.draws = self.lods[0]
+        self.lod_triangles = [len(level[1]) // 3 for level in levels]
+        self.triangle_count = self.lod_triangles[0]
+
+    def _set_vertex_pointers(self):
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_NORMAL_ARRAY)
+        glEnableClientState(GL_TEXTURE_COORD_ARRAY)
+        glVertexPointer(3, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(0))
+        glNormalPointer(GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(NORMAL_OFFSET))
+        glTexCoordPointer(2, GL_FLOAT, VERTEX_STRIDE, ctypes.c_void_p(TEXCOORD_OFFSET))
+
+    # One glDrawElements per material instead of one glBegin/glEnd per face
+    def draw_buffers(self, lod=0):
+        self.bind_arrays()
+        for part in range(len(self.draws)):
+            self.draw_part(part, lod)
+        self.unbind_arrays()
+
+    # Make this mesh's buffers the vertex arrays draw_part() reads from
+    def bind_arrays(self):
+        if self.vao:
+            glBindVertexArray(self.vao)
+        else:
+            glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+            glBindBuffer(GL_ARRAY_BUFFER, self.vbo)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, self.ibo)
+            self._set_vertex_pointers()
+
+    def unbind_arrays(self):
+        if self.vao:
+            glBindVertexArray(0)
+        else:
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+            glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0)
+            glPopClientAttrib()
+
+    # Draw one material's triangles (self.lods[lod][part]) with the arrays bound
+    #   Texturing is left enabled for the next mesh: untextured drawing
+    #   disables it through render_state
+    def draw_part(self, part, lod=0):
+        tex_id, color, offset, count = self.lods[lod][part]
+        if not count:
+            return
+        render_state.enable(GL_TEXTURE_2D)
+        render_state.front_face(GL_CCW)
+        render_state.bind_texture(tex_id or 0)
+        render_state.color(*color)
+        glDrawElements(GL_TRIANGLES, count, GL_UNSIGNED_INT, ctypes.c_void_p(offset))
+
     # Calculate the min, max values of each x, y, z coordinates of the input mesh
     #   Also, returns the center position (x, y, z), 
     #       and radius (i.e., max value of x, y, z ranges)
     def cal_minMax(self):
-        if not self.vertices:
+        if not len(self.vertices):
             return None, None, None  # or raise an Exception if preferred
 
-        xs = [v[0] for v in self.vertices]
-        ys = [v[1] for v in self.vertices]
-        zs = [v[2] for v in self.vertices]
+        vertices = np.asarray(self.vertices)
+        min_coords = tuple(vertices.min(axis=0).tolist())
+        max_coords = tuple(vertices.max(axis=0).tolist())
+
+        return min_coords, max_coords
+
+# Flyweight registry of parsed meshes keyed by (absolute path, swapyz, renderer)
+#   Every placement of the same model shares one parse, one set of uploaded
+#   textures and one display list; per-instance placement lives with the caller
+_mesh_registry = {}
+
+#   Meshes drawn from buffers get their levels of detail, as with AssetManager
+def load_mesh(filename, swapyz=False, renderer="list"):
+    mesh = _mesh_registry.get((os.path.abspath(filename), swapyz, renderer))
+    if mesh is None:
+        mesh = OBJ(filename, swapyz=swapyz, renderer=renderer, upload=False)
+        arrays = None
+        if renderer == "vbo":
+            arrays = mesh.build_arrays()
+            mesh.make_lods(filename, arrays)
+        mesh.upload(arrays)
+        mesh = register_mesh(mesh, filename, swapyz)
+    return mesh
 
-        min_coords = (min(xs), min(ys), min(zs))
-        max_coords = (max(xs), max(ys), max(zs))
+# Add a mesh loaded elsewhere (e.g. by the asset manager) to the registry
+def register_mesh(mesh, filename, swapyz=False):
+    # Local-space bounds are computed once and shared by every instance
+    mesh.bounds = mesh.cal_minMax()
+    _mesh_registry[(os.path.abspath(filename), swapyz, mesh.renderer)] = mesh
+    return mesh
 
-        return min_coords, max_coords
\ No newline at end of file
+def clear_mesh_registry():
+    for mesh in _mesh_registry.values():
+        mesh.release()
+        delete_textures(mesh.mtl)
+    _mesh_registry.clear()
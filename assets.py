@@ -0,0 +1,141 @@
+import os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+from OBJFileLoader import OBJ, parse_mtl, texture_paths, register_mesh
+from textures import texture_manager
+
+RESOURCE_DIR = "./resources"
+SOUND_TYPES = ('.mp3', '.wav', '.ogg')
+
+########################################### Manifest ####################################################
+# Everything the game reads from resources/: [(kind, path)] with kind "model",
+#   "texture" or "sound". Textures are the ones bound by the models' materials;
+#   other images in the folder are never used and stay on disk.
+def build_manifest(root=RESOURCE_DIR):
+    manifest = []
+    for folder, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            path = os.path.join(folder, name)
+            ext = os.path.splitext(name)[1].lower()
+            if ext == '.obj':
+                for line in open(path, "r"):
+                    if line.startswith('mtllib'):
+                        mtl_path = os.path.join(folder, line.split()[1])
+                        manifest += [('texture', p) for p in texture_paths(parse_mtl(mtl_path))]
+                manifest.append(('model', path))
+            elif ext in SOUND_TYPES:
+                manifest.append(('sound', path))
+    return manifest
+
+def asset_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+# Reading resources once the race has started is a bug: with check_reads,
+#   after seal() any Python-level open() under resources/ raises instead of
+#   hitching the frame. This is a debugging aid: audit hooks cannot be removed
+#   and _audit then runs on every audited event of the process, so it is only
+#   installed when asked for.
+_sealed = False
+_hooked = False
+
+def _audit(event, args):
+    if _sealed and event == 'open' and isinstance(args[0], str) \
+            and os.path.abspath(args[0]).startswith(os.path.abspath(RESOURCE_DIR)):
+        raise RuntimeError(f"{args[0]} read during the race; add it to the asset manifest")
+
+########################################### Asset Manager ####################################################
+# Loads the whole manifest before the race
+#   Files are read and decoded (sounds, images, OBJ/MTL parsing and vertex
+#   arrays) on worker threads as soon as start() is called; pump() is called
+#   between frames on the GL thread and uploads finished items until its time
+#   budget is spent, so a loading screen stays responsive.
+#   check_reads: make reading resources after seal() an error (see _audit)
+class AssetManager:
+    def __init__(self, manifest=None, workers=4, renderer="vbo", check_reads=False):
+        self.manifest = build_manifest() if manifest is None else manifest
+        self.renderer = renderer
+        self.check_reads = check_reads
+        self.sounds = {}    # name -> pygame.mixer.Sound
+        self.meshes = {}    # name -> OBJ, also in the OBJFileLoader registry
+        self.loaded = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asset-load')
+        self._queue = []    # (kind, path, future or None), in manifest order
+
+    def start(self):
+        texture_manager.prefetch(path for kind, path in self.manifest if kind == 'texture')
+        for kind, path in self.manifest:
+            future = None
+            if kind == 'sound':
+                future = self._pool.submit(pygame.mixer.Sound, path)
+            elif kind == 'model':
+                future = self._pool.submit(self._parse_model, path)
+            self._queue.append((kind, path, future))
+
+    # Levels of detail are made here too (or read from their cache), see OBJ.make_lods
+    def _parse_model(self, path):
+        mesh = OBJ(path, renderer=self.renderer, upload=False)
+        if self.renderer != "vbo":
+            return mesh, None
+        arrays = mesh.build_arrays()
+        mesh.make_lods(path, arrays)
+        return mesh, arrays
+
+    @property
+    def progress(self):
+        return self.loaded / len(self.manifest) if self.manifest else 1.0
+
+    @property
+    def done(self):
+        return self.loaded == len(self.manifest)
+
+    # Finish loaded items on the calling (GL) thread for up to `budget` seconds
+    #   Returns the progress in [0, 1]
+    def pump(self, budget=0.008):
+        deadline = time.perf_counter() + budget
+        while self._queue and time.perf_counter() < deadline:
+            kind, path, future = self._queue[0]
+            if not (texture_manager.ready(path) if kind == 'texture' else future.done()):
+                break
+            self._queue.pop(0)
+            if kind == 'texture':
+                try:
+                    texture_manager.load(path) # the manager keeps it for the models
+                except (pygame.error, FileNotFoundError):
+                    pass # reported when the model's material asks for it
+            elif kind == 'sound':
+                self.sounds[asset_name(path)] = future.result()
+            else:
+                mesh, arrays = future.result()
+                mesh.upload(arrays)
+                self.meshes[asset_name(path)] = register_mesh(mesh, path)
+            self.loaded += 1
+        return self.progress
+
+    # Load everything without a loading screen
+    def load_all(self):
+        self.start()
+        while not self.done:
+            self.pump(1.0)
+            time.sleep(0.001)
+
+    def sound(self, name):
+        return self.sounds[name]
+
+    def mesh(self, name):
+        return self.meshes[name]
+
+    # From now on resources must not be read from disk (see _audit)
+    def seal(self):
+        global _sealed, _hooked
+        if not self.check_reads:
+            return
+        if not _hooked:
+            # Stays installed for the rest of the process
+            sys.addaudithook(_audit)
+            _hooked = True
+        _sealed = True
+
+    def unseal(self):
+        global _sealed
+        _sealed = False
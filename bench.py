@@ -0,0 +1,348 @@
+import argparse, json, os, platform as pyplatform, resource, statistics, sys, tempfile, time, tracemalloc
+
+# Benchmarks for asset loading, collision and rendering
+#   python bench.py --offscreen --save baseline.json
+#   python bench.py --offscreen --compare baseline.json
+#   --offscreen renders through SDL's offscreen driver (EGL + Mesa, works with
+#   LIBGL_ALWAYS_SOFTWARE=1 and no display); without it a hidden window is used.
+
+MODEL_DIR = "./resources/models"
+TEXTURE_DIR = "./resources/textures"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Highway Hop benchmarks")
+    parser.add_argument('--offscreen', action='store_true', help="render without a display")
+    parser.add_argument('--scales', default="1000,10000,100000",
+                        help="comma separated obstacle counts for the synthetic scenes")
+    parser.add_argument('--render-max', type=int, default=10000,
+                        help="largest scene that is also rendered")
+    parser.add_argument('--repeat', type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument('--obj-faces', type=int, default=1000000,
+                        help="faces of the synthetic OBJ for the parser benchmarks")
+    parser.add_argument('--filter', default="", help="only run benchmarks containing this text")
+    parser.add_argument('--save', help="write results to this JSON file")
+    parser.add_argument('--compare', help="compare against a JSON file written with --save")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="relative slowdown reported as a regression")
+    return parser.parse_args()
+
+args = parse_args()
+if args.offscreen:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+
+import numpy as np
+import pygame
+from pygame.locals import *
+from OpenGL.GL import *
+from OpenGL.GLU import *
+
+from OBJFileLoader import *
+from obstacles import *
+from textures import texture_manager, decode_image
+from culling import Frustum
+import game
+import instancing
+from simplify import simplify
+from renderqueue import render_queue
+
+########################################### Harness ####################################################
+# Time fn() `repeat` times after one warm-up call; `items` is the amount of work
+#   per call (vertices, queries, instances...) used for the throughput figure
+#   setup() runs untimed before every call; peak_alloc_kb is the peak of Python
+#   allocations during one call (GPU memory is not included)
+def measure(name, fn, items=1, unit="ops", repeat=None, setup=None):
+    repeat = repeat or args.repeat
+    if setup:
+        setup()
+    fn()
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    # Memory is measured on a separate run since tracing slows everything down
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(times)
+    result = {
+        'best_s': best,
+        'median_s': statistics.median(times),
+        'throughput': items / best if best > 0 else float('inf'),
+        'unit': unit,
+        'peak_alloc_kb': peak / 1024.0,
+    }
+    print(f"{name:<40}{best * 1000:10.3f} ms{result['throughput']:14.0f} {unit}/s"
+          f"{result['peak_alloc_kb']:12.0f} KiB")
+    return result
+
+def selected(name):
+    return args.filter in name
+
+def synthetic_places(count, y, seed=0):
+    rng = np.random.default_rng(seed)
+    lanes = rng.integers(-2, 3, count) * 10
+    zs = -rng.uniform(0, count * 6, count)
+    return np.stack([lanes, np.full(count, y), zs], axis=1)
+
+########################################### Benchmarks ####################################################
+def bench_assets(results):
+    for model in ('traffic', 'SimpleGoldCoin'):
+        path = os.path.join(MODEL_DIR, model + '.obj')
+        vertex_count = sum(1 for line in open(path) if line.startswith('v '))
+        for renderer in ('list', 'vbo'):
+            name = f"load/{model}/{renderer}"
+            if selected(name):
+                def load():
+                    mesh = OBJ(path, renderer=renderer)
+                    mesh.release()
+                    delete_textures(mesh.mtl)
+                results[name] = measure(name, load, vertex_count, "vertices")
+
+        name = f"mtl/{model}"
+        mtl_file = next((line.split()[1] for line in open(path) if line.startswith('mtllib')), None)
+        if mtl_file and selected(name):
+            results[name] = measure(name, lambda: delete_textures(MTL(os.path.join(MODEL_DIR, mtl_file))))
+
+        name = f"transform/{model}"
+        if selected(name):
+            mesh = OBJ(path)
+            original = mesh.vertices
+            def transform():
+                mesh.vertices = original
+                apply_transform_to_mesh(mesh, Transform(translation=(10, 0, -50)))
+            results[name] = measure(name, transform, vertex_count, "vertices")
+            mesh.release()
+            delete_textures(mesh.mtl)
+
+        # Levels of detail made from scratch, without the cache
+        name = f"simplify/{model}"
+        if selected(name):
+            arrays = OBJ(path, renderer="vbo", upload=False).build_arrays()
+            results[name] = measure(name, lambda: simplify(arrays), len(arrays[1]) // 3, "triangles")
+
+    # Single decode + upload (with mipmaps) per texture, bypassing the cache
+    paths = [os.path.join(TEXTURE_DIR, f) for f in sorted(os.listdir(TEXTURE_DIR)) if f.endswith('.png')]
+    for path in paths:
+        name = f"texture/{os.path.basename(path)}"
+        if selected(name):
+            def upload():
+                texture_manager.release(texture_manager.upload(*decode_image(path)))
+            results[name] = measure(name, upload)
+
+    # Cold load of every texture through the cache (parallel decode) and warm lookups
+    name = "texture-cache/cold"
+    if selected(name):
+        results[name] = measure(name, lambda: texture_manager.load_many(paths), len(paths),
+                                "textures", setup=texture_manager.clear)
+    name = "texture-cache/warm"
+    if selected(name):
+        texture_manager.load_many(paths)
+        results[name] = measure(name, lambda: texture_manager.load_many(paths), len(paths), "textures")
+        texture_manager.clear()
+
+# Quad grid with normals and texcoords; every other quad is written with
+#   negative (relative) indices
+def synthetic_obj(path, faces):
+    columns = 1000
+    rows = max(1, -(-faces // columns))
+    xs, zs = np.meshgrid(np.arange(columns + 1), np.arange(rows + 1))
+    count = xs.size
+    with open(path, 'w') as f:
+        for x, z in zip(xs.ravel().tolist(), zs.ravel().tolist()):
+            f.write(f"v {x * 0.5:.6f} {np.sin(x * 0.1) * np.cos(z * 0.1):.6f} {-z * 0.5:.6f}\n")
+            f.write(f"vt {x / columns:.6f} {z / rows:.6f}\n")
+        f.write("vn 0.000000 1.000000 0.000000\n")
+        for i in range(faces):
+            r, c = divmod(i, columns)
+            a = r * (columns + 1) + c + 1
+            corners = (a, a + 1, a + columns + 2, a + columns + 1)
+            if i % 2:
+                f.write("f " + " ".join(f"{v - count - 1}/{v - count - 1}/-1" for v in corners) + "\n")
+            else:
+                f.write("f " + " ".join(f"{v}/{v}/1" for v in corners) + "\n")
+
+# Text vs NumPy OBJ parsing of a large mesh, parse only and parse + vertex arrays
+def bench_parse(results):
+    names = [f"parse/{parser}/{args.obj_faces}" for parser in ("text", "numpy")]
+    names += [f"parse-arrays/{parser}/{args.obj_faces}" for parser in ("text", "numpy")]
+    if not any(selected(name) for name in names):
+        return
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "synthetic.obj")
+        synthetic_obj(path, args.obj_faces)
+        repeat = max(1, args.repeat // 5)
+        arrays = {}
+        for parser in ("text", "numpy"):
+            name = f"parse/{parser}/{args.obj_faces}"
+            if selected(name):
+                results[name] = measure(name, lambda: OBJ(path, upload=False, parser=parser),
+                                        args.obj_faces, "faces", repeat=repeat)
+            name = f"parse-arrays/{parser}/{args.obj_faces}"
+            if selected(name):
+                def parse():
+                    arrays[parser] = OBJ(path, upload=False, parser=parser).build_arrays()
+                results[name] = measure(name, parse, args.obj_faces, "faces", repeat=repeat)
+        if len(arrays) == 2:
+            (data, indices, ranges), (data2, indices2, ranges2) = arrays.values()
+            same = np.array_equal(data, data2) and np.array_equal(indices, indices2) and ranges == ranges2
+            print(f"{'':<40}parsers produce {'identical' if same else 'DIFFERENT'} vertex arrays")
+
+def bench_collision(results, scales):
+    for count in scales:
+        name = f"collision/{count}"
+        if not selected(name):
+            continue
+        places = [tuple(p) for p in synthetic_places(count, 0)]
+        # Drive the car down the centre lane with a fixed number of queries
+        #   spread along the track, so the cost per query is comparable across scales
+        track = -min(p[2] for p in places)
+        positions = [np.array([0.0, 0.0, -z + 4.0]) for z in np.linspace(0, track, 10000)]
+        scene = {}
+        def setup():
+            scene['cones'] = Obstacles('traffic', places)
+        def drive():
+            cones = scene['cones']
+            for position in positions:
+                cones.collision(position, game.lane_size)
+        results[name] = measure(name, drive, len(positions), "queries", setup=setup)
+
+        # The same drive as swept queries from each position to the next, so
+        #   the whole track is covered (see simulation.step)
+        name = f"collision-swept/{count}"
+        if selected(name):
+            def sweep():
+                cones = scene['cones']
+                for start, end in zip(positions, positions[1:]):
+                    cones.sweep_collision(start, game.lane_size, end - start)
+            results[name] = measure(name, sweep, len(positions) - 1, "queries", setup=setup)
+
+        name = f"collision-build/{count}"
+        if selected(name):
+            results[name] = measure(name, lambda: Obstacles('traffic', places), count, "instances")
+
+def bench_render(results, scales):
+    glViewport(0, 0, game.width, game.height)
+    glMatrixMode(GL_PROJECTION)
+    glLoadIdentity()
+    gluPerspective(game.fovy, game.width / game.height, game.near, game.far)
+    glMatrixMode(GL_MODELVIEW)
+    glEnable(GL_LIGHTING)
+    glEnable(GL_COLOR_MATERIAL)
+    glEnable(GL_LIGHT0)
+
+    for count in scales:
+        name = f"render/{count}"
+        if count > args.render_max or not selected(name):
+            continue
+        cones = Obstacles('traffic', [tuple(p) for p in synthetic_places(count, 0)], lod=False)
+        coins = Obstacles('SimpleGoldCoin', [tuple(p) for p in synthetic_places(count, 5, 1)], True, lod=False)
+        def frame(frustum=None, eye=None):
+            glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+            glLoadIdentity()
+            gluLookAt(0, 20, 50, 0, 10, 0, 0, 1, 0)
+            game.drawRoad(*(frustum.clip_z(50, -game.FINISH) if frustum else ()))
+            cones.drawMeshes(frustum, eye)
+            coins.drawMeshes(frustum, eye)
+            glFinish()
+        results[name] = measure(name, frame, 2 * count, "instances", repeat=max(1, args.repeat // 2))
+
+        # Same scene with frustum culling and a 300 unit draw distance
+        name = f"render-culled/{count}"
+        if selected(name):
+            frustum = Frustum((0, 20, 50), (0, 10, 0), (0, 1, 0), game.fovy,
+                              game.width / game.height, game.near, game.far, 300)
+            results[name] = measure(name, lambda: frame(frustum), 2 * count, "instances",
+                                    repeat=max(1, args.repeat // 2))
+            print(f"{'':<40}drawn {cones.drawn + coins.drawn}, culled {cones.culled + coins.culled}")
+
+        # Same scene with levels of detail chosen by distance (see obstacles.LOD_DISTANCES)
+        name = f"render-lod/{count}"
+        if selected(name):
+            full = cones.obj.triangle_count * len(cones.index) + coins.obj.triangle_count * len(coins.index)
+            cones.lod = coins.lod = True
+            results[name] = measure(name, lambda: frame(eye=(0, 20, 50)), 2 * count, "instances",
+                                    repeat=max(1, args.repeat // 2))
+            cones.lod = coins.lod = False
+            print(f"{'':<40}{cones.triangles + coins.triangles} of {full} triangles")
+
+        # Same scene, one instanced call per material (see instancing)
+        name = f"render-instanced/{count}"
+        program = instancing.program()
+        if selected(name) and program is not None:
+            def instanced():
+                glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
+                glLoadIdentity()
+                gluLookAt(0, 20, 50, 0, 10, 0, 0, 1, 0)
+                render_queue.begin_frame((0, 20, 50))
+                render_queue.add(game.drawRoad)
+                cones.enqueue(render_queue, program=program)
+                coins.enqueue(render_queue, program=program)
+                render_queue.flush()
+                glFinish()
+            results[name] = measure(name, instanced, 2 * count, "instances", repeat=max(1, args.repeat // 2))
+            print(f"{'':<40}{render_queue.draw_calls} draw calls, "
+                  f"{sum(b.updates for b in cones.instances + coins.instances)} instance updates")
+        cones.release()
+        coins.release()
+
+########################################### Baselines ####################################################
+def compare(results, path):
+    baseline = json.load(open(path))['results']
+    print(f"\nCompared with {path} (best time, >{args.tolerance:.0%} slower is a regression):")
+    regressions = 0
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['best_s'] / baseline[name]['best_s']
+        flag = ""
+        if ratio > 1 + args.tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<40}{ratio:8.2f}x{flag}")
+    return regressions
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((game.width, game.height), DOUBLEBUF | OPENGL | HIDDEN)
+    print(f"GL: {glGetString(GL_RENDERER).decode()} ({glGetString(GL_VERSION).decode()})\n")
+
+    scales = [int(s) for s in args.scales.split(',') if s]
+    results = {}
+    bench_assets(results)
+    bench_parse(results)
+    bench_collision(results, scales)
+    bench_render(results, scales)
+
+    stats = texture_manager.stats()
+    print(f"\ntexture cache: {stats['textures']} resident, {stats['bytes_resident'] / 2**20:.0f} MiB,"
+          f" hit rate {stats['hit_rate']:.0%}")
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    print(f"max RSS: {usage.ru_maxrss / 1024:.0f} MiB")
+
+    if args.save:
+        report = {
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': sys.version.split()[0],
+            'platform': pyplatform.platform(),
+            'gl_renderer': glGetString(GL_RENDERER).decode(),
+            'max_rss_kb': usage.ru_maxrss,
+            'results': results,
+        }
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved results to {args.save}")
+
+    if args.compare:
+        sys.exit(1 if compare(results, args.compare) else 0)
+
+if __name__ == "__main__":
+    main()
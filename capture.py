@@ -0,0 +1,223 @@
+import ctypes, os, queue, struct, threading, zlib
+from collections import deque
+import numpy as np
+from OpenGL.GL import *
+
+# Frame capture for game.py
+#   python game.py --offscreen --seed 7 --capture frames/%05d.png --frames 300
+#   python game.py --capture run.rgba
+#   Frames are read back asynchronously through pixel buffer objects and
+#   written by background threads: a printf-style "%d" path gives a PNG
+#   sequence, any other path one raw RGBA video file (top row first).
+
+########################################### Render Target ####################################################
+# Framebuffer object with color and depth renderbuffers; while it is bound,
+#   frames are drawn into it instead of the window
+class RenderTarget:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.fbo = glGenFramebuffers(1)
+        self.color, self.depth = glGenRenderbuffers(2)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.color)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_RGBA8, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, self.depth)
+        glRenderbufferStorage(GL_RENDERBUFFER, GL_DEPTH24_STENCIL8, width, height)
+        glBindRenderbuffer(GL_RENDERBUFFER, 0)
+
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_COLOR_ATTACHMENT0, GL_RENDERBUFFER, self.color)
+        glFramebufferRenderbuffer(GL_FRAMEBUFFER, GL_DEPTH_STENCIL_ATTACHMENT, GL_RENDERBUFFER, self.depth)
+        status = glCheckFramebufferStatus(GL_FRAMEBUFFER)
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+        if status != GL_FRAMEBUFFER_COMPLETE:
+            self.release()
+            raise RuntimeError(f"Incomplete framebuffer (status 0x{status:x})")
+
+    def bind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, self.fbo)
+        glReadBuffer(GL_COLOR_ATTACHMENT0)
+        glDrawBuffer(GL_COLOR_ATTACHMENT0)
+
+    def unbind(self):
+        glBindFramebuffer(GL_FRAMEBUFFER, 0)
+
+    def release(self):
+        glDeleteFramebuffers(1, [self.fbo])
+        glDeleteRenderbuffers(2, [self.color, self.depth])
+
+########################################### Frame Writer ####################################################
+# PNG from top-down RGBA bytes; zlib does the work and releases the GIL
+def write_png(path, width, height, pixels, level=3):
+    rows = np.frombuffer(pixels, dtype=np.uint8).reshape(height, width * 4)
+    filtered = np.zeros((height, width * 4 + 1), dtype=np.uint8) # filter type 0 per row
+    filtered[:, 1:] = rows
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    with open(path, 'wb') as f:
+        f.write(b'\x89PNG\r\n\x1a\n')
+        f.write(chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)))
+        f.write(chunk(b'IDAT', zlib.compress(filtered.tobytes(), level)))
+        f.write(chunk(b'IEND', b''))
+
+# Background threads writing frames (bottom-up RGBA bytes, as read back from
+#   GL) in the order they are put(). PNG frames are separate files and are
+#   encoded on several threads; a raw video is appended by one. put() blocks
+#   while `backlog` frames are waiting, so a slow disk slows the game down
+#   rather than filling memory.
+class FrameWriter:
+    def __init__(self, path, width, height, workers=None, backlog=8):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.png = '%' in path
+        self.written = 0
+        self.error = None
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._video = None if self.png else open(path, 'wb')
+        self._queue = queue.Queue(backlog)
+        self._lock = threading.Lock()
+        self._frames = 0
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1) if self.png else 1
+        self._threads = [threading.Thread(target=self._run, name=f'frame-writer-{i}', daemon=True)
+                         for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, pixels):
+        self._queue.put((self._frames, pixels))
+        self._frames += 1
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                continue # keep draining so put() never blocks forever
+            index, pixels = item
+            try:
+                frame = np.frombuffer(pixels, dtype=np.uint8).reshape(self.height, -1)[::-1].tobytes()
+                if self.png:
+                    write_png(self.path % index, self.width, self.height, frame)
+                else:
+                    self._video.write(frame)
+                with self._lock:
+                    self.written += 1
+            except OSError as e:
+                self.error = e
+
+    def close(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        if self._video is not None:
+            self._video.close()
+        if self.error is not None:
+            raise self.error
+
+########################################### Frame Capture ####################################################
+# Reads every frame back into a ring of pixel buffer objects: glReadPixels
+#   into a buffer object returns without waiting for the GPU, and a buffer is
+#   only mapped (copied out) once newer frames have been queued behind it, by
+#   which time its transfer has finished.
+#   frames: stop capturing after this many (full is then True)
+#   fps: the game clock advances 1/fps per frame (see GameClock.frame_time), so
+#   captures do not depend on how fast frames are drawn
+#   offscreen: draw into a RenderTarget instead of the window
+class FrameCapture:
+    def __init__(self, path, width, height, frames=None, fps=60, offscreen=False, buffers=2):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.limit = frames
+        self.fps = fps
+        self.offscreen = offscreen
+        self.buffers = buffers
+        self.requested = 0  # frames read back so far
+        self.target = None
+        self._pbos = []
+        self._next = 0
+        self._pending = deque() # buffer objects with a readback in flight, oldest first
+        self._writer = FrameWriter(path, width, height)
+        self._closed = False
+
+    @property
+    def frame_time(self):
+        return 1.0 / self.fps
+
+    @property
+    def full(self):
+        return self.limit is not None and self.requested >= self.limit
+
+    @property
+    def written(self):
+        return self._writer.written
+
+    # Create the GL objects; called after each set_mode(), since a new window
+    #   may come with a new context
+    def start(self):
+        if self.offscreen:
+            self.target = RenderTarget(self.width, self.height)
+            self.target.bind()
+        self._pbos = list(np.atleast_1d(glGenBuffers(self.buffers)))
+        for pbo in self._pbos:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.width * self.height * 4, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._next = 0
+
+    # Queue the readback of the frame just drawn; call before the buffer swap
+    def capture(self):
+        if self.full or not self._pbos:
+            return
+        pbo = self._pbos[self._next]
+        self._next = (self._next + 1) % len(self._pbos)
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        if self.target is None:
+            glReadBuffer(GL_BACK)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._pending.append(pbo)
+        self.requested += 1
+        if len(self._pending) >= len(self._pbos):
+            self._collect()
+
+    # Copy the oldest finished readback out and hand it to the writer
+    def _collect(self):
+        pbo = self._pending.popleft()
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, pbo)
+        pointer = glMapBuffer(GL_PIXEL_PACK_BUFFER, GL_READ_ONLY)
+        pixels = ctypes.string_at(pointer, self.width * self.height * 4)
+        glUnmapBuffer(GL_PIXEL_PACK_BUFFER)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self._writer.put(pixels)
+
+    # Finish the readbacks in flight and free the GL objects
+    def stop(self):
+        while self._pending:
+            self._collect()
+        if self._pbos:
+            glDeleteBuffers(len(self._pbos), self._pbos)
+            self._pbos = []
+        if self.target is not None:
+            self.target.unbind()
+            self.target.release()
+            self.target = None
+
+    # Stop and wait for every frame to be written; safe to call more than once
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self.stop()
+        self._writer.close()
+        print(f"Captured {self.written} frames to {self.path}")
+        if not self._writer.png:
+            print(f"  ffmpeg -f rawvideo -pix_fmt rgba -s {self.width}x{self.height} "
+                  f"-r {self.fps} -i {self.path} video.mp4")
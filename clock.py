@@ -0,0 +1,70 @@
+import time
+
+########################################### Game Clock ####################################################
+# Monotonic clock for the game loop
+#   tick() returns the scaled time since the previous tick; nothing accumulates
+#   while the clock is paused, and single frames longer than max_frame (window
+#   drags, breakpoints) are clamped so the simulation never has to catch up on them.
+#   frame_time: every tick counts as exactly this long instead, e.g. when
+#   frames are captured and must not depend on how fast they were drawn
+class GameClock:
+    def __init__(self, time_scale=1.0, max_frame=0.25, frame_time=None):
+        self.time_scale = time_scale
+        self.max_frame = max_frame
+        self.frame_time = frame_time
+        self.paused = False
+        self.time = 0.0 # scaled time elapsed while running
+        self._last = time.perf_counter()
+
+    def tick(self):
+        now = time.perf_counter()
+        frame = min(now - self._last, self.max_frame)
+        if self.frame_time is not None:
+            frame = self.frame_time
+        self._last = now
+        if self.paused:
+            return 0.0
+        dt = frame * self.time_scale
+        self.time += dt
+        return dt
+
+    def set_paused(self, paused):
+        if paused != self.paused:
+            self.paused = paused
+            # Restart the frame measurement so the paused span is never counted
+            self._last = time.perf_counter()
+
+    def pause(self):
+        self.set_paused(True)
+
+    def resume(self):
+        self.set_paused(False)
+
+# Fixed-timestep accumulator
+#   advance() converts variable frame time into a whole number of simulation
+#   steps of length dt; the leftover fraction (alpha) is used to interpolate
+#   rendering between the previous and current simulation states.
+class FixedStep:
+    def __init__(self, dt, max_steps=25):
+        self.dt = dt
+        self.max_steps = max_steps
+        self.accumulator = 0.0
+
+    def advance(self, frame_time):
+        self.accumulator += frame_time
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_steps:
+            # Too far behind: drop the backlog rather than spiral
+            steps = self.max_steps
+            self.accumulator = 0.0
+        else:
+            self.accumulator -= steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        return self.accumulator / self.dt
+
+# Linear interpolation between two simulation states for rendering
+def lerp(previous, current, alpha):
+    return previous + (current - previous) * alpha
@@ -0,0 +1,205 @@
+import numpy as np
+
+########################################### Batched AABB Tests ####################################################
+# Vectorized version of obstacles.collisionTest_AABBs
+#   mins, maxs: (..., 3) arrays of boxes tested against box_min/box_max (broadcast)
+#   Returns a boolean mask over the leading axes (touching boxes count as overlapping)
+def overlap_mask(mins, maxs, box_min, box_max):
+    return np.all((maxs >= box_min) & (mins <= box_max), axis=-1)
+
+# Vectorized version of obstacles.collisionTest_swept_AABBs
+#   The box (box_min, box_max) moves by delta (broadcast like box_min)
+#   Returns the earliest time in [0, 1] it touches each of the boxes, as a
+#   fraction of delta (0 if they already overlap), and inf where it does not
+def sweep_times(mins, maxs, box_min, box_max, delta):
+    delta = np.asarray(delta, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t0 = (mins - box_max) / delta
+        t1 = (maxs - box_min) / delta
+    moving = delta != 0
+    # Axes without motion overlap for the whole step or never
+    still = (maxs >= box_min) & (mins <= box_max)
+    enter = np.where(moving, np.minimum(t0, t1), np.where(still, -np.inf, np.inf))
+    leave = np.where(moving, np.maximum(t0, t1), np.where(still, np.inf, -np.inf))
+    enter = np.maximum(enter.max(axis=-1), 0.0)
+    leave = np.minimum(leave.min(axis=-1), 1.0)
+    return np.where(enter <= leave, enter, np.inf)
+
+########################################### Collision Index ####################################################
+# Struct-of-arrays store of instance AABBs sharing one mesh, with a uniform
+#   (lane, z) grid so a query only tests boxes near the car.
+#   Every instance gets a stable slot; removal clears its alive flag and puts
+#   the slot on a free list for reuse, so nothing is shifted or re-indexed.
+class CollisionIndex:
+    def __init__(self, local_min, local_max, places=(), cell_size=(10.0, 20.0)):
+        self.local_min = np.asarray(local_min, dtype=float)
+        self.local_max = np.asarray(local_max, dtype=float)
+        self.cell_x, self.cell_z = cell_size
+
+        self.count = 0 # number of slots handed out (alive or not)
+        self.positions = np.zeros((0, 3))
+        self.mins = np.zeros((0, 3))
+        self.maxs = np.zeros((0, 3))
+        self.alive = np.zeros(0, dtype=bool)
+
+        self._free = []         # dead slots available for reuse
+        self._cells = {}        # (ix, iz) -> list of slots registered in that cell
+        self.add_many(places)
+
+    def __len__(self):
+        return self.count - len(self._free)
+
+    def _grow(self, needed=1):
+        capacity = max(16, 2 * len(self.alive), self.count + needed)
+        for name in ('positions', 'mins', 'maxs'):
+            array = np.zeros((capacity, 3))
+            array[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, array)
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self.count] = self.alive[:self.count]
+        self.alive = alive
+
+    # Grid cells covered by the box's x and z ranges
+    def _cell_keys(self, box_min, box_max):
+        x0, x1 = int(box_min[0] // self.cell_x), int(box_max[0] // self.cell_x)
+        z0, z1 = int(box_min[2] // self.cell_z), int(box_max[2] // self.cell_z)
+        return [(ix, iz) for ix in range(x0, x1 + 1) for iz in range(z0, z1 + 1)]
+
+    # Place an instance at the given position and return its slot
+    def add(self, position):
+        if self._free:
+            slot = self._free.pop()
+            # Unregister the recycled slot from the cells of its previous life,
+            #   which its bounds still describe
+            for key in self._cell_keys(self.mins[slot], self.maxs[slot]):
+                cell = self._cells[key]
+                cell.remove(slot)
+                if not cell:
+                    del self._cells[key] # keeps the grid bounded on streamed tracks
+        else:
+            if self.count == len(self.alive):
+                self._grow()
+            slot = self.count
+            self.count += 1
+
+        self.positions[slot] = position
+        self.mins[slot] = self.local_min + position
+        self.maxs[slot] = self.local_max + position
+        self.alive[slot] = True
+
+        for key in self._cell_keys(self.mins[slot], self.maxs[slot]):
+            self._cells.setdefault(key, []).append(slot)
+        return slot
+
+    # Bulk version of add for fresh slots, used when building a whole track
+    #   Every (slot, cell) pair is made with numpy and sorted by cell, so the
+    #   Python loop runs once per grid cell instead of once per box
+    def add_many(self, positions):
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        n = len(positions)
+        if self.count + n > len(self.alive):
+            self._grow(n)
+        slots = np.arange(self.count, self.count + n)
+        self.count += n
+        self.positions[slots] = positions
+        self.mins[slots] = positions + self.local_min
+        self.maxs[slots] = positions + self.local_max
+        self.alive[slots] = True
+        if n == 0:
+            return slots
+
+        x0 = (self.mins[slots, 0] // self.cell_x).astype(np.int64)
+        z0 = (self.mins[slots, 2] // self.cell_z).astype(np.int64)
+        nx = (self.maxs[slots, 0] // self.cell_x).astype(np.int64) - x0 + 1
+        nz = (self.maxs[slots, 2] // self.cell_z).astype(np.int64) - z0 + 1
+        spans = nx * nz
+        box = np.repeat(np.arange(n), spans)
+        step = np.arange(len(box)) - np.repeat(np.cumsum(spans) - spans, spans)
+        ix = x0[box] + step // nz[box]
+        iz = z0[box] + step % nz[box]
+        order = np.lexsort((box, iz, ix)) # by cell, then slot
+        ix, iz, pair_slots = ix[order], iz[order], slots[box[order]]
+        starts = np.flatnonzero(np.r_[True, (ix[1:] != ix[:-1]) | (iz[1:] != iz[:-1])])
+        ends = np.r_[starts[1:], len(order)]
+        cells = self._cells
+        pair_slots = pair_slots.tolist()
+        for key, start, end in zip(zip(ix[starts].tolist(), iz[starts].tolist()),
+                                   starts.tolist(), ends.tolist()):
+            cells.setdefault(key, []).extend(pair_slots[start:end])
+        return slots
+
+    # O(1): stale grid entries are filtered by the alive mask and cleaned on reuse
+    def remove(self, slot):
+        if self.alive[slot]:
+            self.alive[slot] = False
+            self._free.append(slot)
+
+    def alive_slots(self):
+        return np.flatnonzero(self.alive[:self.count])
+
+    # Slots registered in any grid cell touched by the box
+    def candidates(self, box_min, box_max):
+        slots = set()
+        for key in self._cell_keys(box_min, box_max):
+            slots.update(self._cells.get(key, ()))
+        return np.array(sorted(slots), dtype=np.intp)
+
+    # Slots of all live instances overlapping the box, in slot order
+    def query(self, box_min, box_max):
+        slots = self.candidates(box_min, box_max)
+        if len(slots) == 0:
+            return slots
+        slots = slots[self.alive[slots]]
+        hit = overlap_mask(self.mins[slots], self.maxs[slots], box_min, box_max)
+        return slots[hit]
+
+    # Lowest overlapping slot, or -1 if the box hits nothing
+    def first_hit(self, box_min, box_max):
+        hits = self.query(box_min, box_max)
+        return int(hits[0]) if len(hits) else -1
+
+    # First live instance the box touches while it moves by delta, and when
+    #   (see sweep_times); ties go to the lowest slot. (-1, inf) if none.
+    #   Only the cells under the box's whole path are searched.
+    def sweep(self, box_min, box_max, delta):
+        end_min, end_max = box_min + delta, box_max + delta
+        slots = self.candidates(np.minimum(box_min, end_min), np.maximum(box_max, end_max))
+        if len(slots):
+            slots = slots[self.alive[slots]]
+        if not len(slots):
+            return -1, np.inf
+        times = sweep_times(self.mins[slots], self.maxs[slots], box_min, box_max, delta)
+        first = int(times.argmin())
+        if np.isinf(times[first]):
+            return -1, np.inf
+        return int(slots[first]), float(times[first])
+
+    # Batched interface shared with simulation.DenseObstacles: each box moves
+    #   by its row of deltas, and the first live instance it touches is
+    #   removed. Returns (slots, times), see sweep(); (-1, inf) where none.
+    #   All boxes query this one index, so the game numbers are not needed
+    def sweep_hit(self, box_mins, box_maxs, deltas, games=None):
+        slots = np.full(len(box_mins), -1)
+        times = np.full(len(box_mins), np.inf)
+        for i in range(len(box_mins)):
+            slot, time = self.sweep(box_mins[i], box_maxs[i], deltas[i])
+            if slot >= 0:
+                self.remove(slot)
+                slots[i], times[i] = slot, time
+        return slots, times
+
+    # Remove every live instance each box touches while it moves by its row
+    #   of deltas, as repeated sweep_hit calls would; returns how many each
+    #   box touched
+    def sweep_collect(self, box_mins, box_maxs, deltas, games=None):
+        counts = np.zeros(len(box_mins), dtype=int)
+        for i in range(len(box_mins)):
+            end_min, end_max = box_mins[i] + deltas[i], box_maxs[i] + deltas[i]
+            slots = self.candidates(np.minimum(box_mins[i], end_min), np.maximum(box_maxs[i], end_max))
+            if len(slots):
+                slots = slots[self.alive[slots]]
+            times = sweep_times(self.mins[slots], self.maxs[slots], box_mins[i], box_maxs[i], deltas[i])
+            for slot in slots[np.isfinite(times)].tolist():
+                self.remove(slot)
+                counts[i] += 1
+        return counts
@@ -0,0 +1,54 @@
+import numpy as np
+
+########################################### View Frustum ####################################################
+def _normalize(v):
+    return v / np.linalg.norm(v)
+
+# Six inward-facing planes (n, d) of the volume seen by a gluLookAt camera with
+#   a gluPerspective projection; a point p is inside a plane when n·p + d >= 0.
+#   draw_distance, when given, pulls the far plane in.
+class Frustum:
+    def __init__(self, eye, look_at, up, fovy, aspect, near, far, draw_distance=None):
+        eye = np.asarray(eye, dtype=float)
+        forward = _normalize(np.asarray(look_at, dtype=float) - eye)
+        right = _normalize(np.cross(forward, up))
+        up = np.cross(right, forward)
+        if draw_distance is not None:
+            far = min(far, draw_distance)
+
+        half_v = np.tan(np.radians(fovy) / 2.0)
+        half_h = half_v * aspect
+        normals = [
+            forward,                                        # near
+            -forward,                                       # far
+            np.cross(forward - right * half_h, up),         # left
+            np.cross(up, forward + right * half_h),         # right
+            np.cross(right, forward - up * half_v),         # bottom
+            np.cross(forward + up * half_v, right),         # top
+        ]
+        normals = np.array([_normalize(n) for n in normals])
+        offsets = -normals @ eye # the four side planes pass through the eye
+        offsets[0] = -forward @ (eye + forward * near)
+        offsets[1] = forward @ (eye + forward * far)
+
+        self.eye = eye
+        self.far = far
+        self.normals = normals
+        self.offsets = offsets
+        # The frustum lies within the pyramid from the eye to the far corners
+        self.corners = np.array([eye] + [eye + far * (forward + right * sx * half_h + up * sy * half_v)
+                                         for sx in (-1, 1) for sy in (-1, 1)])
+
+    # Boolean mask of the axis-aligned boxes (N, 3) that intersect the frustum
+    #   (conservative: boxes near a frustum corner may be kept)
+    def visible(self, mins, maxs):
+        # For each plane test the box corner furthest along its normal
+        corners = np.where(self.normals[None] >= 0, maxs[:, None], mins[:, None])
+        distances = np.einsum('npk,pk->np', corners, self.normals) + self.offsets
+        return np.all(distances >= 0, axis=1)
+
+    # Clip a z interval of the track (start > end, e.g. the road lines) to the
+    #   z range covered by the frustum; returns start <= end when nothing is left
+    def clip_z(self, z_start, z_end):
+        z = self.corners[:, 2]
+        return min(z_start, float(z.max())), max(z_end, float(z.min()))
@@ -1,40 +1,53 @@
-import pygame, time
+import os, sys
+from startup import startup
+if '--startup-profile' in sys.argv:
+    startup.watch_imports()
+# Must be chosen before pygame and OpenGL are imported
+if '--offscreen' in sys.argv:
+    os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
+
+import argparse, pygame
 from sys import exit
-from pygame.locals import *
-from pygame.constants import *
-
-from OBJFileLoader import *
-from model import *
-from obstacles import *
+from pygame.locals import (DOUBLEBUF, OPENGL, QUIT, KEYDOWN, MOUSEMOTION, WINDOWMINIMIZED,
+                           WINDOWRESTORED, K_ESCAPE, K_LEFT, K_RIGHT, K_UP, K_DOWN)
+from OpenGL.GL import *
+from OpenGL.GLU import gluLookAt, gluPerspective
+
+from model import Car, Camera
+from obstacles import Obstacles, set_mesh_state
+from simulation import FINISH, SIM_RATE, RUNNING, WON, VIEW, GameState, step
+from clock import GameClock, FixedStep, lerp
+from profiler import FrameProfiler, ProfilerOverlay
+from culling import Frustum
+from track import TrackStreamer, track_rules
+from assets import AssetManager
+from replay import Replay, summary
+from capture import FrameCapture
+from inputs import Input
+from hud import Hud
+from glstate import render_state
+from renderqueue import render_queue
+import instancing
 
 import numpy as np
 
 width, height = 1200, 700 
 lane_size = 5
-
-class Timer:
-    def __init__(self, duration):
-        self.duration = duration
-        self.start_time = time.time()
-
-    def is_finished(self):
-        if self.start_time is None:
-            return False
-        return (time.time() - self.start_time) >= self.duration
-
-    def remaining_time(self):
-        if self.is_finished():
-            return 0
-        return int(max(0, self.duration - (time.time() - self.start_time)))+1
+fovy, near, far = 45.0, 0.1, 1000.0 # gluPerspective parameters, also used for culling
 
 ########################################### OpenGL Program ####################################################
-def drawRoad():
-    glLineWidth(15.0)
+# start/end: z range of the lane lines, clipped to the view when culling
+def drawRoad(start=50, end=-FINISH):
+    if start <= end:
+        return
+    render_state.disable(GL_TEXTURE_2D)
+    render_state.line_width(15.0)
+    render_state.color(0.7, 0.7, 0.7)
     glBegin(GL_LINES)
-    glColor3f(0.7, 0.7, 0.7)
     for i in range(-30, 30, 10):
-        glVertex3f(i+lane_size, 0.0, 50)
-        glVertex3f(i+lane_size, 0.0, -600)
+        glVertex3f(i+lane_size, 0.0, start)
+        glVertex3f(i+lane_size, 0.0, end)
     glEnd()
 
 def drawGround(victory):
@@ -43,31 +56,95 @@ def drawGround(victory):
                        [500, -12.6, 500],
                        [500, -12.6, -500]]
 
+    render_state.disable(GL_TEXTURE_2D)
     if victory:
-        glColor3f(0, 1, 0)
+        render_state.color(0, 1, 0)
     else:
-        glColor3f(1, 0, 0)
+        render_state.color(1, 0, 0)
     glBegin(GL_QUADS)
     for vertex in ground_vertices:
         glVertex3fv(vertex)
     glEnd()
 
-def finish(victory):
+# Progress bar for the loading screen, drawn in normalized window coordinates
+def drawLoadingBar(progress):
+    glMatrixMode(GL_PROJECTION)
+    glPushMatrix()
+    glLoadIdentity()
+    glOrtho(0, 1, 0, 1, -1, 1)
+    glMatrixMode(GL_MODELVIEW)
+    glPushMatrix()
+    glLoadIdentity()
+    glPushAttrib(GL_ENABLE_BIT)
+    glDisable(GL_LIGHTING)
+    glDisable(GL_DEPTH_TEST)
+    glDisable(GL_TEXTURE_2D)
+
+    glBegin(GL_QUADS)
+    glColor3f(0.2, 0.2, 0.2)
+    for x, y in ((0.2, 0.47), (0.8, 0.47), (0.8, 0.53), (0.2, 0.53)):
+        glVertex2f(x, y)
+    glColor3f(0.7, 0.7, 0.7)
+    right = 0.2 + 0.6 * progress
+    for x, y in ((0.2, 0.47), (right, 0.47), (right, 0.53), (0.2, 0.53)):
+        glVertex2f(x, y)
+    glEnd()
+
+    glPopAttrib()
+    glPopMatrix()
+    glMatrixMode(GL_PROJECTION)
+    glPopMatrix()
+    glMatrixMode(GL_MODELVIEW)
+
+# Show a loading screen until every asset is decoded and uploaded
+#   Redraws are capped at 60 fps so the decoding threads get the CPU
+def loading(assets):
+    assets.start()
+    pacer = pygame.time.Clock()
+    while not assets.done:
+        for e in pygame.event.get():
+            if e.type == QUIT:
+                exit()
+        progress = assets.pump()
+        pygame.display.set_caption(f'Driving Game - Loading {progress:.0%}')
+        glClearColor(0, 0, 0.3, 1)
+        glClear(GL_COLOR_BUFFER_BIT|GL_DEPTH_BUFFER_BIT)
+        drawLoadingBar(progress)
+        pygame.display.flip()
+        startup.mark('loading screen')
+        pacer.tick(60)
+
+# Histogram of input-to-present latency against a budget in ms; returns the
+#   exit status (1 if the 99th percentile is over budget)
+def latency_report(latency, budget):
+    if not len(latency):
+        print("No lane changes to measure")
+        return 0
+    print(latency.report())
+    p99 = latency.percentile(99)
+    print(f"Lane change latency p99 {p99:.1f} ms, budget {budget:g} ms"
+          + ("" if p99 <= budget else " - OVER BUDGET"))
+    return int(p99 > budget)
+
+# capture: FrameCapture the frames are read back into, see main()
+def finish(victory, profiler, assets, capture=None):
     print("Use the arrow keys to move the camera.")
     screen = pygame.display.set_mode((width, height), DOUBLEBUF | OPENGL)
+    if capture is not None:
+        capture.start()
     message = ""
     if victory:
         message = "You Won!"
-        pygame.mixer.Sound("resources/sounds/applause.mp3").play()
+        assets.sound('applause').play()
     else:
         message = "You Lose!"
-        pygame.mixer.Sound("resources/sounds/boo.mp3").play()
+        assets.sound('boo').play()
     glEnable(GL_LIGHTING)
     glEnable(GL_COLOR_MATERIAL)
     glViewport(0, 0, width, height)
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(45.0, width/height, 0.1, 1000.0)
+    gluPerspective(fovy, width/height, near, far)
 
     glMatrixMode(GL_MODELVIEW)
     initmodelMatrix = glGetFloatv(GL_MODELVIEW_MATRIX)
@@ -76,6 +153,14 @@ def finish(victory):
     camera = Camera(False)
     horizontal = 0
     zoom = 0
+    clock = GameClock(frame_time=capture.frame_time if capture else None)
+    overlay = ProfilerOverlay(profiler)
+    pygame.display.set_caption('Driving Game')
+    hud = Hud(width, height)
+    hud.field('message', '{}', width / 2, height / 4, (1.0, 0.85, 0.2), 2.0, 'center')
+    hud.set('message', message)
+    hud.field('hint', '{}', width / 2, height - 48, align='center')
+    hud.set('hint', "Arrow keys move the camera")
 
     glPushMatrix()
     # Light 0 - point light from above, left, front
@@ -97,60 +182,104 @@ def finish(victory):
     glLightfv(GL_LIGHT2, GL_DIFFUSE, (0.5, 0.5, 0.5, 1.0))
     glLightfv(GL_LIGHT2, GL_SPECULAR, (0.5, 0.5, 0.5, 1.0))
     glPopMatrix()
-
-    while True:
-        pygame.display.set_caption(message)
-        glPushMatrix()
-        glLoadIdentity()
+    inputs = Input()
+
+    # The screen is left through exit(); free what it made on the way out
+    try:
+        while True:
+            profiler.begin_frame()
+            render_state.begin_frame()
+            glPushMatrix()
+            glLoadIdentity()
         
-        for e in pygame.event.get():
-            if e.type == QUIT:
-                exit()
-            if e.type == MOUSEMOTION:
-                pass
-            if e.type == KEYDOWN:
-                if e.key == K_ESCAPE:
-                    exit()
-
-        if pygame.key.get_pressed()[K_LEFT]:
-            horizontal -= 1
-        if pygame.key.get_pressed()[K_RIGHT]:
-            horizontal += 1
-        if pygame.key.get_pressed()[K_UP]:
-            zoom += 1
-        if pygame.key.get_pressed()[K_DOWN]:
-            zoom -= 1
-
-        glMultMatrixf(modelMatrix)
-        modelMatrix = glGetFloatv(GL_MODELVIEW_MATRIX)
+            with profiler.scope('events'):
+                for _, e in inputs.poll():
+                    if e.type == QUIT:
+                        exit()
+                    if e.type == MOUSEMOTION:
+                        pass
+                    if e.type == KEYDOWN:
+                        if e.key == K_ESCAPE:
+                            exit()
+                        overlay.handle_key(e.key)
+
+            # Camera moves one unit per reference frame, independent of frame rate
+            frames = clock.tick() * SIM_RATE
+            if inputs.held(K_LEFT):
+                horizontal -= frames
+            if inputs.held(K_RIGHT):
+                horizontal += frames
+            if inputs.held(K_UP):
+                zoom += frames
+            if inputs.held(K_DOWN):
+                zoom -= frames
+
+            glMultMatrixf(modelMatrix)
+            modelMatrix = glGetFloatv(GL_MODELVIEW_MATRIX)
         
-        # draw mesh
-        glLoadIdentity()
+            # draw mesh
+            glLoadIdentity()
         
-        eye_pos = camera.rotate(horizontal, zoom)
+            eye_pos = camera.rotate(horizontal, zoom)
 
-        # Use updated camera parameters to update camera model
-        gluLookAt(*eye_pos, 0, 10, 0, 0, 1, 0)
+            # Use updated camera parameters to update camera model
+            gluLookAt(*eye_pos, 0, 10, 0, 0, 1, 0)
         
-        glClear(GL_COLOR_BUFFER_BIT|GL_DEPTH_BUFFER_BIT)
-        drawGround(victory)
-        car.jumpingCar(victory) # add losing animation
-
-        glPopMatrix()
-        pygame.display.flip()
-        pygame.time.wait(10)
-
-def main():
-    glutInit()
-
+            glClear(GL_COLOR_BUFFER_BIT|GL_DEPTH_BUFFER_BIT)
+            with profiler.scope('ground'):
+                drawGround(victory)
+            with profiler.scope('car'):
+                car.jumpingCar(victory) # add losing animation
+            profiler.count('gl calls', render_state.calls)
+            profiler.count('gl skipped', render_state.skipped)
+
+            glPopMatrix()
+            with profiler.scope('overlay'):
+                hud.draw()
+                overlay.draw(height)
+            if capture is not None:
+                with profiler.scope('capture'):
+                    capture.capture()
+            with profiler.scope('flip'):
+                pygame.display.flip()
+            profiler.end_frame()
+            if capture is not None and capture.full:
+                exit()
+    finally:
+        car.release()
+        hud.release()
+
+# draw_distance: obstacles and road further than this from the camera are not
+#   drawn; cull=False draws everything
+#   track_length: distance to the finish line, None for an endless track
+#   level: (cone places, coin places) to play instead of a generated track
+#   assets: AssetManager holding every model and sound; nothing is read from
+#   disk once the race starts
+#   recorder: replay.Replay the inputs and result are added to
+#   playback: replay.Replay whose inputs replace the keyboard's
+#   capture: FrameCapture every frame of the race is read back into; the game
+#   clock then advances a fixed time per frame. The loop exits once it is full.
+#   instanced: draw cones and coins with one instanced call per material when
+#   the driver supports it (see instancing)
+#   latency_budget: after the race, print the lane change latency histogram
+#   and exit (with status 1 if the 99th percentile is over this many ms)
+#   lod: draw distant cones and coins with simplified meshes (see obstacles.LOD_DISTANCES)
+def main(profiler, assets, time_scale=1.0, draw_distance=None, cull=True, track_length=FINISH,
+         rng=None, level=None, recorder=None, playback=None, capture=None, instanced=True,
+         latency_budget=None, lod=True):
     screen = pygame.display.set_mode((width, height), DOUBLEBUF | OPENGL)
+    startup.mark('window')
+    loading(assets)
+    startup.mark('assets')
+    if capture is not None:
+        capture.start()
 
     glEnable(GL_LIGHTING)
     glEnable(GL_COLOR_MATERIAL)
     glViewport(0, 0, width, height)
     glMatrixMode(GL_PROJECTION)
     glLoadIdentity()
-    gluPerspective(45.0, width/height, 0.1, 1000.0)
+    gluPerspective(fovy, width/height, near, far)
 
     glMatrixMode(GL_MODELVIEW)
     initmodelMatrix = glGetFloatv(GL_MODELVIEW_MATRIX)
@@ -165,78 +294,112 @@ def main():
     glLightfv(GL_LIGHT0, GL_DIFFUSE, (0.5, 0.5, 0.5, 1.0))
     glLightfv(GL_LIGHT0, GL_SPECULAR, (0.5, 0.5, 0.5, 1.0)) # softer white highlight
     glPopMatrix()
+    # Depth test and specular material for everything, not only what is drawn
+    #   after the first obstacle (the render queue may draw the car first)
+    set_mesh_state()
+    # The lights do not change during the race, so neither does the program
+    #   instanced obstacles are drawn with (None draws them one at a time)
+    program = instancing.program() if instanced else None
 
     # Sound Effects
-    coin = pygame.mixer.Sound("resources/sounds/coin.mp3")
-
-    # Movement Variables
-    movement    = 0 # initial position
-    lane        = 0 # initial lane
-    score       = 0 # initial score
-    speed       = 0 # initial speed
-    finish      = 600 # finish line
-    max_speed   = 2
-    acceleration= 0.03 
-    win         = 5 # number of coins to win
-
-    # Obstacle and Coin Positions
-    cone_places = [(np.random.randint(-2, 2)*10, 0, np.random.randint(-finish, 0)) for _ in range(10)]
-    coin_places = [(np.random.randint(-2, 2)*10, 5, np.random.randint(-finish, 0)) for _ in range(10)]
-
-    # Create objects
+    coin = assets.sound('coin')
+
+    # Create objects; cones and coins are placed by the track streamer as the
+    #   car approaches and recycled once they are behind it
     car = Car()
-    cones = Obstacles('traffic', cone_places)
-    coins = Obstacles('SimpleGoldCoin', coin_places, True)
-    camera = Camera(True, lane, movement) # default view mode is "front"
-    timer = Timer(30)
-    crashed = False
-    countdown = True
-    isPaused = False
-    crash_timer = None  # Timer to track crash duration
+    cones = Obstacles('traffic', lod=lod)
+    coins = Obstacles('SimpleGoldCoin', [], True, lod=lod)
+    track = TrackStreamer(cones.index, coins.index, rng or np.random.default_rng(), track_length,
+                          ahead=min(draw_distance or far, far), level=level)
+    track.update(0)
+    time_limit, win = track_rules(track_length)
+    state = GameState(cones.index, coins.index, finish=track.length,
+                      time_limit=time_limit, win=win) # game rules, see simulation.py
+    camera = Camera(True, 0, 0) # default view mode is "front"
+
+    # The rules advance in fixed steps of 1/SIM_RATE game seconds, however
+    #   long a frame takes; rendering interpolates between the last two steps
+    clock = GameClock(time_scale, frame_time=capture.frame_time if capture else None)
+    stepper = FixedStep(1.0 / SIM_RATE)
+    previous_movement = 0.0
+    inputs = Input()
+    tick = 0 # simulation steps taken, the time base of replays
+    overlay = ProfilerOverlay(profiler)
+    pygame.display.set_caption('Driving Game')
+    hud = Hud(width, height)
+    hud.field('coins', 'Coins: {}/{}', 16, 16)
+    hud.field('time', 'Time: {}', width - 16, 16, align='right')
+    hud.field('banner', '{}', width / 2, height / 3, (1.0, 0.85, 0.2), 2.0, 'center')
+    assets.seal()
     
     # main loop
     while True:
-        pygame.display.set_caption('Driving Game - Coins: '+str(score)
-                                   +' - Time: '+str(timer.remaining_time()))
-        bResetModelMatrix = False
+        profiler.begin_frame()
+        render_state.begin_frame()
         glPushMatrix()
         glLoadIdentity()
         
-        for e in pygame.event.get():
-            if e.type == QUIT:
-                exit()
-            if e.type == KEYDOWN:
-                if not crashed and not isPaused:
-                    # Turn left or right
-                    if e.key == K_RIGHT and lane < 20:
-                        car.turn('right')
-                        lane += 10
-                    elif e.key == K_LEFT and lane > -20:
-                        car.turn('left')
-                        lane -= 10
-                # Switch to first-person view
-                if e.key == K_SPACE:
-                    camera.switch_view()
-                elif e.key == K_p:
-                    isPaused = not isPaused
-                elif e.key == K_ESCAPE:
+        with profiler.scope('events'):
+            for stamp, e in inputs.poll():
+                if e.type == QUIT:
                     exit()
-
-        if crashed and crash_timer is None:
-            crash_timer = time.time()  # Start the crash timer
-            print("Crashed!")
-
-        if crash_timer is not None:
-            if time.time() - crash_timer >= 1:  # Check if 1 second has passed
-                crashed = False
-                crash_timer = None  # Reset the timer
-
-        # Check for collisions
-        crashed = cones.collision(np.array([lane, 0, -movement+4]), lane_size) or crashed
-        if coins.collision(np.array([lane, 5, -movement+2]), lane_size):
-            coin.play()
-            score += 1
-            print("Coin collected!")
+                # Don't count time while the window is minimized
+                if e.type == WINDOWMINIMIZED:
+                    clock.pause()
+                elif e.type == WINDOWRESTORED:
+                    clock.resume()
+                if e.type == KEYDOWN:
+                    action = inputs.action(e.key)
+                    if e.key == K_ESCAPE:
+                        exit()
+                    # Inputs come from the replay during playback
+                    elif playback is not None:
+                        overlay.handle_key(e.key)
+                    # Turn left or right, pause, or switch to first-person view
+                    #   (the view switches right away; the rules only record it)
+                    elif action is not None:
+                        if action == VIEW:
+                            camera.switch_view()
+                        inputs.queue(action, stamp)
+                    else:
+                        overlay.handle_key(e.key)
+
+        # Advance the game rules; queued inputs are applied on the first step
+        #   that runs, and kept for the next frame if no step is due yet
+        for _ in range(stepper.advance(clock.tick())):
+            if playback is not None:
+                actions = playback.actions_at(tick)
+                for _ in range(actions.count(VIEW)):
+                    camera.switch_view()
+            else:
+                actions = inputs.take()
+            previous_movement = state.movement[0]
+            # Includes the cone and coin collision checks
+            with profiler.scope('simulation'):
+                events = step(state, actions, stepper.dt)
+            if playback is None:
+                inputs.stepped(state.steered)
+            if recorder is not None:
+                recorder.record(tick, actions)
+            tick += 1
+            for event in events:
+                if event == "countdown":
+                    print(f"{int(np.ceil(state.countdown))}...")
+                elif event == "go":
+                    print("Go!")
+                elif event == "crash":
+                    print("Crashed!")
+                elif event == "coin":
+                    coin.play()
+                    print("Coin collected!")
+            if state.outcome[0] != RUNNING:
+                break
+        track.update(state.movement[0])
+        lane = state.lane[0]
+        movement = lerp(previous_movement, state.movement[0], stepper.alpha)
+        crashed = state.crashed[0]
+        while car.lane != lane:
+            car.turn('right' if lane > car.lane else 'left')
         
         # draw mesh
         glLoadIdentity()
@@ -249,38 +412,164 @@ def main():
                   new_lookat[0], new_lookat[1],new_lookat[2],
                   camera.view_up[0], camera.view_up[1], camera.view_up[2])
         
+        frustum = None
+        road = (50, -track.generated)
+        if cull:
+            with profiler.scope('culling'):
+                frustum = Frustum(new_eye_pos, new_lookat, camera.view_up,
+                                  fovy, width/height, near, far, draw_distance)
+                road = frustum.clip_z(*road)
+
         glClearColor(0, 0, 0.3, 1)
         glClear(GL_COLOR_BUFFER_BIT|GL_DEPTH_BUFFER_BIT)
-        drawRoad()
-        cones.drawMeshes()
-        coins.drawMeshes()
-        car.drawCar(movement, crashed)
-        # Check if player has won
-        if not isPaused:
-            if movement < finish and not crashed:
-                movement += speed
-            elif crashed:
-                speed = 0
-            elif movement >= finish and score >= win and not timer.is_finished():
-                print (score, win)
-                return True
-            elif movement >= finish and (score < win or timer.is_finished()):
-                return False
-            if speed < max_speed:
-                speed += acceleration
+        # Everything is queued first and drawn sorted by texture and color
+        with profiler.scope('queue'):
+            render_queue.begin_frame(new_eye_pos)
+            render_queue.add(drawRoad, *road)
+            cones.enqueue(render_queue, frustum, program)
+            coins.enqueue(render_queue, frustum, program)
+            render_queue.add(car.drawCar, movement, crashed, # includes the car's glutSwapBuffers
+                             depth=float(render_queue.depths([(car.lane, 0.0, -movement)])[0]))
+        profiler.count('drawn', cones.drawn + coins.drawn)
+        profiler.count('culled', cones.culled + coins.culled)
+        profiler.count('triangles', cones.triangles + coins.triangles)
+        with profiler.scope('draw'):
+            render_queue.flush()
+        profiler.count('draw calls', render_queue.draw_calls)
+        profiler.count('texture binds', render_queue.texture_binds)
+        profiler.count('material switches', render_queue.material_switches)
+        # Only worth summing while the profiler records it
+        if profiler.enabled and cones.instances is not None:
+            profiler.count('instance updates', sum(b.updates for b in cones.instances + coins.instances))
+        profiler.count('gl calls', render_state.calls)      # state calls the draw code made
+        profiler.count('gl skipped', render_state.skipped)  # of which were redundant
 
         glPopMatrix()
-        pygame.display.flip()
-        pygame.time.wait(10)
-        # countdown
-        if countdown:
-            for i in range(3, 0, -1):
-                print(f"{i}...")
-                time.sleep(1)
-            print("Go!")
-            countdown = False
+        with profiler.scope('overlay'):
+            hud.set('coins', state.score[0], state.win)
+            hud.set('time', state.remaining_time())
+            if state.paused[0]:
+                hud.set('banner', "PAUSED")
+            elif crashed:
+                hud.set('banner', "CRASHED!")
+            else:
+                hud.set('banner', int(np.ceil(state.countdown)) or '')
+            hud.draw()
+            overlay.draw(height)
+        profiler.count('hud rebuilds', hud.rebuilds)
+        if capture is not None:
+            with profiler.scope('capture'):
+                capture.capture()
+        inputs.pump() # stamp keys pressed while this frame was drawn
+        with profiler.scope('flip'):
+            pygame.display.flip()
+        inputs.presented()
+        if profiler.enabled and len(inputs.latency):
+            profiler.count('input p99 ms', int(inputs.latency.percentile(99)))
+        profiler.end_frame()
+        if capture is not None and capture.full:
+            exit()
+        if startup.enabled:
+            startup.mark('first frame')
+            exit(startup.report())
+
+        # Check if player has finished
+        if state.outcome[0] != RUNNING:
+            if state.outcome[0] == WON:
+                print (state.score[0], state.win)
+            if recorder is not None:
+                recorder.result = summary(state, tick)
+            if playback is not None:
+                playback.played = summary(state, tick)
+            if capture is not None:
+                capture.stop()
+            cones.release()
+            coins.release()
+            hud.release()
+            car.release()
+            if len(inputs.latency):
+                print(f"Lane change latency: {inputs.latency.summary()}")
+            if latency_budget is not None:
+                exit(latency_report(inputs.latency, latency_budget))
+            return state.outcome[0] == WON
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Highway Hop")
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help="game speed multiplier (e.g. 0.5 for slow motion)")
+    parser.add_argument('--profile', action='store_true',
+                        help="record frame timings from the start (F3 overlay, F4 dump)")
+    parser.add_argument('--draw-distance', type=float, default=None,
+                        help="don't draw obstacles further away than this (default: far plane)")
+    parser.add_argument('--no-cull', action='store_true',
+                        help="draw every obstacle, even outside the view")
+    parser.add_argument('--no-instancing', action='store_true',
+                        help="draw cones and coins one at a time instead of with instanced calls")
+    parser.add_argument('--no-lod', action='store_true',
+                        help="draw distant cones and coins at full detail")
+    parser.add_argument('--track-length', type=float, default=FINISH,
+                        help="distance to the finish line; time limit and coins to win scale with it")
+    parser.add_argument('--endless', action='store_true',
+                        help="no finish line: collect coins until time runs out")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the track layout")
+    parser.add_argument('--levels', help="play a random level from a pool made by levelgen.py")
+    parser.add_argument('--record', help="save the game's inputs to this replay file")
+    parser.add_argument('--startup-profile', action='store_true',
+                        help="report import and start-up times up to the first frame, then exit")
+    parser.add_argument('--startup-budget', type=float, default=None,
+                        help="with --startup-profile: exit with status 1 if the first frame "
+                             "takes longer than this many seconds")
+    parser.add_argument('--check-assets', action='store_true',
+                        help="fail if a resource is read from disk during the race instead of preloaded")
+    parser.add_argument('--latency-budget', type=float, default=None,
+                        help="after the race, print the lane change latency histogram and exit "
+                             "(with status 1 if the 99th percentile is over this many ms)")
+    parser.add_argument('--offscreen', action='store_true',
+                        help="render into an offscreen framebuffer without a window (EGL)")
+    parser.add_argument('--capture', help="save frames to a PNG sequence (a %%d pattern, "
+                                          "e.g. frames/%%05d.png) or a raw RGBA video file")
+    parser.add_argument('--capture-fps', type=int, default=60,
+                        help="with --capture: game time per frame is 1/this, however long drawing takes")
+    parser.add_argument('--frames', type=int, default=None,
+                        help="with --capture: exit after capturing this many frames")
+    args = parser.parse_args()
+    startup.stop_imports()
+    startup.budget = args.startup_budget
+    startup.mark('imports')
+
     pygame.init()
     pygame.font.init()
-    finish(main())
+    startup.mark('pygame.init')
+    profiler = FrameProfiler(enabled=args.profile)
+    if args.record and args.levels:
+        parser.error("--record only works with generated tracks")
+    # Every run gets a seed, so any game can be reproduced
+    seed = args.seed if args.seed is not None else int(np.random.SeedSequence().entropy % 2**63)
+    print(f"Track seed: {seed}")
+    rng = np.random.default_rng(seed)
+    track_length = None if args.endless else args.track_length
+    recorder = Replay(seed, track_length) if args.record else None
+    level = None
+    if args.levels:
+        from levelgen import load_pool
+        cones, coins, track_length = load_pool(args.levels)
+        pick = rng.integers(len(cones))
+        level = cones[pick], coins[pick]
+    if args.offscreen and not args.capture:
+        parser.error("--offscreen needs --capture")
+    capture = None
+    if args.capture:
+        capture = FrameCapture(args.capture, width, height, args.frames, args.capture_fps, args.offscreen)
+    assets = AssetManager(check_reads=args.check_assets)
+    try:
+        victory = main(profiler, assets, args.time_scale, args.draw_distance, not args.no_cull,
+                       track_length, rng, level, recorder, capture=capture,
+                       instanced=not args.no_instancing, latency_budget=args.latency_budget,
+                       lod=not args.no_lod)
+        if recorder is not None:
+            recorder.save(args.record)
+            print(f"Saved replay to {args.record}")
+        finish(victory, profiler, assets, capture)
+    finally:
+        if capture is not None:
+            capture.close()
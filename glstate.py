@@ -0,0 +1,77 @@
+from OpenGL.GL import *
+
+########################################### Render State ####################################################
+# Shadow copy of the GL state the draw code keeps setting: enable flags, the
+#   bound texture, material parameters, color, line width, shade model and
+#   front face. A call that would set what is already set is skipped, which
+#   matters because every PyOpenGL call costs microseconds of Python.
+#   The shadow is only right as long as that state is changed through here:
+#   invalidate() after anything else may have changed it (display lists,
+#   other modules), and begin_frame() starts each frame from a clean slate.
+#   calls counts the calls asked for (what used to be issued), issued the ones
+#   that reached GL.
+class RenderState:
+    def __init__(self):
+        self.calls = 0
+        self.issued = 0
+        self._state = {}    # (function, key) -> value last set
+
+    @property
+    def skipped(self):
+        return self.calls - self.issued
+
+    def _set(self, key, value):
+        self.calls += 1
+        if self._state.get(key, self) == value:
+            return False
+        self._state[key] = value
+        self.issued += 1
+        return True
+
+    def enable(self, cap):
+        if self._set(('enable', cap), True):
+            glEnable(cap)
+
+    def disable(self, cap):
+        if self._set(('enable', cap), False):
+            glDisable(cap)
+
+    def bind_texture(self, texid, target=GL_TEXTURE_2D):
+        if self._set(('texture', target), texid):
+            glBindTexture(target, texid)
+
+    # Material parameters other than the ones GL_COLOR_MATERIAL ties to
+    #   color() (ambient and diffuse, by default)
+    def material(self, face, pname, value):
+        if self._set(('material', face, pname), value):
+            if isinstance(value, (int, float)):
+                glMaterialf(face, pname, value)
+            else:
+                glMaterialfv(face, pname, value)
+
+    def color(self, r, g, b):
+        if self._set(('color',), (r, g, b)):
+            glColor3f(r, g, b)
+
+    def line_width(self, width):
+        if self._set(('line width',), width):
+            glLineWidth(width)
+
+    def shade_model(self, mode):
+        if self._set(('shade model',), mode):
+            glShadeModel(mode)
+
+    def front_face(self, mode):
+        if self._set(('front face',), mode):
+            glFrontFace(mode)
+
+    # Forget the shadow; the next call of each kind reaches GL again
+    def invalidate(self):
+        self._state.clear()
+
+    def begin_frame(self):
+        self.invalidate()
+        self.calls = 0
+        self.issued = 0
+
+render_state = RenderState()
@@ -0,0 +1,81 @@
+import argparse, time
+import numpy as np
+
+from simulation import *
+from levelgen import LaneGrid, generate, model_bounds
+
+# Runs the game rules without a window: many games are advanced in lockstep
+#   as one NumPy batch, driven by a scripted policy instead of the keyboard.
+#   python headless.py --games 10000 --batch 1000
+
+# Obstacle positions and alive flags as (games, count) arrays
+def _dense(obstacles):
+    if obstacles.positions.ndim == 3:
+        return obstacles.positions, obstacles.alive
+    count = getattr(obstacles, 'count', len(obstacles.positions))
+    return obstacles.positions[None, :count], obstacles.alive[None, :count]
+
+# Greedy driver: steer one lane per step towards the closest lane with no cone
+#   within look_ahead units, preferring lanes with a coin ahead
+def greedy_policy(state, look_ahead=40):
+    lanes = np.arange(-MAX_LANE, MAX_LANE + 1, LANE_WIDTH)
+    car_z = -state.movement[:, None]
+
+    # (games, lanes): lanes with a live obstacle within look_ahead of the car
+    def ahead(obstacles):
+        positions, alive = _dense(obstacles)
+        z = positions[..., 2]
+        near = alive & (z <= car_z + CAR_SIZE) & (z >= car_z - look_ahead)
+        games, columns = np.nonzero(near)
+        found = np.zeros((len(near), len(lanes)), dtype=bool)
+        found[games, np.broadcast_to(LaneGrid.lanes(positions), near.shape)[games, columns]] = True
+        return found
+
+    cost = np.abs(lanes[None, :] - state.lane[:, None]) / LANE_WIDTH
+    cost = cost + 100 * ahead(state.cones) - 10 * ahead(state.coins)
+    target = lanes[cost.argmin(axis=1)]
+    return np.where(target > state.lane, RIGHT, np.where(target < state.lane, LEFT, NONE))
+
+# Play a batch of games on random tracks until every game has finished
+#   The policy is consulted every `reaction` seconds, like a player's reaction time
+def run_batch(rng, games, policy=greedy_policy, dt=1.0 / SIM_RATE, finish=FINISH, reaction=0.05):
+    cone_places, coin_places = generate(rng, finish, games=games)
+    cones = DenseObstacles(*model_bounds('traffic'), cone_places)
+    coins = DenseObstacles(*model_bounds('SimpleGoldCoin'), coin_places)
+    state = GameState(cones, coins, games, finish=finish)
+
+    # The countdown has no gameplay effect, so it is consumed in a single step
+    step(state, [], state.countdown)
+    decide_every = max(1, round(reaction / dt))
+    steps = 0
+    while state.running.any():
+        inputs = [policy(state)] if steps % decide_every == 0 else []
+        step(state, inputs, dt)
+        steps += 1
+    return state
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate Highway Hop without a display.")
+    parser.add_argument('--games', type=int, default=10000, help="total games to simulate")
+    parser.add_argument('--batch', type=int, default=1000, help="games advanced together")
+    parser.add_argument('--dt', type=float, default=1.0 / SIM_RATE, help="seconds per step")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    wins = coins = crashes = played = 0
+    start = time.perf_counter()
+    while played < args.games:
+        batch = min(args.batch, args.games - played)
+        state = run_batch(rng, batch, dt=args.dt)
+        wins += int((state.outcome == WON).sum())
+        coins += int(state.score.sum())
+        crashes += int((~state.cones.alive).sum())
+        played += batch
+    seconds = time.perf_counter() - start
+
+    print(f"{played} games in {seconds:.2f} s ({played / seconds:.0f} games/s)")
+    print(f"won {wins / played:.1%}, {coins / played:.2f} coins and {crashes / played:.2f} cones hit per game")
+
+if __name__ == "__main__":
+    main()
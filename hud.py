@@ -0,0 +1,145 @@
+import pygame
+from OpenGL.GL import *
+
+GLYPHS = ''.join(chr(c) for c in range(32, 127)) # printable ASCII
+
+########################################### Glyph Atlas ####################################################
+# Every glyph of a font rendered once into one texture
+#   glyphs: character -> (advance, height, u0, v0, u1, v1); other characters
+#   are drawn as '?'
+class GlyphAtlas:
+    def __init__(self, size=32, columns=16):
+        font = pygame.font.Font(None, size) # pygame's own font, no system font lookup
+        surfaces = [font.render(ch, True, (255, 255, 255)) for ch in GLYPHS]
+        self.line_height = font.get_height()
+        cell_w = max(s.get_width() for s in surfaces) + 2 # 1 pixel gap around each glyph
+        cell_h = self.line_height + 2
+        rows = -(-len(GLYPHS) // columns)
+        self.width, self.height = columns * cell_w, rows * cell_h
+
+        # White glyphs, coverage in alpha; the text color comes from glColor
+        sheet = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
+        sheet.fill((255, 255, 255, 0))
+        self.glyphs = {}
+        for i, (ch, surface) in enumerate(zip(GLYPHS, surfaces)):
+            x, y = (i % columns) * cell_w + 1, (i // columns) * cell_h + 1
+            sheet.blit(surface, (x, y))
+            w, h = surface.get_size()
+            # Rows are uploaded bottom-up, so v counts from the bottom of the sheet
+            self.glyphs[ch] = (w, h, x / self.width, 1 - (y + h) / self.height,
+                               (x + w) / self.width, 1 - y / self.height)
+
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, self.texture)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, self.width, self.height, 0, GL_RGBA,
+                     GL_UNSIGNED_BYTE, pygame.image.tobytes(sheet, 'RGBA', True))
+        glBindTexture(GL_TEXTURE_2D, 0)
+
+    def glyph(self, ch):
+        return self.glyphs.get(ch) or self.glyphs['?']
+
+    # Width in pixels of a line of text at scale 1
+    def measure(self, text):
+        return sum(self.glyph(ch)[0] for ch in text)
+
+    def release(self):
+        glDeleteTextures(1, [self.texture])
+
+########################################### HUD ####################################################
+# Text drawn over the race in window pixels, as textured quads from a
+#   GlyphAtlas:
+#       hud.field('coins', 'Coins: {}/{}', 16, 16)
+#       hud.set('coins', score, win)  # every frame
+#       hud.draw()                    # every frame
+#   A field is only formatted again when its values change, and the quads are
+#   compiled into a display list that is only rebuilt when some field's text
+#   changed, so an unchanged HUD costs one glCallList a frame.
+#   x, y: position of the text's top edge from the window's top-left corner;
+#   align 'center' or 'right' puts x at the middle or the end of the text.
+#   An empty text hides the field.
+class Hud:
+    def __init__(self, width, height, atlas=None):
+        self.width = width
+        self.height = height
+        self.atlas = atlas or GlyphAtlas()
+        self.fields = {}    # name -> [format, x, y, color, scale, align, values, text]
+        self.list = glGenLists(1)
+        self.dirty = True
+        self.rebuilds = 0   # times the display list was compiled
+
+    def field(self, name, fmt, x, y, color=(1.0, 1.0, 1.0), scale=1.0, align='left'):
+        self.fields[name] = [fmt, x, y, color, scale, align, None, '']
+        self.dirty = True
+
+    def set(self, name, *values):
+        field = self.fields[name]
+        if values == field[6]:
+            return
+        field[6] = values
+        text = field[0].format(*values)
+        if text != field[7]:
+            field[7] = text
+            self.dirty = True
+
+    def _build(self):
+        glNewList(self.list, GL_COMPILE)
+        glBegin(GL_QUADS)
+        for fmt, x, y, color, scale, align, values, text in self.fields.values():
+            if not text:
+                continue
+            if align == 'center':
+                x -= self.atlas.measure(text) * scale / 2
+            elif align == 'right':
+                x -= self.atlas.measure(text) * scale
+            # A dark copy 2 pixels down and right keeps the text readable on any background
+            for offset, rgb in ((2 * scale, (0.0, 0.0, 0.0)), (0, color)):
+                glColor3f(*rgb)
+                left, top = x + offset, self.height - y - offset
+                for ch in text:
+                    advance, h, u0, v0, u1, v1 = self.atlas.glyph(ch)
+                    right, bottom = left + advance * scale, top - h * scale
+                    glTexCoord2f(u0, v0)
+                    glVertex2f(left, bottom)
+                    glTexCoord2f(u1, v0)
+                    glVertex2f(right, bottom)
+                    glTexCoord2f(u1, v1)
+                    glVertex2f(right, top)
+                    glTexCoord2f(u0, v1)
+                    glVertex2f(left, top)
+                    left = right
+        glEnd()
+        glEndList()
+        self.dirty = False
+        self.rebuilds += 1
+
+    # Draws over whatever is on screen; leaves the GL state as it found it
+    def draw(self):
+        if self.dirty:
+            self._build()
+        glMatrixMode(GL_PROJECTION)
+        glPushMatrix()
+        glLoadIdentity()
+        glOrtho(0, self.width, 0, self.height, -1, 1)
+        glMatrixMode(GL_MODELVIEW)
+        glPushMatrix()
+        glLoadIdentity()
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT | GL_TEXTURE_BIT | GL_CURRENT_BIT)
+        glDisable(GL_LIGHTING)
+        glDisable(GL_DEPTH_TEST)
+        glEnable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glBindTexture(GL_TEXTURE_2D, self.atlas.texture)
+        glTexEnvi(GL_TEXTURE_ENV, GL_TEXTURE_ENV_MODE, GL_MODULATE)
+        glCallList(self.list)
+        glPopAttrib()
+        glPopMatrix()
+        glMatrixMode(GL_PROJECTION)
+        glPopMatrix()
+        glMatrixMode(GL_MODELVIEW)
+
+    def release(self):
+        glDeleteLists(self.list, 1)
+        self.atlas.release()
@@ -0,0 +1,119 @@
+import time
+from collections import deque
+import numpy as np
+import pygame
+from pygame.locals import K_LEFT, K_RIGHT, K_SPACE, K_p
+
+from simulation import LEFT, RIGHT, PAUSE, VIEW
+
+# Keys that queue an action for the simulation
+BINDINGS = {K_LEFT: LEFT, K_RIGHT: RIGHT, K_SPACE: VIEW, K_p: PAUSE}
+LANE_CHANGES = (LEFT, RIGHT) # actions whose latency is measured
+
+########################################### Latency Histogram ####################################################
+# Latencies in 1 ms buckets up to `limit` ms, plus one bucket for anything longer
+class LatencyHistogram:
+    def __init__(self, limit=250):
+        self.limit = limit
+        self.counts = np.zeros(limit + 1, dtype=np.int64)
+        self.worst = 0.0 # ms
+
+    def __len__(self):
+        return int(self.counts.sum())
+
+    def add(self, seconds):
+        ms = seconds * 1000.0
+        self.counts[min(int(ms), self.limit)] += 1
+        self.worst = max(self.worst, ms)
+
+    # Upper edge (ms) of the bucket holding the p-th percentile
+    def percentile(self, p):
+        if not len(self):
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(self.counts), p / 100.0 * len(self)))
+        return round(min(bucket + 1.0, self.worst), 2)
+
+    def summary(self):
+        return {'count': len(self), 'p50_ms': self.percentile(50), 'p90_ms': self.percentile(90),
+                'p99_ms': self.percentile(99), 'max_ms': round(self.worst, 2)}
+
+    # Text histogram, one line per non-empty bucket
+    def report(self, width=40):
+        lines = []
+        peak = self.counts.max() or 1
+        for ms in np.flatnonzero(self.counts):
+            label = f">{self.limit}" if ms == self.limit else f"{ms}-{ms + 1}"
+            bar = '#' * max(1, int(width * self.counts[ms] / peak))
+            lines.append(f"{label:>8} ms {self.counts[ms]:6d} {bar}")
+        return "\n".join(lines)
+
+########################################### Input ####################################################
+# Keyboard input for the game loops
+#   Events are moved out of SDL's queue and timestamped by pump(), which is
+#   cheap enough to call more than once a frame (the game pumps again just
+#   before presenting, so a key pressed while a frame is drawn is stamped then
+#   rather than when the next frame starts). poll() does this once per frame
+#   and snapshots the keyboard state for held keys. Actions wait in a queue for
+#   the next simulation step; stepped() tells which lane changes the step
+#   actually made (one into a wall, while crashed or paused changes nothing on
+#   screen and is not measured), and presented() is called once the frame
+#   showing their effect is on screen and records how long each of those took,
+#   from its event to the end of pygame.display.flip().
+class Input:
+    def __init__(self, bindings=BINDINGS):
+        self.bindings = bindings
+        self.pressed = None     # pygame.key.get_pressed() of this frame
+        self.latency = LatencyHistogram()
+        self._events = []       # (time, event) not yet handed out
+        self._actions = deque() # (time, action) waiting for a simulation step
+        self._taken = []        # times of the actions last taken, None if not a lane change
+        self._applied = []      # times of lane changes stepped since the last present
+
+    def pump(self):
+        now = time.perf_counter()
+        for e in pygame.event.get():
+            self._events.append((now, e))
+
+    # Once per frame: returns the (time, event) pairs that arrived since the
+    #   last poll, oldest first
+    def poll(self):
+        self.pump()
+        self.pressed = pygame.key.get_pressed()
+        events, self._events = self._events, []
+        return events
+
+    def held(self, key):
+        return self.pressed[key]
+
+    # Action bound to a key, or None
+    def action(self, key):
+        return self.bindings.get(key)
+
+    def queue(self, action, stamp):
+        self._actions.append((stamp, action))
+
+    # Every queued action, for one simulation step
+    def take(self):
+        actions = []
+        self._taken = []
+        while self._actions:
+            stamp, action = self._actions.popleft()
+            self._taken.append(stamp if action in LANE_CHANGES else None)
+            actions.append(action)
+        return actions
+
+    # After stepping the actions from take(): steered holds, per action,
+    #   whether it changed lanes (simulation.GameState.steered)
+    def stepped(self, steered):
+        for stamp, moved in zip(self._taken, steered):
+            if stamp is not None and moved:
+                self._applied.append(stamp)
+        self._taken = []
+
+    # Call right after pygame.display.flip()
+    def presented(self):
+        if self._applied:
+            now = time.perf_counter()
+            for stamp in self._applied:
+                self.latency.add(now - stamp)
+            self._applied = []
@@ -0,0 +1,212 @@
+import ctypes
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.GL import shaders
+
+from glstate import render_state
+
+# Instanced drawing of Obstacles: every live instance of a group is drawn by
+#   one glDrawElementsInstanced per material of the shared mesh. The vertex
+#   shader places and spins each instance from a per-instance buffer and lights
+#   it like the fixed-function pipeline does (GL_COLOR_MATERIAL, smooth shading,
+#   default attenuation, no spotlights), so the pictures match the
+#   glTranslatef/glRotatef path. Needs GLSL 3.30 with the compatibility profile;
+#   available() is False otherwise and the game falls back to that path.
+#   The number of lights is compiled in, one program per count, so the light
+#   loop has a constant bound (a uniform bound made it several times slower
+#   on Mesa's software rasterizer).
+
+# Generic attribute locations, clear of the ones some drivers alias to
+#   gl_Vertex (0), gl_Normal (2), gl_Color (3) and gl_MultiTexCoord0 (8)
+SHOWN_LOCATION, INSTANCE_LOCATION = 6, 7
+
+VERTEX_SHADER = """
+#version 330 compatibility
+#define LIGHTS {lights}
+layout(location = 6) in float shown;    // 0 for hidden slots
+layout(location = 7) in vec4 instance;  // x, y, z, spin phase in degrees
+
+uniform bool spinning;
+uniform float spin;                     // degrees added to every phase
+
+out vec4 color;
+out vec2 uv;
+
+void main() {
+    // Hidden slots (dead, culled or at another level of detail) go outside the clip volume
+    if (shown == 0.0) {
+        gl_Position = vec4(0.0, 0.0, 2.0, 1.0);
+        return;
+    }
+    float angle = spinning ? radians(spin + instance.w) : 0.0;
+    float c = cos(angle), s = sin(angle);
+    mat3 turn = mat3(c, 0.0, -s, 0.0, 1.0, 0.0, s, 0.0, c); // glRotatef(angle, 0, 1, 0)
+
+    vec4 eye = gl_ModelViewMatrix * vec4(instance.xyz + turn * gl_Vertex.xyz, 1.0);
+    gl_Position = gl_ProjectionMatrix * eye;
+    vec3 normal = gl_NormalMatrix * (turn * gl_Normal);
+
+    vec4 lit = gl_FrontMaterial.emission + gl_Color * gl_LightModel.ambient;
+    for (int i = 0; i < LIGHTS; i++) {         // GL_LIGHT0 .. LIGHTS - 1 are enabled
+        vec4 position = gl_LightSource[i].position;
+        vec3 to_light = normalize(position.xyz - eye.xyz * position.w);
+        float diffuse = max(dot(normal, to_light), 0.0);
+        lit += gl_Color * (gl_LightSource[i].ambient + diffuse * gl_LightSource[i].diffuse);
+        if (diffuse > 0.0) {
+            vec3 half_vector = normalize(to_light + vec3(0.0, 0.0, 1.0));
+            lit += pow(max(dot(normal, half_vector), 0.0), gl_FrontMaterial.shininess)
+                   * gl_FrontMaterial.specular * gl_LightSource[i].specular;
+        }
+    }
+    color = clamp(vec4(lit.rgb, gl_Color.a), 0.0, 1.0);
+    uv = gl_MultiTexCoord0.xy;
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330 compatibility
+in vec4 color;
+in vec2 uv;
+
+uniform sampler2D texture0;
+uniform bool textured;
+
+void main() {
+    gl_FragColor = textured ? color * texture(texture0, uv) : color;
+}
+"""
+
+########################################### Instance Program ####################################################
+UNIFORMS = ('spinning', 'spin', 'texture0', 'textured')
+
+_programs = {}  # number of lights -> program, 0 if it did not compile
+_uniforms = {}  # program -> {name: location}
+
+# The shared shader program for the lights currently enabled, compiled on
+#   first use (None if unsupported). Counting the lights costs a glIsEnabled
+#   per light, so look it up once when the lights are set, not per draw.
+def program(lights=None):
+    if lights is None:
+        lights = enabled_lights()
+    if lights not in _programs:
+        _programs[lights] = 0
+        if bool(glDrawElementsInstanced) and bool(glVertexAttribDivisor):
+            try:
+                vertex = shaders.compileShader(VERTEX_SHADER.replace('{lights}', str(lights)), GL_VERTEX_SHADER)
+                fragment = shaders.compileShader(FRAGMENT_SHADER, GL_FRAGMENT_SHADER)
+                prog = shaders.compileProgram(vertex, fragment, validate=False)
+                _uniforms[prog] = {name: glGetUniformLocation(prog, name) for name in UNIFORMS}
+                _programs[lights] = prog
+            except (RuntimeError, GLError) as e:
+                print(f"Instanced drawing unavailable: {str(e).splitlines()[0]}")
+    return _programs[lights] or None
+
+def available():
+    return program() is not None
+
+########################################### Instance Buffer ####################################################
+# Per-slot instance data of one Obstacles group, kept in step with its
+#   CollisionIndex. The index hands out stable slots, so the buffer is indexed
+#   by slot: each sync() compares the index with a copy of what was uploaded
+#   and sends only the entries that changed (objects added, collected or
+#   recycled by the track streamer, or shown and hidden by culling and levels
+#   of detail). Hidden slots stay in the buffer and are dropped by the vertex
+#   shader; only the span from the first to the last shown slot is drawn, as
+#   the slots in view are mostly neighbours along the track.
+#   Entries: x, y, z, spin phase (degrees), shown
+class InstanceBuffer:
+    def __init__(self):
+        self.buffer = glGenBuffers(1)
+        self.capacity = 0
+        self.count = 0              # slots in the buffer (shown or not)
+        self.shown = 0              # slots the shader does not drop
+        self.first = 0              # span of slots drawn, from the first to the last shown one
+        self.span = 0
+        self.uploaded = np.zeros((0, 5), dtype=np.float32)
+        self.updates = 0            # entries sent by the last sync
+
+    # Bring the buffer up to date with the index
+    #   shown: (index.count,) mask of the slots to draw, all alive (the
+    #   visible instances of one level of detail)
+    def sync(self, index, shown):
+        count = index.count
+        data = np.zeros((count, 5), dtype=np.float32)
+        data[:, :3] = index.positions[:count]
+        # Each slot has its own phase, so collecting a coin does not shift the others
+        data[:, 3] = (2 * np.arange(1, count + 1)) % 360
+        data[:, 4] = shown
+        shown_slots = np.flatnonzero(shown)
+        self.shown = len(shown_slots)
+        self.first = int(shown_slots[0]) if self.shown else 0
+        self.span = int(shown_slots[-1]) + 1 - self.first if self.shown else 0
+
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+        if count > self.capacity:
+            # Grow like the index does; the whole buffer is sent once
+            self.capacity = max(16, 2 * self.capacity, count)
+            full = np.zeros((self.capacity, 5), dtype=np.float32)
+            full[:count] = data
+            glBufferData(GL_ARRAY_BUFFER, full.nbytes, full, GL_DYNAMIC_DRAW)
+            self.updates = count
+        else:
+            same = min(len(self.uploaded), count)
+            changed = np.flatnonzero(np.any(data[:same] != self.uploaded[:same], axis=1))
+            changed = np.concatenate([changed, np.arange(same, count)])
+            self.updates = len(changed)
+            # One glBufferSubData per run of consecutive changed entries
+            breaks = np.flatnonzero(np.diff(changed) > 1) + 1
+            for run in np.split(changed, breaks) if len(changed) else ():
+                first, last = int(run[0]), int(run[-1]) + 1
+                glBufferSubData(GL_ARRAY_BUFFER, first * 20, (last - first) * 20, data[first:last])
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        self.uploaded = data
+        self.count = count
+
+    # Point the instance attributes at this buffer's first drawn slot (mesh
+    #   arrays bound)
+    def bind(self):
+        start = self.first * 20
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffer)
+        glEnableVertexAttribArray(SHOWN_LOCATION)
+        glVertexAttribPointer(SHOWN_LOCATION, 1, GL_FLOAT, GL_FALSE, 20, ctypes.c_void_p(start + 16))
+        glVertexAttribDivisor(SHOWN_LOCATION, 1)
+        glEnableVertexAttribArray(INSTANCE_LOCATION)
+        glVertexAttribPointer(INSTANCE_LOCATION, 4, GL_FLOAT, GL_FALSE, 20, ctypes.c_void_p(start))
+        glVertexAttribDivisor(INSTANCE_LOCATION, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def unbind(self):
+        glDisableVertexAttribArray(SHOWN_LOCATION)
+        glDisableVertexAttribArray(INSTANCE_LOCATION)
+
+    def release(self):
+        glDeleteBuffers(1, [self.buffer])
+
+# Draw one material (part) of every instance in a group, with the program
+#   current and the mesh's arrays bound (see Obstacles.enqueue)
+#   uniforms: (spinning, spin)
+#   lod: the mesh's level of detail to draw, see OBJ.make_lods
+def draw_instances(obj, instances, part, prog, uniforms, lod=0):
+    tex_id, color, offset, count = obj.lods[lod][part]
+    if not count or not instances.shown:
+        return
+    spinning, spin = uniforms
+    locations = _uniforms[prog]
+    glUniform1i(locations['spinning'], spinning)
+    glUniform1f(locations['spin'], spin)
+    glUniform1i(locations['texture0'], 0)
+    glUniform1i(locations['textured'], bool(tex_id))
+
+    render_state.front_face(GL_CCW)
+    render_state.bind_texture(tex_id or 0)
+    render_state.color(*color)
+    instances.bind()
+    glDrawElementsInstanced(GL_TRIANGLES, count, GL_UNSIGNED_INT, ctypes.c_void_p(offset), instances.span)
+    instances.unbind()
+
+# Number of lights enabled from GL_LIGHT0 on
+def enabled_lights():
+    count = 0
+    while count < 8 and glIsEnabled(GL_LIGHT0 + count):
+        count += 1
+    return count
@@ -0,0 +1,213 @@
+import argparse, os, time
+import numpy as np
+
+from simulation import *
+
+# Seedable level generator: cone and coin layouts that keep coins out of cones
+#   and are checked to be playable, generated in large NumPy batches so level
+#   pools can be baked ahead of time.
+#   python levelgen.py --levels 100000 --seed 1 --save levels.npz
+#   python levelgen.py --validate levels.npz
+#   Positions are in the game's world units: lanes along x, the track along -z.
+
+MODEL_DIR = "./resources/models"
+LANES = np.arange(-MAX_LANE, MAX_LANE + 1, LANE_WIDTH)
+REACTION = 0.1 # seconds between two lane changes of a player
+
+_bounds = {}
+def model_bounds(name):
+    if name not in _bounds:
+        _bounds[name] = obj_bounds(os.path.join(MODEL_DIR, name + ".obj"))
+    return _bounds[name]
+
+# Range of the car's movement (distance travelled) during which it touches an
+#   object d units down the track, as offsets from d; see simulation.car_box
+def contact_range(bounds, offset):
+    local_min, local_max = bounds
+    half = CAR_SIZE / 2.0
+    return offset - half - local_max[2], offset + half - local_min[2]
+
+########################################### Lane Grid ####################################################
+# The track is cut into rows the car crosses in one reaction time at top
+#   speed; the player can move at most one lane per row, which is the worst case
+#   since a slower car has more time per row. A (games, rows, lanes) grid
+#   of cells serves as the spatial hash for placement and reachability checks.
+class LaneGrid:
+    def __init__(self, finish=FINISH, start=0, reaction=REACTION):
+        self.start = start
+        self.row = MAX_SPEED * SIM_RATE * reaction
+        self.rows = int(np.ceil((finish - start) / self.row)) + 1
+        self.cone_range = contact_range(model_bounds('traffic'), CONE_OFFSET)
+        coin_range = contact_range(model_bounds('SimpleGoldCoin'), COIN_OFFSET)
+        self.coin_middle = (coin_range[0] + coin_range[1]) / 2.0
+
+    def _rows(self, distance):
+        rows = np.floor((distance - self.start) / self.row).astype(int)
+        return np.clip(rows, 0, self.rows - 1)
+
+    @staticmethod
+    def lanes(places):
+        return np.rint(places[..., 0] / LANE_WIDTH).astype(int) + MAX_LANE // LANE_WIDTH
+
+    # Cells where the car would touch a cone: (games, rows, lanes) bool
+    def blocked(self, cones):
+        games = np.arange(len(cones))[:, None]
+        lanes = self.lanes(cones)
+        first = self._rows(-cones[..., 2] + self.cone_range[0])
+        last = self._rows(-cones[..., 2] + self.cone_range[1])
+        grid = np.zeros((len(cones), self.rows, len(LANES)), dtype=bool)
+        for k in range(int((last - first).max(initial=0)) + 1):
+            grid[games, np.minimum(first + k, last), lanes] = True
+        return grid
+
+    # Cell where each coin is collected: (games, count) row indices
+    def coin_rows(self, coins):
+        return self._rows(-coins[..., 2] + self.coin_middle)
+
+########################################### Validation ####################################################
+# Playability of a batch of layouts (games, count, 3)
+#   start_lanes: lanes the car may occupy when entering the track, default the centre
+#   start_best: instead of start_lanes, the most coins a run can have collected
+#   on its way into each lane of the section, (len(LANES),) with -1 where the
+#   car cannot enter; this carries the check across consecutive sections
+#   Returns (reachable, best, end_best): which coins can be reached without
+#   touching a cone, the most coins one cone-free run can collect (start_best
+#   included) and that number for each lane the car reaches `finish` in
+#   (games, len(LANES)), -1 where it cannot. end_best is taken after the last
+#   row before `finish`, so it continues into the next section's first row
+#   exactly as one longer track would (see generate).
+def check(cones, coins, finish=FINISH, start=0, reaction=REACTION, start_lanes=(0,), start_best=None):
+    grid = LaneGrid(finish, start, reaction)
+    blocked = grid.blocked(cones)
+    games = np.arange(len(coins))[:, None]
+    rows, lanes = grid.coin_rows(coins), grid.lanes(coins)
+    counts = np.zeros(blocked.shape, dtype=int)
+    np.add.at(counts, (np.broadcast_to(games, rows.shape), rows, lanes), 1)
+
+    # reach: lanes the car can be in during a row; best: most coins collected
+    #   on the way there (-1 where the cell cannot be reached)
+    if start_best is None:
+        start_best = np.full(len(LANES), -1)
+        start_best[np.searchsorted(LANES, start_lanes)] = 0
+    best = np.tile(start_best, (len(coins), 1))
+    reach = best >= 0
+    reach_rows = np.empty(blocked.shape, dtype=bool)
+    end_best = best
+    for r in range(grid.rows):
+        moved = reach.copy()
+        moved[:, 1:] |= reach[:, :-1]
+        moved[:, :-1] |= reach[:, 1:]
+        reach = moved & ~blocked[:, r]
+        reach_rows[:, r] = reach
+
+        came = best.copy()
+        came[:, 1:] = np.maximum(came[:, 1:], best[:, :-1])
+        came[:, :-1] = np.maximum(came[:, :-1], best[:, 1:])
+        best = np.where(reach, came + counts[:, r], -1)
+        if r == grid.rows - 2:
+            end_best = best
+
+    reachable = reach_rows[games, rows, lanes]
+    return reachable, best.max(axis=1), end_best
+
+# Layouts where every coin is reachable, the end of the track can be reached
+#   without a crash and one run can collect `win` coins (counting start_best)
+def validate(cones, coins, finish=FINISH, start=0, reaction=REACTION, start_lanes=(0,), win=WIN_COINS,
+             start_best=None):
+    reachable, best, end_best = check(cones, coins, finish, start, reaction, start_lanes, start_best)
+    return reachable.all(axis=1) & (end_best >= 0).any(axis=1) & (best >= win)
+
+########################################### Generation ####################################################
+# Random layouts like simulation.random_layout that pass validate()
+#   Cones are kept far enough inside [start, finish] that they cannot be hit
+#   outside it and coins are collected before finish, so consecutive sections
+#   check like one track (see check's start_best); coins are resampled until
+#   none sits in a cell a cone touches or shares a cell with another coin, and
+#   layouts failing the playability checks are redrawn.
+#   Same shapes as random_layout: (count, 3) or (games, count, 3)
+def generate(rng, finish=FINISH, count=10, games=None, start=0, reaction=REACTION,
+             start_lanes=(0,), win=WIN_COINS, max_tries=100, start_best=None):
+    n = 1 if games is None else games
+    cones = np.empty((n, count, 3))
+    coins = np.empty((n, count, 3))
+    grid = LaneGrid(finish, start, reaction)
+    cone_start = start + int(np.ceil(-grid.cone_range[0]))
+    cone_finish = finish - int(np.ceil(grid.cone_range[1]))
+    coin_finish = finish - int(np.floor(grid.coin_middle)) - 1
+    todo = np.arange(n)
+    for _ in range(max_tries):
+        cone_places = random_layout(rng, cone_finish, count, len(todo), cone_start)[0]
+        coin_places = random_layout(rng, coin_finish, count, len(todo), start)[1]
+        blocked = grid.blocked(cone_places)
+        index = np.arange(len(todo))[:, None]
+        for _ in range(max_tries):
+            rows, lanes = grid.coin_rows(coin_places), grid.lanes(coin_places)
+            cells = (rows * len(LANES) + lanes)
+            order = np.argsort(cells, axis=1, kind='stable')
+            ordered = np.take_along_axis(cells, order, axis=1)
+            repeated = np.zeros(cells.shape, dtype=bool)
+            np.put_along_axis(repeated, order[:, 1:], ordered[:, 1:] == ordered[:, :-1], axis=1)
+            bad = blocked[index, rows, lanes] | repeated
+            if not bad.any():
+                break
+            coin_places[bad] = random_layout(rng, coin_finish, int(bad.sum()), start=start)[1]
+
+        ok = validate(cone_places, coin_places, finish, start, reaction, start_lanes, win,
+                      start_best) & ~bad.any(axis=1)
+        cones[todo[ok]] = cone_places[ok]
+        coins[todo[ok]] = coin_places[ok]
+        todo = todo[~ok]
+        if len(todo) == 0:
+            break
+    else:
+        raise RuntimeError(f"no playable layout of {count} cones/coins over {finish - start} units "
+                           f"after {max_tries} tries")
+
+    if games is None:
+        return cones[0], coins[0]
+    return cones, coins
+
+########################################### Level Pools ####################################################
+def save_pool(path, cones, coins, finish=FINISH, seed=None):
+    np.savez_compressed(path, cones=cones, coins=coins, finish=finish,
+                        seed=-1 if seed is None else seed)
+
+# Returns (cones, coins, finish) with cones/coins of shape (levels, count, 3)
+def load_pool(path):
+    data = np.load(path)
+    return data['cones'], data['coins'], float(data['finish'])
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and check Highway Hop level pools.")
+    parser.add_argument('--levels', type=int, default=10000, help="levels to generate")
+    parser.add_argument('--batch', type=int, default=10000, help="levels generated together")
+    parser.add_argument('--finish', type=int, default=FINISH, help="track length")
+    parser.add_argument('--count', type=int, default=10, help="cones and coins per level")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--save', help="write the pool to this .npz file")
+    parser.add_argument('--validate', help="check an existing pool instead of generating one")
+    args = parser.parse_args()
+
+    if args.validate:
+        cones, coins, finish = load_pool(args.validate)
+        start = time.perf_counter()
+        valid = validate(cones, coins, finish)
+        seconds = time.perf_counter() - start
+        print(f"{valid.sum()}/{len(valid)} levels valid ({len(valid) / seconds:.0f} levels/s)")
+        return
+
+    rng = np.random.default_rng(args.seed)
+    batches = []
+    start = time.perf_counter()
+    for first in range(0, args.levels, args.batch):
+        batches.append(generate(rng, args.finish, args.count, min(args.batch, args.levels - first)))
+    seconds = time.perf_counter() - start
+    cones = np.concatenate([b[0] for b in batches])
+    coins = np.concatenate([b[1] for b in batches])
+    print(f"{len(cones)} levels in {seconds:.2f} s ({len(cones) / seconds:.0f} levels/s)")
+    if args.save:
+        save_pool(args.save, cones, coins, args.finish, args.seed)
+        print(f"Saved to {args.save}")
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,21 @@
+import math
 import pygame
 from OpenGL.GL import *
-from OpenGL.GLUT import *
 from OpenGL.GLU import *
 import numpy as np
 
-#      Construct a 3x3 rotation matrix (no need Homogeneous) and multiply it with the input vector
+from startup import glut
+from transforms import rotate_point
+from glstate import render_state
+
+#      Rotate a 3-vector around one axis
 #      rot_axis: "X", "Y", or "Z"
-#      Return the rotated vector.
+#      Return the rotated vector (see transforms.rotate_point).
 def rotate_vector(vector, angle_degrees, rot_axis):
-    # Convert angle degrees to radians
-    radians = np.radians(angle_degrees)
-
-    # Construct a 3x3 rotation matrix using np.array based on angle and rotation axis
-    if rot_axis == "Y":
-        R = np.array([[np.cos(radians), 0, np.sin(radians)],
-                    [0, 1, 0],
-                    [-np.sin(radians), 0, np.cos(radians)]])
-        rotate_vector = np.dot(R, vector)
-    elif rot_axis == "X":
-        R = np.array([[1, 0, 0],
-                    [0, np.cos(radians), -np.sin(radians)],
-                    [0, np.sin(radians), np.cos(radians)]])
-        rotate_vector = np.dot(R, vector)
-    elif rot_axis == "Z":
-        R = np.array([[np.cos(radians), np.sin(radians), 0],
-                    [-np.sin(radians), np.cos(radians), 0],
-                    [0, 0, 1]])
-        rotate_vector = np.dot(R, vector)
-
-    return rotate_vector
+    # This file's Z rotation has always turned the other way round
+    if rot_axis == "Z":
+        angle_degrees = -angle_degrees
+    return rotate_point(vector, angle_degrees, rot_axis)
 
 class Camera:
     def __init__(self, run, lane=0, movement=0):
@@ -56,7 +43,7 @@ class Camera:
         new_eye_pos = self.look_at - gaze_vector
 
         ## calculate new eye position by moving the camera along the gaze vector by zoom_distance
-        gaze_vector_unit = gaze_vector / np.linalg.norm(gaze_vector)
+        gaze_vector_unit = gaze_vector / math.hypot(*gaze_vector)
 
         new_eye_pos += gaze_vector_unit * zoom
 
@@ -113,41 +100,76 @@ class Car:
         self.steer = 0.0
         self.lane = 0.0 # lane position
         self.car_speed = 0.0
+        self.lists = None # display lists, compiled on first draw
+
+    # Compile the car's parts into display lists once, so a frame only applies
+    #   per-frame transforms (steer, wheel spin, crash spin) and calls the lists
+    #   instead of re-tessellating GLU/GLUT shapes
+    def build_lists(self):
+        quadric = gluNewQuadric()
+        self.lists = {}
+
+        # Green cockpit sphere
+        self.lists['cockpit'] = glGenLists(1)
+        glNewList(self.lists['cockpit'], GL_COMPILE)
+        glColor3f(0, 1, 0)
+        gluSphere(quadric, 3, 32, 32)
+        glEndList()
+
+        # Blue cuboid 10 × 7 × 5 made from a unit cube
+        self.lists['body'] = glGenLists(1)
+        glNewList(self.lists['body'], GL_COMPILE)
+        glPushMatrix()
+        glColor3f(0.0, 0.0, 1.0)          # blue
+        glScalef(*self.car_body)          # length, height, width
+        glut().glutSolidCube(1.0)
+        glPopMatrix()
+        glEndList()
+
+        # Yellow torus wheel with an orange cap on its +Z side, the outer side
+        #   of a right wheel; left wheels draw it turned round (see draw_wheel_core)
+        self.lists['wheel'] = glGenLists(1)
+        glNewList(self.lists['wheel'], GL_COMPILE)
+        glPushMatrix()
+        glScalef(1, 0.8, 1.2)
+        glColor3f(1.0, 1.0, 0.0)          # yellow
+        glut().glutSolidTorus(self.wheel_radius-1, self.wheel_radius, 32, 32)
+        glColor3f(1.0, 0.5, 0.0)
+        glTranslatef(0.0, 0.0, 1)
+        gluDisk(quadric, 0.0, self.wheel_radius, 32, 1)
+        glPopMatrix()
+        glEndList()
+
+        gluDeleteQuadric(quadric)
+
+    def release(self):
+        if self.lists:
+            for gl_list in self.lists.values():
+                glDeleteLists(gl_list, 1)
+            self.lists = None
 
     # Task 1 and Task 2
     # 1. Create a Basic Scarecrow
     # 2. Rotate its head and nose based on transformation parameters updated by key input
     def draw_body(self):
         """Blue cuboid 10 × 7 × 5 made from a unit cube."""
+        if not self.lists:
+            self.build_lists()
+        render_state.disable(GL_TEXTURE_2D)
+        render_state.invalidate() # the lists set their own colors
         glPushMatrix()
         glTranslatef(0, 2, 0)
-        glColor3f(0, 1, 0)
-        gluSphere(gluNewQuadric(), 3, 32, 32)   # cylinder (r=0.5, length=1)
-        glTranslatef(0, -2, 0)
-        glColor3f(0.0, 0.0, 1.0)          # blue
-        glScalef(*self.car_body)          # length, height, width
-        glutSolidCube(1.0)
+        glCallList(self.lists['cockpit'])
         glPopMatrix()
+        glCallList(self.lists['body'])
 
     def draw_wheel_core(self, x):
         """Yellow wheel: cylinder (r=2, length=1) with two caps."""
-        quadric = gluNewQuadric()
         glTranslatef(0.0, 0.0, 0.5)   # orient cylinder axis along +Z
         glRotatef(self.car_speed, 0.0, 0.0, 1.0)
-        glScalef(1, 0.8, 1.2)
-        glColor3f(1.0, 1.0, 0.0)          # yellow
-        #gluCylinder(quadric, self.wheel_radius, self.wheel_radius, 1.0, 32, 1)
-        glutSolidTorus(self.wheel_radius-1, self.wheel_radius, 32, 32)   # cylinder (r=0.5, length=1)
-
-        # far cap
-        glPushMatrix()
-        glColor3f(1.0, 0.5, 0.0)
         if x < 0:
-            glTranslatef(0.0, 0.0, -1.0)
-        else:
-            glTranslatef(0.0, 0.0, 1.0)
-        gluDisk(quadric, 0.0, self.wheel_radius, 32, 1)
-        glPopMatrix()
+            glRotatef(180.0, 0.0, 1.0, 0.0)   # cap on the outer (-Z) side
+        glCallList(self.lists['wheel'])
 
     def place_wheel(self, x, y, z, steer=0):
         """Position wheel so its centre coincides with a body corner."""
@@ -170,6 +192,7 @@ class Car:
     # ------------ GLUT callbacks ------------
     def drawCar(self, movement=0, crashed=0):
         self.car_speed = movement
+        glPushMatrix()
         glTranslatef(self.lane, 0.0, -movement)
         if crashed:
             glRotatef(pygame.time.get_ticks()//3, 0.0, 1.0, 0.0)   # rotate around Y axis
@@ -180,8 +203,9 @@ class Car:
         self.place_wheel(-bx, by,  bz)   # front‑left
         self.place_wheel( bx, by, -bz, self.steer)   # rear‑right
         self.place_wheel(-bx, by, -bz, self.steer)   # rear‑left
+        glPopMatrix()
 
-        glutSwapBuffers()
+        glut().glutSwapBuffers()
 
     def jumpingCar(self, victory):
         glPushMatrix()
@@ -190,18 +214,18 @@ class Car:
         height = abs(num) * 4
         scale = abs(num) * 0.1
 
-        for i in range(1):
-            glPushMatrix()
-            glTranslatef(0, height+2, 0)
-            glColor3f(0, 1, 0)
-            gluSphere(gluNewQuadric(), 3, 32, 32)   # cylinder (r=0.5, length=1)
-            glPopMatrix()
+        if not self.lists:
+            self.build_lists()
+        render_state.disable(GL_TEXTURE_2D)
+        render_state.invalidate() # the lists set their own colors
+        glPushMatrix()
+        glTranslatef(0, height+2, 0)
+        glCallList(self.lists['cockpit'])
+        glPopMatrix()
         glScalef(1, scale+1, 1)
         glTranslatef(0, abs(num), 0)
         glRotatef(num, 0.0, 0.0, 1.0)
-        glColor3f(0.0, 0.0, 1.0)          # blue
-        glScalef(*self.car_body)          # length, height, width
-        glutSolidCube(1.0)
+        glCallList(self.lists['body'])
         glPopMatrix()
         # Body extents (half‑sizes) → ±5 x ±3.5 x ±2.5 around origin
         bx, by, bz = 4.0, -3.5, 5
@@ -210,6 +234,6 @@ class Car:
         self.place_wheel( bx, by, -bz, self.steer)   # rear‑right
         self.place_wheel(-bx, by, -bz, self.steer)   # rear‑left
 
-        glutSwapBuffers()
+        glut().glutSwapBuffers()
 
 
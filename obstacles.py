@@ -1,11 +1,19 @@
 from OpenGL.GL import *
-from OpenGL.GLUT import *
 from OpenGL.GLU import *
 
 from OBJFileLoader import *
+from collision import CollisionIndex
+from startup import glut
+from glstate import render_state
+from transforms import apply, apply_normals, compose, identity, rotation, scaling, translation
+import instancing
 
 import numpy as np
 
+# Distance from the eye from which each simplified level of detail of a mesh
+#   is drawn instead of the one before (see OBJ.make_lods)
+LOD_DISTANCES = (75.0, 150.0, 300.0)
+
 ########################################### Transformations ####################################################
 class Transform:
     def __init__(self, translation=(0,0,0), rotation=(0,0,0), scale=(1,1,1)):
@@ -13,56 +21,74 @@ class Transform:
         self.rotation = rotation        # (angle_degrees, x_axis, y_axis, z_axis)
         self.scale = scale              # (sx, sy, sz)
 
-def apply_transform_to_point(point, transform):
-    # Convert the point to a numpy array
-    p = np.array(point, dtype=float)
-
-    # 1. Scale
-    p = p * np.array(transform.scale)
+    # 4x4 matrix: scale, then rotate (as glRotatef), then translate
+    def matrix(self):
+        angle, axis = self.rotation[0], self.rotation[1:]
+        turn = rotation(angle, axis) if any(axis) else identity()
+        return compose(translation(self.translation), turn, scaling(self.scale))
 
-    # 2. Rotation around Y-axis
-    angle_rad = np.radians(transform.rotation[0])  # assuming rotation is (angle, x, y, z)
-    if transform.rotation[1:] == (0,1,0):  # if rotating around Y-axis
-        cos_a = np.cos(angle_rad)
-        sin_a = np.sin(angle_rad)
-        rotation_matrix = np.array([
-            [ cos_a, 0, sin_a],
-            [ 0,     1, 0    ],
-            [-sin_a, 0, cos_a]])
-        p = np.dot(rotation_matrix, p)  # matrix multiplication
-
-    # 3. Translation
-    p = p + np.array(transform.translation)
-
-    return list(p)
+def apply_transform_to_point(point, transform):
+    return list(apply(transform.matrix(), [point])[0])
 
+# Bake a transform into a mesh's vertices (and normals) in one batched operation
+#   Lists stay lists and float32 arrays (parser="numpy") stay arrays
+#   Levels of detail (see OBJ.make_lods) are transformed the same way
 def apply_transform_to_mesh(obj, transform):
-    transformed_vertices = []
-    for v in obj.vertices:
-        transformed_v = apply_transform_to_point(v, transform)
-        transformed_vertices.append(transformed_v)
-    obj.vertices = transformed_vertices
-    obj.rebuild_gl_list()
-    #return transformed_vertices
+    m = transform.matrix()
+    def keep_type(old, new):
+        return new.astype(old.dtype) if isinstance(old, np.ndarray) else new.tolist()
+    obj.vertices = keep_type(obj.vertices, apply(m, obj.vertices))
+    if len(obj.normals):
+        obj.normals = keep_type(obj.normals, apply_normals(m, obj.normals))
+    for data, _, _ in obj.lod_arrays:
+        data[:, 0:3] = apply(m, data[:, 0:3])
+        # Corners without a normal keep zeros, as in build_arrays
+        has = data[:, 3:6].any(axis=1)
+        data[has, 3:6] = apply_normals(m, data[has, 3:6])
+    obj.rebuild()
 
 
 ########################################### Drawing Functions ####################################################
 # draw the mesh, its edges and vertices, and bounding volume
 #   bv_type = "sphere" or "AABB"
-def draw_mesh(obj): 
-    glEnable(GL_LIGHTING)
-    glEnable(GL_COLOR_MATERIAL)
-    glEnable(GL_DEPTH_TEST)
-    glShadeModel(GL_SMOOTH)
+#   State already set for the previous instance is not set again (see glstate)
+#   lod: level of detail, see OBJ.render
+def draw_mesh(obj, lod=0):
+    set_mesh_state()
+    glPushMatrix()
+    obj.render(lod)
+    glPopMatrix()
+
+def set_mesh_state():
+    render_state.enable(GL_LIGHTING)
+    render_state.enable(GL_COLOR_MATERIAL)
+    render_state.enable(GL_DEPTH_TEST)
+    render_state.shade_model(GL_SMOOTH)
 
     # Material properties for specular highlight
-    glMaterialfv(GL_FRONT_AND_BACK, GL_SPECULAR, (0.5, 0.5, 0.5, 1.0))   # less shiny white
-    glMaterialf(GL_FRONT_AND_BACK, GL_SHININESS, 32.0)                  # [0–128], higher = tighter highlight
+    render_state.material(GL_FRONT_AND_BACK, GL_SPECULAR, (0.5, 0.5, 0.5, 1.0))   # less shiny white
+    render_state.material(GL_FRONT_AND_BACK, GL_SHININESS, 32.0)                  # [0–128], higher = tighter highlight
 
+# Draw one placed instance of a mesh: the whole mesh, or only one of its
+#   materials (part, see OBJ.draw_part) with its vertex arrays already bound
+#   angle: rotation about the Y axis in degrees, or None
+def draw_instance(obj, place, angle, part=None, lod=0):
+    set_mesh_state()
     glPushMatrix()
-    glCallList(obj.gl_list)
+    glTranslatef(*place)
+    if angle is not None:
+        glRotatef(angle, 0, 1, 0)
+    if part is None:
+        obj.render(lod)
+    else:
+        obj.draw_part(part, lod)
     glPopMatrix()
 
+# Draw one material of every instance in an Obstacles group (see instancing)
+def draw_instances(obj, instances, part, program, uniforms, lod=0):
+    set_mesh_state()
+    instancing.draw_instances(obj, instances, part, program, uniforms, lod)
+
 def draw_AABB(min_coords, max_coords, center):
     # Calculate size of the box along each axis
     size_x = max_coords[0] - min_coords[0]
@@ -70,20 +96,19 @@ def draw_AABB(min_coords, max_coords, center):
     size_z = max_coords[2] - min_coords[2]
 
     # glutWireCube draws a cube of size 1 centered at (0,0,0), so we scale
-    glPushAttrib(GL_POLYGON_BIT)
-    glDisable(GL_LIGHTING)
-    glColor3f(1.0, 1.0, 1.0)
-    glLineWidth(1.0)
-    glPolygonMode(GL_FRONT_AND_BACK, GL_LINE)
+    #   (it is made of lines, so the polygon mode does not matter)
+    render_state.disable(GL_LIGHTING)
+    render_state.disable(GL_TEXTURE_2D)
+    render_state.color(1.0, 1.0, 1.0)
+    render_state.line_width(1.0)
 
     glPushMatrix()
     glTranslatef(center[0], center[1], center[2])
     glScalef(size_x, size_y, size_z)
-    glutWireCube(1.0)
+    glut().glutWireCube(1.0)
     glPopMatrix()
 
-    glEnable(GL_LIGHTING)
-    glPopAttrib()
+    render_state.enable(GL_LIGHTING)
 
 def get_AABB(center, size):
     half = size / 2.0
@@ -99,44 +124,207 @@ def collisionTest_AABBs(min_coords1, max_coords1, min_coords2, max_coords2):
             return False
     return True
 
+# Swept version: box 1 moves by `delta` during the step
+#   Returns the earliest time in [0, 1] (as a fraction of delta) at which the
+#   boxes touch, or None if they never do; 0 if they already overlap
+#   On each axis the ranges overlap during one interval of time; the boxes
+#   touch if the intervals of all three axes overlap
+def collisionTest_swept_AABBs(min_coords1, max_coords1, delta, min_coords2, max_coords2):
+    enter, leave = 0.0, 1.0
+    for i in range(3):
+        if delta[i] == 0:
+            # Not moving on this axis: the ranges overlap for the whole step or never
+            if max_coords1[i] < min_coords2[i] or min_coords1[i] > max_coords2[i]:
+                return None
+            continue
+        t0 = (min_coords2[i] - max_coords1[i]) / delta[i]
+        t1 = (max_coords2[i] - min_coords1[i]) / delta[i]
+        enter = max(enter, min(t0, t1))
+        leave = min(leave, max(t0, t1))
+        if enter > leave:
+            return None
+    return enter
+
 # Class to handle the obstacles in the game
 class Obstacles:
-    def __init__(self, object, places=[], spinning=False):
+    # renderer: "vbo" (indexed buffers) or "list" (legacy display list), see OBJ
+    #   lod: draw instances far from the eye with the mesh's simplified levels
+    #   of detail, if it has any (see LOD_DISTANCES)
+    def __init__(self, object, places=[], spinning=False, renderer="vbo", lod=True):
         self.places = places
         self.spinning = spinning
         self.angle = 0
+        self.lod = lod
 
         model_path = os.path.join("./resources/models", object+".obj")
-        if not os.path.exists(model_path):
-            raise ValueError(f"OBJ file not found: {model_path}")
         
-        self.obj = OBJ(model_path, swapyz=False)
-        self.objs = []
-        for place in self.places:
-            # Apply transformations to each obj
-            transform = Transform(translation=place)
-            obj = OBJ(model_path, swapyz=False)
-            apply_transform_to_mesh(obj, transform)
-            self.objs.append(obj)
-
-    def drawMeshes(self):
-        for place in self.places:
+        # One shared mesh per model; each placement only lives as a slot in the
+        #   collision index (position plus world-space bounds). Preloaded meshes
+        #   come from the registry without touching the disk.
+        try:
+            self.obj = load_mesh(model_path, swapyz=False, renderer=renderer)
+        except FileNotFoundError:
+            raise ValueError(f"OBJ file not found: {model_path}")
+        min_local, max_local = self.obj.bounds
+        self.index = CollisionIndex(min_local, max_local, self.places)
+
+        # Culling bounds: a spinning mesh sweeps a cylinder around its Y axis
+        self.cull_min = np.array(min_local, dtype=float)
+        self.cull_max = np.array(max_local, dtype=float)
+        if spinning:
+            extent = np.maximum(-self.cull_min, self.cull_max)
+            radius = np.hypot(extent[0], extent[2])
+            self.cull_min[[0, 2]] = -radius
+            self.cull_max[[0, 2]] = radius
+        self.drawn = 0
+        self.culled = 0
+        self.triangles = 0      # triangles drawn, by the buffer renderer
+        self.instances = None   # [instancing.InstanceBuffer] per level of detail, made on first instanced draw
+
+    # Number of levels of detail instances are drawn with
+    def lod_count(self):
+        return len(self.obj.lods) if self.lod and self.obj.renderer == "vbo" else 1
+
+    # Level of detail for each squared distance from the eye
+    def lod_levels(self, depths):
+        levels = np.searchsorted(np.square(LOD_DISTANCES), depths, side='right')
+        return np.minimum(levels, self.lod_count() - 1)
+
+    # Count the triangles of instances drawn with each level, (N,) levels
+    def count_triangles(self, levels):
+        self.triangles = 0
+        if self.obj.renderer == "vbo":
+            counts = np.bincount(levels, minlength=self.lod_count())
+            self.triangles = int(counts @ self.obj.lod_triangles[:len(counts)])
+
+    # Positions and spin angles (None if not spinning) of the instances inside
+    #   frustum (an optional culling.Frustum); the others are counted in
+    #   self.culled
+    def visible(self, frustum=None):
+        slots = self.index.alive_slots()
+        places = self.index.positions[slots]
+        angles = None
+        if self.spinning:
+            # Every instance turns a little further, whether drawn or not
+            angles = self.angle + 2 * np.arange(1, len(places) + 1)
+            self.angle += 2 * len(places)
+        if frustum is not None and len(places):
+            visible = frustum.visible(places + self.cull_min, places + self.cull_max)
+            places = places[visible]
+            if angles is not None:
+                angles = angles[visible]
+        self.drawn = len(places)
+        self.culled = len(slots) - len(places)
+        return places, angles
+
+    # eye: camera position the levels of detail are chosen by, None for full
+    #   detail everywhere
+    def drawMeshes(self, frustum=None, eye=None):
+        places, angles = self.visible(frustum)
+        levels = np.zeros(len(places), dtype=np.int64)
+        if eye is not None:
+            offset = places - np.asarray(eye, dtype=float)
+            levels = self.lod_levels(np.einsum('ij,ij->i', offset, offset))
+        self.count_triangles(levels)
+        levels = levels.tolist()
+        for i, place in enumerate(places):
             glPushMatrix()
             glTranslatef(*place)
             # Apply rotation if spinning
-            if self.spinning:
-                self.angle += 2
-                glRotatef(self.angle, 0, 1, 0)
-            draw_mesh(self.obj)
+            if angles is not None:
+                glRotatef(angles[i], 0, 1, 0)
+            draw_mesh(self.obj, levels[i])
             glPopMatrix()
 
+    # Add the visible instances to a renderqueue.RenderQueue instead of
+    #   drawing them: one item per instance and material, so the queue can
+    #   draw every instance's textured part under one texture bind
+    #   program: instancing.program() for the lights in use, looked up once by
+    #   the caller; if given (not None) and the mesh uses buffers, one item per
+    #   material draws every visible instance at once (see instancing)
+    #   Levels of detail are chosen by the distance from the queue's eye
+    def enqueue(self, queue, frustum=None, program=None):
+        if program is not None and self.obj.renderer == "vbo":
+            self.enqueue_instanced(queue, program, frustum)
+            return
+        places, angles = self.visible(frustum)
+        depths = queue.depths(places)
+        levels = self.lod_levels(depths)
+        self.count_triangles(levels)
+        depths = depths.tolist()
+        levels = levels.tolist()
+        places = places.tolist()
+        angles = [None] * len(places) if angles is None else angles.tolist()
+        if self.obj.renderer != "vbo":
+            for place, angle, depth in zip(places, angles, depths):
+                queue.add(draw_instance, self.obj, place, angle, depth=depth)
+            return
+        for part, (tex_id, color, _, _) in enumerate(self.obj.draws):
+            for place, angle, depth, level in zip(places, angles, depths, levels):
+                queue.add(draw_instance, self.obj, place, angle, part, level,
+                          texture=tex_id or 0, material=color, mesh=self.obj, depth=depth)
+
+    # Instances are culled against the frustum on the CPU, with the same test
+    #   as visible(), and each level of detail has a buffer indexed by slot that
+    #   shows the visible live instances drawn with it, brought up to date with
+    #   the index (sending only what changed); one call per material and level.
+    #   Collecting an object changes its own entry only, and an instance that
+    #   enters or leaves the view or crosses one of LOD_DISTANCES changes one
+    #   entry per buffer it is shown or hidden in.
+    def enqueue_instanced(self, queue, program, frustum=None):
+        if self.instances is None or len(self.instances) != self.lod_count():
+            self.release()
+            self.instances = [instancing.InstanceBuffer() for _ in range(self.lod_count())]
+        slots = self.index.alive_slots()
+        alive = len(slots)
+        spin = float(self.angle % 360)
+        if self.spinning:
+            self.angle += 2 * alive
+        if frustum is not None and alive:
+            places = self.index.positions[slots]
+            slots = slots[frustum.visible(places + self.cull_min, places + self.cull_max)]
+        self.drawn = len(slots)
+        self.culled = alive - len(slots)
+        levels = np.zeros(len(slots), dtype=np.int64)
+        if len(self.instances) > 1:
+            levels = self.lod_levels(queue.depths(self.index.positions[slots]))
+        for level, instances in enumerate(self.instances):
+            shown = np.zeros(self.index.count, dtype=bool)
+            shown[slots[levels == level]] = True
+            instances.sync(self.index, shown)
+        self.count_triangles(levels)
+        if not len(slots):
+            return
+        uniforms = (self.spinning, spin)
+        for level, instances in enumerate(self.instances):
+            if not instances.shown:
+                continue
+            for part, (tex_id, color, _, _) in enumerate(self.obj.draws):
+                queue.add(draw_instances, self.obj, instances, part, program, uniforms, level,
+                          program=program, texture=tex_id or 0, material=color, mesh=self.obj)
+
+    def release(self):
+        if self.instances is not None:
+            for instances in self.instances:
+                instances.release()
+            self.instances = None
+
     def collision(self, car_position, car_size):
-        for obj in self.objs:
-            place = self.objs.index(obj)
-            min_coords, max_coords = obj.cal_minMax()
-            min_car, max_car = get_AABB(car_position, car_size)
-            if collisionTest_AABBs(min_coords, max_coords, min_car, max_car):
-                del self.places[place]
-                self.objs.remove(obj)  # Remove the obj if a collision is detected
-                return True
-        return False
\ No newline at end of file
+        min_car, max_car = get_AABB(car_position, car_size)
+        slot = self.index.first_hit(min_car, max_car)
+        if slot < 0:
+            return False
+        # Remove the instance if a collision is detected
+        self.index.remove(slot)
+        return True
+
+    # Swept version of collision(): the car moves by delta from car_position
+    #   Returns the time of the first hit as a fraction of delta (that instance
+    #   is removed), or None
+    def sweep_collision(self, car_position, car_size, delta):
+        min_car, max_car = get_AABB(car_position, car_size)
+        slot, time = self.index.sweep(min_car, max_car, np.asarray(delta, dtype=float))
+        if slot < 0:
+            return None
+        self.index.remove(slot)
+        return time
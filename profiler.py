@@ -0,0 +1,169 @@
+import csv, json, time
+from collections import deque
+import numpy as np
+import pygame
+from OpenGL.GL import *
+
+########################################### Frame Profiler ####################################################
+# Shared do-nothing scope handed out while profiling is disabled, so an
+#   instrumented block costs one method call and an attribute check
+class _NullScope:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL_SCOPE = _NullScope()
+
+class _Scope:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter() - self.start)
+        return False
+
+# Named timing scopes grouped into frames, keeping the last `history` frames
+#   with profiler.scope("road"):
+#       drawRoad()
+class FrameProfiler:
+    def __init__(self, enabled=False, history=600):
+        self.enabled = enabled
+        self.frames = deque(maxlen=history) # each frame: {stage: seconds}
+        self.stages = []                    # stage names in first-seen order
+        self.counters = {}                  # {name: value} of the last finished frame
+        self._current = None
+        self._counts = {}
+        self._frame_start = 0.0
+
+    def scope(self, name):
+        if not self.enabled:
+            return _NULL_SCOPE
+        return _Scope(self, name)
+
+    # Add time to a stage of the current frame (repeated scopes accumulate)
+    def add(self, name, seconds):
+        if self._current is None:
+            return
+        if name not in self._current:
+            self._current[name] = 0.0
+            if name not in self.stages:
+                self.stages.append(name)
+        self._current[name] += seconds
+
+    # Add to a per-frame counter (objects drawn, culled...), shown by the overlay
+    def count(self, name, value=1):
+        if self._current is not None:
+            self._counts[name] = self._counts.get(name, 0) + value
+
+    def begin_frame(self):
+        if self.enabled:
+            self._current = {}
+            self._counts = {}
+            self._frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self._current is not None:
+            self._current['frame'] = time.perf_counter() - self._frame_start
+            self.frames.append(self._current)
+            self.counters = self._counts
+            self._current = None
+
+    # Rolling (min, avg, p99) in milliseconds for every stage, frame total last
+    def stats(self):
+        result = {}
+        for name in self.stages + ['frame']:
+            samples = [frame[name] for frame in self.frames if name in frame]
+            if samples:
+                ms = np.array(samples) * 1000.0
+                result[name] = (ms.min(), ms.mean(), np.percentile(ms, 99))
+        return result
+
+    # Write the recorded frames as .csv (one row per frame, ms per stage)
+    #   or .json (list of {stage: ms}) depending on the file extension
+    def dump(self, path):
+        names = self.stages + ['frame']
+        rows = [{name: frame.get(name, 0.0) * 1000.0 for name in names} for frame in self.frames]
+        if path.endswith('.json'):
+            with open(path, 'w') as f:
+                json.dump(rows, f, indent=1)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=names)
+                writer.writeheader()
+                writer.writerows(rows)
+        return len(rows)
+
+########################################### On-screen Overlay ####################################################
+# Text table of profiler stats drawn in the top-left corner of the window
+#   The text image is only re-rendered every `refresh` seconds
+class ProfilerOverlay:
+    def __init__(self, profiler, refresh=0.25):
+        self.profiler = profiler
+        self.refresh = refresh
+        self.font = None # created when first shown, font lookup is slow
+        self.visible = False
+        self._image = None
+        self._last_update = 0.0
+
+    def _render_text(self):
+        if self.font is None:
+            self.font = pygame.font.SysFont('monospace', 14)
+        lines = [f"{'stage':<12}{'min':>8}{'avg':>8}{'p99':>8}  ms"]
+        for name, (low, mean, p99) in self.profiler.stats().items():
+            lines.append(f"{name:<12}{low:8.2f}{mean:8.2f}{p99:8.2f}")
+        for name, value in self.profiler.counters.items():
+            lines.append(f"{name:<12}{value:8d}")
+        surfaces = [self.font.render(line, True, (255, 255, 255)) for line in lines]
+        width = max(s.get_width() for s in surfaces) + 8
+        height = sum(s.get_height() for s in surfaces) + 8
+        panel = pygame.Surface((width, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 160))
+        y = 4
+        for surface in surfaces:
+            panel.blit(surface, (4, y))
+            y += surface.get_height()
+        self._image = (width, height, pygame.image.tobytes(panel, 'RGBA', True))
+
+    def draw(self, window_height):
+        if not self.visible:
+            return
+        now = time.perf_counter()
+        if self._image is None or now - self._last_update >= self.refresh:
+            self._render_text()
+            self._last_update = now
+
+        width, height, pixels = self._image
+        glPushAttrib(GL_ENABLE_BIT | GL_COLOR_BUFFER_BIT)
+        glDisable(GL_LIGHTING)
+        glDisable(GL_DEPTH_TEST)
+        glDisable(GL_TEXTURE_2D)
+        glEnable(GL_BLEND)
+        glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
+        glWindowPos2i(0, window_height - height)
+        glDrawPixels(width, height, GL_RGBA, GL_UNSIGNED_BYTE, pixels)
+        glPopAttrib()
+
+    # F3 shows/hides the overlay (profiling runs while it is shown),
+    #   F4 dumps the recorded frames to CSV and JSON
+    def handle_key(self, key):
+        if key == pygame.K_F3:
+            self.visible = not self.visible
+            if self.visible:
+                self.profiler.enabled = True
+            return True
+        if key == pygame.K_F4:
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            for ext in ('csv', 'json'):
+                count = self.profiler.dump(f"frame_profile_{stamp}.{ext}")
+            print(f"Saved {count} frames to frame_profile_{stamp}.csv/.json")
+            return True
+        return False
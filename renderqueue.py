@@ -0,0 +1,77 @@
+import numpy as np
+from OpenGL.GL import glUseProgram
+
+########################################### Render Queue ####################################################
+# Collects a frame's draw items and submits them sorted by state instead of in
+#   the order the game produces them:
+#       render_queue.begin_frame(eye)
+#       render_queue.add(drawRoad, *road)
+#       cones.enqueue(render_queue, frustum)
+#       render_queue.flush()
+#   Sort key: (program, texture, material, mesh, depth), so every part drawn
+#   with one texture (and then one color) is drawn in a row and each texture is
+#   bound about once a frame; equal state is drawn front to back, nearest first,
+#   so the depth test rejects more hidden fragments. Everything the game draws
+#   is opaque. program: the shader program the item is drawn with, made
+#   current by the queue (0 = fixed function).
+#   mesh: an OBJ whose vertex arrays the item draws from; they are bound once
+#   for a run of items of the same mesh. Items without a mesh (immediate mode,
+#   display lists) are drawn with no vertex arrays bound.
+#   material: the color the item draws with, or None if it sets its own
+#   Items must leave the modelview matrix as they found it.
+class RenderQueue:
+    def __init__(self):
+        self.items = []
+        self.eye = np.zeros(3)
+        self.draw_calls = 0         # items submitted by the last flush
+        self.texture_binds = 0      # texture changes between consecutive items
+        self.material_switches = 0  # color changes between consecutive items
+        self.mesh_binds = 0         # vertex array binds
+        self.program_switches = 0
+
+    def begin_frame(self, eye):
+        self.items = []
+        self.eye = np.asarray(eye, dtype=float)
+
+    # Squared distance from the eye of each (N, 3) position, for depth keys
+    def depths(self, positions):
+        offset = np.asarray(positions, dtype=float) - self.eye
+        return np.einsum('ij,ij->i', offset, offset)
+
+    def add(self, draw, *args, program=0, texture=0, material=None, mesh=None, depth=0.0):
+        key = (program, texture, () if material is None else material,
+               0 if mesh is None else id(mesh), depth, len(self.items))
+        self.items.append((key, mesh, draw, args))
+
+    def flush(self):
+        self.items.sort(key=lambda item: item[0])
+        self.draw_calls = len(self.items)
+        self.texture_binds = self.material_switches = self.mesh_binds = self.program_switches = 0
+        texture = material = bound = None
+        program = 0
+        for key, mesh, draw, args in self.items:
+            if key[0] != program:
+                program = key[0]
+                glUseProgram(program)
+                self.program_switches += 1
+            if key[1] != texture:
+                texture = key[1]
+                self.texture_binds += 1
+            if key[2] != material or not key[2]:
+                material = key[2]
+                self.material_switches += 1
+            if mesh is not bound:
+                if bound is not None:
+                    bound.unbind_arrays()
+                if mesh is not None:
+                    mesh.bind_arrays()
+                    self.mesh_binds += 1
+                bound = mesh
+            draw(*args)
+        if bound is not None:
+            bound.unbind_arrays()
+        if program:
+            glUseProgram(0)
+        self.items = []
+
+render_queue = RenderQueue()
@@ -0,0 +1,149 @@
+import argparse, struct, time
+import numpy as np
+
+from simulation import *
+from collision import CollisionIndex
+from levelgen import model_bounds
+from track import TrackStreamer, track_rules
+
+# Recorded games: the track seed plus every input stamped with the simulation
+#   step (tick) it was applied on. The rules run in fixed steps, so feeding the
+#   same inputs on the same ticks replays the game exactly.
+#   python game.py --seed 7 --record run.hhr
+#   python replay.py run.hhr --verify               (headless, as fast as possible)
+#   python replay.py run.hhr --visible --time-scale 4
+
+MAGIC = b'HHRP'
+VERSION = 3                         # 2: swept collisions (simulation.step), 3: streamed track layouts (track.TrackStreamer)
+HEADER = struct.Struct('<4sBqd')    # magic, version, seed, track length (inf: endless)
+EVENT = struct.Struct('<IB')        # tick, action
+RESULT = struct.Struct('<IbId')     # ticks, outcome, score, distance travelled
+ENDLESS = float('inf')
+
+# Result of a finished game as stored in the file: (ticks, outcome, score, movement)
+def summary(state, ticks):
+    return ticks, int(state.outcome[0]), int(state.score[0]), float(state.movement[0])
+
+class Replay:
+    def __init__(self, seed, track_length=FINISH, events=None, result=None):
+        self.seed = seed
+        self.track_length = ENDLESS if track_length is None else float(track_length)
+        self.events = events if events is not None else [] # [(tick, action)] in tick order
+        self.result = result    # summary() of the recorded game
+        self.played = None      # summary() of the last playback
+        self._by_tick = None
+
+    @property
+    def length(self):
+        return None if self.track_length == ENDLESS else self.track_length
+
+    # Recorder side: inputs applied on a tick
+    def record(self, tick, actions):
+        self.events.extend((tick, action) for action in actions)
+
+    # Player side: inputs to apply on a tick
+    def actions_at(self, tick):
+        if self._by_tick is None:
+            self._by_tick = {}
+            for t, action in self.events:
+                self._by_tick.setdefault(t, []).append(action)
+        return self._by_tick.get(tick, [])
+
+    @property
+    def matches(self):
+        return self.result is not None and self.played == self.result
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.seed, self.track_length))
+            f.write(struct.pack('<I', len(self.events)))
+            f.write(b''.join(EVENT.pack(tick, action) for tick, action in self.events))
+            if self.result is not None:
+                f.write(RESULT.pack(*self.result))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version, seed, track_length = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} replay")
+        offset = HEADER.size
+        (count,) = struct.unpack_from('<I', data, offset)
+        offset += 4
+        events = list(EVENT.iter_unpack(data[offset:offset + count * EVENT.size]))
+        offset += count * EVENT.size
+        result = RESULT.unpack_from(data, offset) if len(data) >= offset + RESULT.size else None
+        return cls(seed, track_length, events, result)
+
+########################################### Headless Playback ####################################################
+# The game's track and rules without a window (see game.main)
+def new_game(seed, track_length):
+    cones = CollisionIndex(*model_bounds('traffic'))
+    coins = CollisionIndex(*model_bounds('SimpleGoldCoin'))
+    track = TrackStreamer(cones, coins, np.random.default_rng(seed), track_length)
+    track.update(0)
+    time_limit, win = track_rules(track_length)
+    state = GameState(cones, coins, finish=track.length, time_limit=time_limit, win=win)
+    return state, track
+
+# Re-drive a recorded game as fast as possible; returns and stores its summary()
+def play(replay):
+    state, track = new_game(replay.seed, replay.length)
+    dt = 1.0 / SIM_RATE
+    tick = 0
+    while state.outcome[0] == RUNNING:
+        step(state, replay.actions_at(tick), dt)
+        tick += 1
+        track.update(state.movement[0])
+    replay.played = summary(state, tick)
+    return replay.played
+
+def describe(result):
+    ticks, outcome, score, movement = result
+    status = {WON: "won", LOST: "lost"}.get(outcome, "running")
+    return f"{status}, {score} coins, {movement:.1f} units in {ticks} ticks ({ticks / SIM_RATE:.2f} s)"
+
+def main():
+    parser = argparse.ArgumentParser(description="Play back a Highway Hop replay.")
+    parser.add_argument('replay', help="file written by game.py --record")
+    parser.add_argument('--verify', action='store_true',
+                        help="exit with status 1 unless the result matches the recording")
+    parser.add_argument('--visible', action='store_true', help="watch the replay in the game window")
+    parser.add_argument('--time-scale', type=float, default=1.0, help="visible playback speed")
+    parser.add_argument('--repeat', type=int, default=1,
+                        help="headless runs, for timing identical workloads")
+    args = parser.parse_args()
+
+    replay = Replay.load(args.replay)
+    print(f"seed {replay.seed}, {len(replay.events)} inputs")
+    if replay.result is not None:
+        print(f"recorded: {describe(replay.result)}")
+
+    if args.visible:
+        import pygame, game
+        from assets import AssetManager
+        from profiler import FrameProfiler
+        pygame.init()
+        game.main(FrameProfiler(), AssetManager(), args.time_scale, track_length=replay.length,
+                  rng=np.random.default_rng(replay.seed), playback=replay)
+    else:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            play(replay)
+        seconds = time.perf_counter() - start
+        ticks = replay.played[0] * args.repeat
+        print(f"{args.repeat} run(s) in {seconds:.3f} s, {ticks / seconds:.0f} ticks/s "
+              f"({ticks / SIM_RATE / seconds:.0f}x real time)")
+
+    if replay.played is not None:
+        print(f"played:   {describe(replay.played)}")
+    if args.verify:
+        if replay.matches:
+            print("replay matches the recording")
+        else:
+            print("MISMATCH: replay differs from the recording")
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import math
+from functools import lru_cache
+import numpy as np
+from OpenGL.GL import *
+
+########################################### GLUT Stand-ins ####################################################
+# The few GLUT calls the game makes, in plain OpenGL, for when there is no
+#   display to initialize GLUT on (SDL's offscreen driver with EGL): freeglut
+#   exits the process if glutInit finds no display, so startup.glut() hands out
+#   this module instead. Shapes match GLUT's (size, orientation, normals).
+
+# (normal, 4 corners) of a unit cube centered at the origin
+_CUBE = np.array([
+    [(1, 0, 0), (1, -1, -1), (1, 1, -1), (1, 1, 1), (1, -1, 1)],
+    [(-1, 0, 0), (-1, -1, 1), (-1, 1, 1), (-1, 1, -1), (-1, -1, -1)],
+    [(0, 1, 0), (-1, 1, 1), (1, 1, 1), (1, 1, -1), (-1, 1, -1)],
+    [(0, -1, 0), (-1, -1, -1), (1, -1, -1), (1, -1, 1), (-1, -1, 1)],
+    [(0, 0, 1), (-1, -1, 1), (1, -1, 1), (1, 1, 1), (-1, 1, 1)],
+    [(0, 0, -1), (-1, 1, -1), (1, 1, -1), (1, -1, -1), (-1, -1, -1)],
+], dtype=np.float32)
+_CUBE[:, 1:] *= 0.5
+
+def glutSolidCube(size):
+    glBegin(GL_QUADS)
+    for face in _CUBE:
+        glNormal3fv(face[0])
+        for corner in face[1:]:
+            glVertex3fv(corner * size)
+    glEnd()
+
+def glutWireCube(size):
+    for face in _CUBE:
+        glBegin(GL_LINE_LOOP)
+        glNormal3fv(face[0])
+        for corner in face[1:]:
+            glVertex3fv(corner * size)
+        glEnd()
+
+# Vertex and normal arrays of a torus around the Z axis, as GL_QUAD_STRIPs
+#   of 2 * (nsides + 1) vertices, one strip per ring
+@lru_cache(maxsize=8)
+def _torus(inner_radius, outer_radius, nsides, rings):
+    theta = np.linspace(0, 2 * math.pi, rings + 1)[:, None, None]     # around the ring
+    phi = np.linspace(0, 2 * math.pi, nsides + 1)[None, :, None]      # around the tube
+    step = np.array([0, 1])[None, None, :]
+    theta = theta[:-1] + step * (2 * math.pi / rings)
+    normals = np.stack(np.broadcast_arrays(np.cos(theta) * np.cos(phi), np.sin(theta) * np.cos(phi),
+                                           np.sin(phi) + 0 * theta), axis=-1)
+    vertices = normals * inner_radius
+    vertices[..., 0] += np.cos(theta) * outer_radius
+    vertices[..., 1] += np.sin(theta) * outer_radius
+    shape = (rings, 2 * (nsides + 1), 3)
+    return (np.ascontiguousarray(vertices.reshape(shape), dtype=np.float32),
+            np.ascontiguousarray(normals.reshape(shape), dtype=np.float32))
+
+def glutSolidTorus(innerRadius, outerRadius, nsides, rings):
+    vertices, normals = _torus(float(innerRadius), float(outerRadius), nsides, rings)
+    glPushClientAttrib(GL_CLIENT_VERTEX_ARRAY_BIT)
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_NORMAL_ARRAY)
+    glVertexPointer(3, GL_FLOAT, 0, vertices)
+    glNormalPointer(GL_FLOAT, 0, normals)
+    count = vertices.shape[1]
+    for ring in range(len(vertices)):
+        glDrawArrays(GL_QUAD_STRIP, ring * count, count)
+    glPopClientAttrib()
+
+# pygame.display.flip() presents the frame
+def glutSwapBuffers():
+    pass
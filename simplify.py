@@ -0,0 +1,223 @@
+import os, hashlib, heapq, tempfile
+import numpy as np
+
+# Triangles kept by each level of detail after the full mesh, as a fraction of
+#   the full mesh's triangles
+LOD_RATIOS = (0.5, 0.25, 0.1)
+CACHE_VERSION = 1           # bump when simplify() changes its output
+BOUNDARY_WEIGHT = 100.0     # how strongly open edges and material seams hold their place
+
+########################################### Quadrics ####################################################
+# Plane equation (a, b, c, d) and area of each triangle (N, 3, 3)
+def _planes(corners):
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    length = np.linalg.norm(normals, axis=1)
+    unit = normals / np.maximum(length, 1e-12)[:, None]
+    planes = np.concatenate([unit, -np.einsum('ij,ij->i', unit, corners[:, 0])[:, None]], axis=1)
+    return planes, length / 2
+
+# Error quadric of every position: the area-weighted squared distance to the
+#   planes of its triangles, plus planes standing on the edges that must keep
+#   their place (open edges and edges between two materials), so outlines and
+#   texture borders do not cave in
+def _quadrics(positions, triangles, materials):
+    corners = positions[triangles]
+    planes, areas = _planes(corners)
+    faces = np.einsum('ni,nj->nij', planes, planes) * areas[:, None, None]
+    quadrics = np.zeros((len(positions), 4, 4))
+    for k in range(3):
+        np.add.at(quadrics, triangles[:, k], faces)
+
+    # Each directed edge (a, b) of every triangle; an edge is kept in place if
+    #   no other triangle of the same material has it
+    a = triangles.ravel()
+    b = triangles[:, [1, 2, 0]].ravel()
+    face = np.repeat(np.arange(len(triangles)), 3)
+    keys = np.stack([np.minimum(a, b), np.maximum(a, b), materials[face]], axis=1)
+    _, inverse, counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    edge = counts[inverse.ravel()] == 1
+    a, b, face = a[edge], b[edge], face[edge]
+    direction = positions[b] - positions[a]
+    normals = np.cross(direction, planes[face, :3])
+    unit = normals / np.maximum(np.linalg.norm(normals, axis=1), 1e-12)[:, None]
+    borders = np.concatenate([unit, -np.einsum('ij,ij->i', unit, positions[a])[:, None]], axis=1)
+    weights = BOUNDARY_WEIGHT * np.einsum('ij,ij->i', direction, direction)
+    constraints = np.einsum('ni,nj->nij', borders, borders) * weights[:, None, None]
+    np.add.at(quadrics, a, constraints)
+    np.add.at(quadrics, b, constraints)
+    return quadrics
+
+########################################### Edge Collapse ####################################################
+# Quadric error edge-collapse decimation (Garland & Heckbert) of a mesh in
+#   OBJ.build_arrays() form, to each fraction of its triangles in `ratios`
+#   (decreasing). Render vertices that share a position are welded for the
+#   collapse, so the mesh does not tear along texture or normal seams. An edge
+#   collapses onto whichever end costs less (no new positions), so every
+#   render vertex keeps its normal and texcoord and only moves; collapses that
+#   would flip a triangle are refused. Triangles keep their materials, and
+#   every level has the same ranges as the input, in the same order (possibly
+#   empty), so the parts of all levels line up.
+#   Returns [(data, indices, ranges)] per ratio
+def simplify(arrays, ratios=LOD_RATIOS):
+    data, indices, ranges = arrays
+    positions, welded = np.unique(data[:, :3].astype(np.float64), axis=0, return_inverse=True)
+    welded = welded.ravel()
+    triangles = welded[indices.astype(np.int64).reshape(-1, 3)]
+    materials = np.repeat(np.arange(len(ranges)), [count // 3 for _, _, count in ranges])
+
+    quadrics = _quadrics(positions, triangles, materials)
+    homogeneous = np.concatenate([positions, np.ones((len(positions), 1))], axis=1)
+    alive = (triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) \
+            & (triangles[:, 2] != triangles[:, 0])
+    around = [set() for _ in range(len(positions))]     # live triangles of each position
+    for t in np.flatnonzero(alive).tolist():
+        for v in triangles[t].tolist():
+            around[v].add(t)
+    merged = np.arange(len(positions))                  # position each one was collapsed onto
+    version = [0] * len(positions)
+    live = int(alive.sum())
+
+    heap = []
+    def push(a, b):
+        q = quadrics[a] + quadrics[b]
+        cost_a = homogeneous[a] @ q @ homogeneous[a]
+        cost_b = homogeneous[b] @ q @ homogeneous[b]
+        keep, drop = (a, b) if cost_a <= cost_b else (b, a)
+        heapq.heappush(heap, (min(cost_a, cost_b), keep, drop, version[keep], version[drop]))
+
+    def neighbours(v):
+        return {u for t in around[v] for u in triangles[t].tolist()} - {v}
+
+    for a in range(len(positions)):
+        for b in neighbours(a):
+            if a < b:
+                push(a, b)
+
+    # A collapse is refused if a triangle that survives it would turn over
+    def flips(keep, drop):
+        for t in around[drop]:
+            corners = triangles[t]
+            if keep in corners:
+                continue
+            before = positions[corners]
+            after = positions[np.where(corners == drop, keep, corners)]
+            old = np.cross(before[1] - before[0], before[2] - before[0])
+            new = np.cross(after[1] - after[0], after[2] - after[0])
+            if old @ new <= 0:
+                return True
+        return False
+
+    levels = []
+    for ratio in ratios:
+        target = int(len(triangles) * ratio)
+        while live > target and heap:
+            _, keep, drop, keep_version, drop_version = heapq.heappop(heap)
+            if merged[keep] != keep or merged[drop] != drop \
+                    or version[keep] != keep_version or version[drop] != drop_version:
+                continue
+            if flips(keep, drop):
+                continue
+            for t in around[drop]:
+                corners = triangles[t]
+                if keep in corners:
+                    alive[t] = False
+                    live -= 1
+                    for v in corners.tolist():
+                        if v != drop:
+                            around[v].discard(t)
+                else:
+                    corners[corners == drop] = keep
+                    around[keep].add(t)
+            around[drop] = set()
+            merged[drop] = keep
+            quadrics[keep] += quadrics[drop]
+            version[keep] += 1
+            for v in neighbours(keep):
+                push(keep, v)
+        levels.append(_level(data, indices, ranges, welded, merged, positions, alive))
+    return levels
+
+# Arrays of the mesh as collapsed so far: the live triangles' render vertices,
+#   moved to where their positions were collapsed onto and renumbered in order
+#   of first use
+def _level(data, indices, ranges, welded, merged, positions, alive):
+    roots = merged.copy()
+    while True:
+        parents = roots[roots]
+        if (parents == roots).all():
+            break
+        roots = parents
+    kept = indices.reshape(-1, 3)[alive].ravel()
+    used, first = np.unique(kept, return_index=True)
+    used = used[np.argsort(first)]
+    renumber = np.empty(len(data), dtype=np.int64)
+    renumber[used] = np.arange(len(used))
+    vertices = data[used].copy()
+    vertices[:, :3] = positions[roots[welded[used]]]
+
+    counts = [int(alive[first // 3:(first + count) // 3].sum()) * 3 for _, first, count in ranges]
+    starts = np.cumsum(counts) - counts
+    level_ranges = [(material, int(start), count)
+                    for (material, _, _), start, count in zip(ranges, starts, counts)]
+    return vertices, renumber[kept].astype(np.uint32), level_ranges
+
+########################################### LOD Cache ####################################################
+# Simplified levels are saved in the user's cache directory (not beside the
+#   model, which may be read-only or shared) as <name>-<key>.lod.npz and reused
+#   while the mesh they were made from is unchanged.
+#   HIGHWAY_HOP_CACHE overrides the directory.
+def lod_cache_dir():
+    root = os.environ.get('HIGHWAY_HOP_CACHE')
+    if not root:
+        base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        root = os.path.join(base, 'highway-hop')
+    return os.path.join(root, 'lod')
+
+def lod_cache_path(model_path, key):
+    name = os.path.splitext(os.path.basename(model_path))[0]
+    return os.path.join(lod_cache_dir(), f'{name}-{key[:16]}.lod.npz')
+
+def _cache_key(arrays, ratios):
+    data, indices, ranges = arrays
+    digest = hashlib.sha1(data.tobytes())
+    digest.update(indices.tobytes())
+    digest.update(repr((ranges, tuple(ratios), CACHE_VERSION)).encode())
+    return digest.hexdigest()
+
+# Levels of detail of a model's arrays (see simplify), from the cache if it is
+#   current; a cache that cannot be written is skipped. Assets load on worker
+#   threads, so the file is written under a temporary name and moved into
+#   place: a reader never sees a half-written cache
+def load_lods(model_path, arrays, ratios=LOD_RATIOS):
+    key = _cache_key(arrays, ratios)
+    path = lod_cache_path(model_path, key)
+    ranges = arrays[2]
+    try:
+        with np.load(path, allow_pickle=False) as cache:
+            if str(cache['key']) == key:
+                return [(cache[f'data{k}'], cache[f'indices{k}'],
+                         [(material, int(first), int(count)) for (material, _, _), first, count
+                          in zip(ranges, cache[f'first{k}'], cache[f'count{k}'])])
+                        for k in range(len(ratios))]
+    except (OSError, KeyError, ValueError):
+        pass
+
+    levels = simplify(arrays, ratios)
+    saved = {'key': np.array(key)}
+    for k, (data, indices, level_ranges) in enumerate(levels):
+        saved[f'data{k}'] = data
+        saved[f'indices{k}'] = indices
+        saved[f'first{k}'] = np.array([first for _, first, _ in level_ranges], dtype=np.int64)
+        saved[f'count{k}'] = np.array([count for _, _, count in level_ranges], dtype=np.int64)
+    temp = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix='.tmp', delete=False) as f:
+            temp = f.name
+            np.savez_compressed(f, **saved)
+        os.replace(temp, path)
+    except OSError as e:
+        print(f"Could not save {path}: {e}")
+        if temp is not None and os.path.exists(temp):
+            os.remove(temp)
+    return levels
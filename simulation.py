@@ -0,0 +1,240 @@
+import numpy as np
+
+from collision import sweep_times
+
+# Gameplay rules, free of pygame/OpenGL so they can run headless.
+#   Speeds are in world units per frame of the original 10 ms game loop;
+#   step() scales them by dt * SIM_RATE so any step size gives the same motion.
+SIM_RATE     = 100  # reference frames per second
+LANE_WIDTH   = 10
+MAX_LANE     = 20   # lanes run from -MAX_LANE to MAX_LANE
+CAR_SIZE     = 5    # edge length of the car's collision box
+FINISH       = 600  # finish line
+MAX_SPEED    = 2
+ACCELERATION = 0.03
+WIN_COINS    = 5    # number of coins to win
+TIME_LIMIT   = 30   # seconds
+CRASH_TIME   = 1    # seconds the car is stunned after hitting a cone
+COUNTDOWN    = 3    # seconds before the race starts
+CONE_OFFSET  = 4    # cones are tested at the front of the car,
+COIN_OFFSET  = 2    #   coins slightly further back
+COIN_HEIGHT  = 5    #   and higher, where the coins float
+
+# Input actions; VIEW (camera switch) has no effect on the rules but is
+#   recorded with the others for replays
+NONE, LEFT, RIGHT, PAUSE, VIEW = 0, 1, 2, 3, 4
+
+# Outcomes
+RUNNING, LOST, WON = -1, 0, 1
+
+########################################### Track Setup ####################################################
+# Calculate the min, max values of the x, y, z coordinates of an OBJ file
+#   without building any GPU resources (reads "v" records only)
+def obj_bounds(filename):
+    vertices = [line.split()[1:4] for line in open(filename, "r") if line.startswith('v ')]
+    vertices = np.array(vertices, dtype=float)
+    return vertices.min(axis=0), vertices.max(axis=0)
+
+# Unchecked random cone and coin positions in any of the lanes
+#   games = None gives one layout of shape (count, 3), otherwise (games, count, 3)
+#   Objects are placed between start and finish units down the track;
+#   levelgen.generate() adds placement rules and reachability checks.
+def random_layout(rng, finish=FINISH, count=10, games=None, start=0):
+    shape = (count,) if games is None else (games, count)
+    def places(y):
+        lanes = rng.integers(-MAX_LANE // LANE_WIDTH, MAX_LANE // LANE_WIDTH + 1, size=shape) * LANE_WIDTH
+        zs = rng.integers(-finish, -start, size=shape)
+        return np.stack([lanes, np.full(shape, y), zs], axis=-1).astype(float)
+    return places(0), places(COIN_HEIGHT)
+
+# Obstacles of a batch of independent games stored as dense (games, count) arrays
+#   Shares the sweep_hit()/sweep_collect() interface of collision.CollisionIndex
+class DenseObstacles:
+    def __init__(self, local_min, local_max, places):
+        places = np.asarray(places, dtype=float)
+        self.positions = places
+        self.mins = places + np.asarray(local_min, dtype=float)
+        self.maxs = places + np.asarray(local_max, dtype=float)
+        self.alive = np.ones(places.shape[:2], dtype=bool)
+        # Contiguous z ranges for the sweeps' first pass
+        self.min_z = np.ascontiguousarray(self.mins[..., 2])
+        self.max_z = np.ascontiguousarray(self.maxs[..., 2])
+
+    # Live obstacles each game's box touches while it moves by its row of
+    #   deltas: (rows into games, columns, sweep times), touching ones only.
+    #   The cars drive down the track, so comparing z ranges first leaves a
+    #   few obstacles per step for the exact test (see sweep_times).
+    def _sweep(self, box_mins, box_maxs, deltas, games):
+        every = len(games) == len(self.alive)
+        min_z, max_z, alive = (self.min_z, self.max_z, self.alive) if every else \
+            (self.min_z[games], self.max_z[games], self.alive[games])
+        path_min = np.minimum(box_mins[:, 2], box_mins[:, 2] + deltas[:, 2])
+        path_max = np.maximum(box_maxs[:, 2], box_maxs[:, 2] + deltas[:, 2])
+        near = (min_z <= path_max[:, None]) & (max_z >= path_min[:, None]) & alive
+        rows, cols = np.nonzero(near)
+        times = sweep_times(self.mins[games[rows], cols], self.maxs[games[rows], cols],
+                            box_mins[rows], box_maxs[rows], deltas[rows])
+        touched = np.isfinite(times)
+        return rows[touched], cols[touched], times[touched]
+
+    # For every listed game, remove the first obstacle its box touches while
+    #   it moves by its row of deltas; see CollisionIndex.sweep_hit
+    def sweep_hit(self, box_mins, box_maxs, deltas, games):
+        rows, cols, found = self._sweep(box_mins, box_maxs, deltas, games)
+        slots = np.full(len(games), -1)
+        times = np.full(len(games), np.inf)
+        if len(rows):
+            # Earliest per game, lowest column on ties, like CollisionIndex.sweep
+            order = np.lexsort((cols, found, rows))
+            first = order[np.r_[True, rows[order][1:] != rows[order][:-1]]]
+            slots[rows[first]] = cols[first]
+            times[rows[first]] = found[first]
+            self.alive[games[rows[first]], cols[first]] = False
+        return slots, times
+
+    # Remove every live obstacle each game's box touches while it moves by
+    #   its row of deltas, as repeated sweep_hit calls would; returns how many
+    #   each game touched
+    def sweep_collect(self, box_mins, box_maxs, deltas, games):
+        rows, cols, _ = self._sweep(box_mins, box_maxs, deltas, games)
+        self.alive[games[rows], cols] = False
+        return np.bincount(rows, minlength=len(games))
+
+########################################### Game State ####################################################
+# State of one or more games advanced in lockstep; every per-game field is an
+#   array of length n. cones/coins are obstacle sets with sweep_hit() and
+#   sweep_collect() methods: a CollisionIndex for a single game or a
+#   DenseObstacles for a batch.
+class GameState:
+    def __init__(self, cones, coins, n=1, finish=FINISH, time_limit=TIME_LIMIT,
+                 win=WIN_COINS, countdown=COUNTDOWN):
+        self.n = n
+        self.cones = cones
+        self.coins = coins
+        self.finish = finish
+        self.time_limit = time_limit
+        self.win = win
+
+        self.movement = np.zeros(n)     # distance travelled down the track
+        self.speed = np.zeros(n)
+        self.lane = np.zeros(n)
+        self.score = np.zeros(n, dtype=int)
+        self.crash_left = np.zeros(n)   # remaining stun time, > 0 while crashed
+        self.paused = np.zeros(n, dtype=bool)
+        self.outcome = np.full(n, RUNNING)
+        self.elapsed = np.zeros(n)      # race clock: starts with the countdown, stops while paused
+        self.time = 0.0                 # total simulated time
+        self.countdown = float(countdown)
+        self.steered = []               # per action of the last step: whether it moved a car to another lane
+
+    @property
+    def crashed(self):
+        return self.crash_left > 0
+
+    @property
+    def running(self):
+        return self.outcome == RUNNING
+
+    def remaining_time(self, game=0):
+        if self.elapsed[game] >= self.time_limit:
+            return 0
+        return int(max(0, self.time_limit - self.elapsed[game])) + 1
+
+# Collision boxes of the car in the given games, see CONE_OFFSET
+def car_box(state, games, height, offset):
+    half = CAR_SIZE / 2.0
+    centers = np.stack([state.lane[games], np.full(len(games), height),
+                        offset - state.movement[games]], axis=1)
+    return centers - half, centers + half
+
+# Advance every running game by dt seconds
+#   inputs: sequence of actions; each is an action code applied to all games
+#   or an array with one code per game
+#   Returns the names of the events that happened in at least one game:
+#   "countdown", "go", "crash", "coin", "won", "lost"; which actions changed
+#   lanes is left in state.steered
+def step(state, inputs, dt):
+    events = []
+    running = state.running
+    frames = dt * SIM_RATE
+    started = state.time == 0
+    state.time += dt
+
+    state.steered = []
+    for action in inputs:
+        action = np.broadcast_to(action, (state.n,))
+        pause = running & (action == PAUSE)
+        state.paused ^= pause
+        steer = running & ~state.crashed & ~state.paused
+        left = steer & (action == LEFT) & (state.lane > -MAX_LANE)
+        right = steer & (action == RIGHT) & (state.lane < MAX_LANE)
+        state.lane[left] -= LANE_WIDTH
+        state.lane[right] += LANE_WIDTH
+        state.steered.append(bool(left.any() or right.any()))
+
+    # The race clock and crash stun only run while a game is not paused
+    active = running & ~state.paused
+    state.elapsed[active] += dt
+
+    if state.countdown > 0:
+        if started:
+            events.append("countdown")
+        shown = np.ceil(state.countdown)
+        state.countdown -= dt
+        if state.countdown <= 0:
+            state.countdown = 0.0
+            events.append("go")
+        elif np.ceil(state.countdown) < shown:
+            events.append("countdown")
+        return events
+
+    # Recover from an earlier crash
+    state.crash_left[active] = np.maximum(state.crash_left[active] - dt, 0)
+
+    # Check for collisions along the whole stretch each car drives this step,
+    #   so nothing is skipped however long the step is (finished games are
+    #   left alone). A car that hits a cone stops where it touched it and only
+    #   collects the coins before that point.
+    drive = active & ~state.crashed & (state.movement < state.finish)
+    distance = np.where(drive, state.speed * frames, 0.0)
+    games = np.flatnonzero(running)
+    deltas = np.zeros((len(games), 3))
+    deltas[:, 2] = -distance[games]
+    slots, times = state.cones.sweep_hit(*car_box(state, games, 0, CONE_OFFSET), deltas, games)
+    cone = np.zeros(state.n, dtype=bool)
+    cone[games] = slots >= 0
+    travel = np.ones(state.n)   # fraction of the distance driven
+    if cone.any():
+        travel[games[slots >= 0]] = times[slots >= 0]
+        new_crash = cone & ~state.crashed
+        state.crash_left[new_crash] = CRASH_TIME
+        if new_crash.any():
+            events.append("crash")
+    deltas *= travel[games, None]
+    collected = np.zeros(state.n, dtype=int)
+    collected[games] = state.coins.sweep_collect(*car_box(state, games, COIN_HEIGHT, COIN_OFFSET),
+                                                 deltas, games)
+    if collected.any():
+        state.score += collected
+        events.append("coin")
+
+    # Move the car and check if the player has finished
+    state.movement[drive] += distance[drive] * travel[drive]
+    crashed = state.crashed
+    state.speed[active & crashed] = 0
+    if np.isinf(state.finish):
+        # Endless track: the race ends when time runs out
+        done = active & (state.elapsed >= state.time_limit)
+        won = done & (state.score >= state.win)
+    else:
+        done = active & ~crashed & ~drive
+        won = done & (state.score >= state.win) & (state.elapsed < state.time_limit)
+    if done.any():
+        state.outcome[done] = np.where(won[done], WON, LOST)
+        if won.any():
+            events.append("won")
+        if (done & ~won).any():
+            events.append("lost")
+    accelerate = active & (state.speed < MAX_SPEED)
+    state.speed[accelerate] += ACCELERATION * frames
+    return events
@@ -0,0 +1,85 @@
+import builtins, os, sys, time
+
+########################################### Startup Profile ####################################################
+# Cold-start measurements for game.py --startup-profile
+#   Times every import made at the top level of the watched code (each one
+#   including the modules it pulls in) and named phases from the moment this
+#   module is imported until the first frame of the race is on screen.
+class StartupProfile:
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.enabled = False
+        self.budget = None  # seconds to the first frame
+        self.imports = []   # (module, seconds)
+        self.phases = []    # (name, seconds since start)
+        self._depth = 0
+        self._import = None
+
+    # Record imports until stop_imports(); only modules not loaded yet are timed
+    def watch_imports(self):
+        self.enabled = True
+        self._import = builtins.__import__
+        def timed_import(name, *args, **kwargs):
+            if name in sys.modules:
+                return self._import(name, *args, **kwargs)
+            self._depth += 1
+            start = time.perf_counter()
+            try:
+                return self._import(name, *args, **kwargs)
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.imports.append((name, time.perf_counter() - start))
+        builtins.__import__ = timed_import
+
+    def stop_imports(self):
+        if self._import is not None:
+            builtins.__import__ = self._import
+            self._import = None
+
+    # Record reaching a phase; only the first time counts
+    def mark(self, name):
+        if self.enabled and name not in (phase for phase, _ in self.phases):
+            self.phases.append((name, time.perf_counter() - self.start))
+
+    # Print the imports and phases; returns the exit status (1 when over budget)
+    def report(self):
+        self.stop_imports()
+        print(f"{'import':<24}{'ms':>10}")
+        for name, seconds in sorted(self.imports, key=lambda item: -item[1]):
+            print(f"{name:<24}{seconds * 1000:10.1f}")
+        print(f"\n{'phase':<24}{'ms':>10}{'at ms':>10}")
+        previous = 0.0
+        for name, at in self.phases:
+            print(f"{name:<24}{(at - previous) * 1000:10.1f}{at * 1000:10.1f}")
+            previous = at
+
+        total = self.phases[-1][1] if self.phases else 0.0
+        line = f"\ntime to first frame: {total * 1000:.0f} ms"
+        if self.budget is None:
+            print(line)
+            return 0
+        over = total > self.budget
+        print(f"{line} (budget {self.budget * 1000:.0f} ms{', OVER BUDGET' if over else ''})")
+        return 1 if over else 0
+
+startup = StartupProfile()
+
+########################################### Deferred Imports ####################################################
+# OpenGL.GLUT is only needed for a few solid shapes and the buffer swap: it is
+#   imported and initialized on first use, once the window exists. Without a
+#   display (SDL's offscreen driver) the plain OpenGL stand-ins in shapes.py
+#   are used instead.
+_glut = None
+
+def glut():
+    global _glut
+    if _glut is None:
+        if os.environ.get('SDL_VIDEODRIVER') == 'offscreen':
+            import shapes
+            _glut = shapes
+        else:
+            from OpenGL import GLUT
+            GLUT.glutInit()
+            _glut = GLUT
+    return _glut
@@ -0,0 +1,10 @@
+import os, sys
+
+# The game's modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests that need GL draw offscreen through EGL, as `game.py --offscreen` does;
+#   this must be chosen before pygame and OpenGL are imported
+os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYOPENGL_PLATFORM', 'egl')
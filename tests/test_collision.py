@@ -0,0 +1,152 @@
+import numpy as np
+import pytest
+
+from collision import CollisionIndex, sweep_times
+from obstacles import collisionTest_AABBs, collisionTest_swept_AABBs
+from simulation import DenseObstacles
+
+def random_boxes(rng, n):
+    mins = rng.integers(-10, 10, (n, 3)).astype(float)
+    return mins, mins + rng.integers(1, 6, (n, 3))
+
+# Whole-number boxes and deltas, a third of the delta components zero, so
+#   touching faces and axes without motion come up often
+def random_cases(seed, n=2000):
+    rng = np.random.default_rng(seed)
+    box_mins, box_maxs = random_boxes(rng, n)
+    mins, maxs = random_boxes(rng, n)
+    deltas = rng.integers(-15, 16, (n, 3)) * (rng.random((n, 3)) < 0.67)
+    return box_mins, box_maxs, deltas.astype(float), mins, maxs
+
+def scalar(box_min, box_max, delta, other_min, other_max):
+    t = collisionTest_swept_AABBs(box_min, box_max, delta, other_min, other_max)
+    return np.inf if t is None else t
+
+@pytest.mark.parametrize('seed', range(3))
+def test_vectorized_matches_scalar(seed):
+    box_mins, box_maxs, deltas, mins, maxs = random_cases(seed)
+    times = sweep_times(mins, maxs, box_mins, box_maxs, deltas)
+    expected = [scalar(*case) for case in zip(box_mins, box_maxs, deltas, mins, maxs)]
+    assert np.array_equal(times, expected)
+
+@pytest.mark.parametrize('seed', range(3))
+def test_swept_time_is_first_contact(seed):
+    for box_min, box_max, delta, other_min, other_max in zip(*random_cases(seed, 300)):
+        t = collisionTest_swept_AABBs(box_min, box_max, delta, other_min, other_max)
+        samples = [s for s in np.linspace(0, 1, 601)
+                   if collisionTest_AABBs(box_min + s * delta, box_max + s * delta, other_min, other_max)]
+        if t is None:
+            assert not samples
+        else:
+            assert collisionTest_AABBs(box_min + t * delta, box_max + t * delta, other_min, other_max)
+            assert not samples or t <= samples[0] + 1e-12
+
+def test_zero_delta_is_static_test():
+    box_mins, box_maxs, _, mins, maxs = random_cases(4)
+    times = sweep_times(mins, maxs, box_mins, box_maxs, np.zeros(3))
+    static = [collisionTest_AABBs(*case) for case in zip(box_mins, box_maxs, mins, maxs)]
+    assert np.array_equal(times == 0, static)
+    assert np.isinf(times[~np.array(static)]).all()
+
+def test_touching_edges():
+    one = np.array([1.0, 1.0, 1.0])
+    # Faces touching at the start, and a box that stops exactly at the other's face
+    assert collisionTest_swept_AABBs(-one, one, np.zeros(3), one, 3 * one) == 0.0
+    assert collisionTest_swept_AABBs(-one, one, np.array([-4.0, 0, 0]),
+                                     np.array([-7.0, -1, -1]), np.array([-5.0, 1, 1])) == 1.0
+    assert collisionTest_swept_AABBs(-one, one, np.array([-3.9, 0, 0]),
+                                     np.array([-7.0, -1, -1]), np.array([-5.0, 1, 1])) is None
+
+def test_tunnelling():
+    # A car box 5 long driving 40 units in one step past a cone 1 deep: the
+    #   start and end boxes miss it, the sweep does not
+    car_min, car_max = np.array([-2.5, -2.5, -2.5]), np.array([2.5, 2.5, 2.5])
+    cone_min, cone_max = np.array([-1.0, -1, -20.5]), np.array([1.0, 1, -19.5])
+    delta = np.array([0.0, 0, -40])
+    assert not collisionTest_AABBs(car_min, car_max, cone_min, cone_max)
+    assert not collisionTest_AABBs(car_min + delta, car_max + delta, cone_min, cone_max)
+    t = collisionTest_swept_AABBs(car_min, car_max, delta, cone_min, cone_max)
+    assert t == pytest.approx(17 / 40)
+    assert sweep_times(cone_min, cone_max, car_min, car_max, delta) == pytest.approx(17 / 40)
+
+    index = CollisionIndex((-1, -1, -0.5), (1, 1, 0.5), [(0, 0, -20)])
+    assert index.sweep(car_min, car_max, delta) == (0, pytest.approx(17 / 40))
+
+# Earliest hit of each query against every box, ties to the lowest slot
+def brute_force(box_mins, box_maxs, deltas, mins, maxs, alive):
+    times = sweep_times(mins[None], maxs[None], box_mins[:, None], box_maxs[:, None], deltas[:, None])
+    times[:, ~alive] = np.inf
+    slots = times.argmin(axis=1)
+    first = times[np.arange(len(times)), slots]
+    return np.where(np.isfinite(first), slots, -1), first
+
+@pytest.mark.parametrize('seed', range(3))
+def test_index_and_dense_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    local_min, local_max = np.array([-3.0, 0, -3]), np.array([3.0, 7, 3])
+    places = np.stack([rng.integers(-2, 3, 200) * 10, np.zeros(200), -rng.uniform(0, 1000, 200)], axis=1)
+    queries = 400
+    box_mins = np.stack([rng.integers(-2, 3, queries) * 10 - 2.5, np.full(queries, -2.5),
+                         -rng.uniform(0, 1000, queries)], axis=1)
+    box_maxs = box_mins + 5
+    deltas = np.zeros((queries, 3))
+    deltas[:, 2] = -rng.uniform(0, 60, queries) * (rng.random(queries) < 0.8)
+
+    index = CollisionIndex(local_min, local_max, places)
+    for i in range(queries):
+        mins, maxs, alive = index.mins[:index.count], index.maxs[:index.count], index.alive[:index.count]
+        expected = brute_force(box_mins[i:i + 1], box_maxs[i:i + 1], deltas[i:i + 1], mins, maxs, alive)
+        slots, times = index.sweep_hit(box_mins[i:i + 1], box_maxs[i:i + 1], deltas[i:i + 1])
+        assert slots[0] == expected[0][0] and times[0] == expected[1][0]
+
+    # One game per query, all on the same layout
+    dense = DenseObstacles(local_min, local_max, np.broadcast_to(places, (queries,) + places.shape))
+    games = np.arange(queries)
+    expected = brute_force(box_mins, box_maxs, deltas, dense.mins[0], dense.maxs[0], dense.alive[0])
+    slots, times = dense.sweep_hit(box_mins, box_maxs, deltas, games)
+    assert np.array_equal(slots, expected[0]) and np.array_equal(times, expected[1])
+    assert not dense.alive[games[slots >= 0], slots[slots >= 0]].any()
+
+def test_dense_without_obstacles():
+    dense = DenseObstacles((-1, -1, -1), (1, 1, 1), np.zeros((3, 0, 3)))
+    slots, times = dense.sweep_hit(np.zeros((3, 3)), np.ones((3, 3)), np.ones((3, 3)), np.arange(3))
+    assert (slots == -1).all() and np.isinf(times).all()
+
+# sweep_collect removes exactly what the old loop of sweep_hit calls did, for
+#   both stores; the index is also built box by box to check add_many's grid
+@pytest.mark.parametrize('seed', range(3))
+def test_sweep_collect_matches_repeated_sweep_hit(seed):
+    rng = np.random.default_rng(seed)
+    local_min, local_max = np.array([-1.0, 0, -1]), np.array([1.0, 2, 1])
+    places = np.stack([rng.integers(-2, 3, 300) * 10, np.zeros(300), -rng.uniform(0, 1000, 300)], axis=1)
+    box_min, box_max = np.array([[-2.5, -2.5, -2.5]]), np.array([[2.5, 2.5, 2.5]])
+
+    bulk = CollisionIndex(local_min, local_max, places)
+    single = CollisionIndex(local_min, local_max)
+    for place in places:
+        single.add(place)
+    assert bulk._cells == single._cells
+
+    for start in range(0, 1000, 50):
+        box = np.array([[rng.integers(-2, 3) * 10.0, 0, -start]])
+        delta = np.array([[0.0, 0, -60]])
+        expected = 0
+        while single.sweep_hit(box + box_min, box + box_max, delta)[0][0] >= 0:
+            expected += 1
+        assert bulk.sweep_collect(box + box_min, box + box_max, delta)[0] == expected
+        assert np.array_equal(bulk.alive[:bulk.count], single.alive[:single.count])
+
+    dense = DenseObstacles(local_min, local_max, np.broadcast_to(places, (4,) + places.shape))
+    looped = DenseObstacles(local_min, local_max, np.broadcast_to(places, (4,) + places.shape))
+    games = np.arange(4)
+    box_mins = np.stack([rng.integers(-2, 3, 4) * 10 - 2.5, np.full(4, -2.5), np.full(4, -502.5)], axis=1)
+    deltas = np.tile([0.0, 0, -300], (4, 1))
+    counts = dense.sweep_collect(box_mins, box_mins + 5, deltas, games)
+    expected = np.zeros(4, dtype=int)
+    while True:
+        slots, _ = looped.sweep_hit(box_mins, box_mins + 5, deltas, games)
+        if (slots < 0).all():
+            break
+        expected += slots >= 0
+    assert np.array_equal(counts, expected) and counts.sum() > 0
+    assert np.array_equal(dense.alive, looped.alive)
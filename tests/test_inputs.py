@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip('pygame')
+from collision import CollisionIndex
+from inputs import Input
+from simulation import LEFT, RIGHT, PAUSE, MAX_LANE, GameState, step
+
+def game():
+    cones = CollisionIndex((-1, -1, -1), (1, 1, 1), [])
+    coins = CollisionIndex((-1, -1, -1), (1, 1, 1), [])
+    state = GameState(cones, coins, countdown=0)
+    state.lane[:] = -MAX_LANE
+    return state
+
+# A lane change into the wall or while paused moves nothing and gets no latency
+def test_only_lane_changes_that_moved_are_measured():
+    state = game()
+    inputs = Input()
+    for stamp, action in enumerate([LEFT, RIGHT, PAUSE, RIGHT, PAUSE, RIGHT]):
+        inputs.queue(action, float(stamp))
+    step(state, inputs.take(), 0.01)
+    assert state.steered == [False, True, False, False, False, True]
+    assert state.lane[0] == -MAX_LANE + 20
+    inputs.stepped(state.steered)
+    inputs.presented()
+    assert len(inputs.latency) == 2
+
+def test_step_without_actions_clears_steered():
+    state = game()
+    step(state, [RIGHT], 0.01)
+    assert state.steered == [True]
+    step(state, [], 0.01)
+    assert state.steered == []
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+pygame = pytest.importorskip('pygame')
+from OpenGL.GL import *
+
+from instancing import InstanceBuffer
+
+@pytest.fixture(scope='module')
+def gl():
+    pygame.display.init()
+    try:
+        pygame.display.set_mode((16, 16), pygame.OPENGL)
+    except pygame.error as e:
+        pygame.display.quit()
+        pytest.skip(f"no GL context: {e}")
+    yield
+    pygame.display.quit()
+
+# The parts of CollisionIndex a sync reads
+class Index:
+    def __init__(self, count):
+        self.count = count
+        self.positions = np.arange(count * 3, dtype=np.float32).reshape(count, 3)
+        self.alive = np.ones(count, dtype=bool)
+
+def contents(buffer):
+    glBindBuffer(GL_ARRAY_BUFFER, buffer.buffer)
+    data = glGetBufferSubData(GL_ARRAY_BUFFER, 0, buffer.count * 20)
+    glBindBuffer(GL_ARRAY_BUFFER, 0)
+    return np.frombuffer(bytes(data), dtype=np.float32).reshape(-1, 5)
+
+def expected(index, shown):
+    data = np.zeros((index.count, 5), dtype=np.float32)
+    data[:, :3] = index.positions[:index.count]
+    data[:, 3] = (2 * np.arange(1, index.count + 1)) % 360
+    data[:, 4] = shown
+    return data
+
+def mask(count, slots):
+    shown = np.zeros(count, dtype=bool)
+    shown[slots] = True
+    return shown
+
+# One level of detail's visible slots changing between frames: the buffer is
+#   indexed by slot, so only the slots shown or hidden are sent, and a growing
+#   index sends its new slots
+def test_sync_shown_slots(gl):
+    buffer = InstanceBuffer()
+    steps = [(10, np.arange(0, 10)),    # first sync: grows the buffer to 16 slots
+             (10, np.arange(0, 4)),     # 6 slots hidden
+             (10, np.arange(0, 4)),     # nothing changed
+             (10, np.arange(2, 6)),     # 2 hidden, 2 shown
+             (14, np.arange(2, 12)),    # 4 new slots and 4 shown, within the capacity
+             (40, np.arange(0, 40)),    # grows past the capacity
+             (40, np.arange(0, 0))]     # every instance hidden
+    updates = [10, 6, 0, 4, 8, 40, 40]
+    for (count, slots), sent in zip(steps, updates):
+        index = Index(count)
+        shown = mask(count, slots)
+        buffer.sync(index, shown)
+        assert buffer.count == count and buffer.shown == len(slots)
+        assert buffer.updates == sent
+        np.testing.assert_array_equal(contents(buffer), expected(index, shown))
+    glDeleteBuffers(1, [buffer.buffer])
+
+# Collecting one object sends its own entry, not the ones after it
+def test_sync_after_removal(gl):
+    index = Index(20)
+    buffer = InstanceBuffer()
+    buffer.sync(index, mask(20, np.arange(20)))
+    index.alive[3] = False
+    buffer.sync(index, mask(20, np.flatnonzero(index.alive)))
+    assert buffer.updates == 1 and buffer.shown == 19
+    np.testing.assert_array_equal(contents(buffer), expected(index, index.alive))
+    glDeleteBuffers(1, [buffer.buffer])
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('pygame')
+from OBJFileLoader import OBJ
+
+# Both parsers must give the same vertex arrays (see OBJ.build_arrays)
+def parse_both(tmp_path, text, newline='\n'):
+    path = tmp_path / 'mesh.obj'
+    path.write_bytes(text.replace('\n', newline).encode())
+    meshes = [OBJ(str(path), upload=False, parser=parser) for parser in ('text', 'numpy')]
+    return [mesh.build_arrays() for mesh in meshes]
+
+def assert_same(text_arrays, numpy_arrays):
+    for a, b in zip(text_arrays[:2], numpy_arrays[:2]):
+        np.testing.assert_array_equal(a, b)
+    assert text_arrays[2] == numpy_arrays[2]
+
+SQUARE = """v 0 0 0
+v 1 0 0
+v 1 1 0
+v 0 1 0
+"""
+
+def test_full_corners(tmp_path):
+    obj = SQUARE + """vt 0 0
+vt 1 0
+vt 1 1
+vt 0 1
+vn 0 0 1
+usemtl a
+f 1/1/1 2/2/1 3/3/1
+usemtl b
+f 1/1/1 3/3/1 4/4/1
+"""
+    text, bulk = parse_both(tmp_path, obj)
+    assert_same(text, bulk)
+    assert len(bulk[2]) == 2
+
+def test_negative_indices(tmp_path):
+    obj = SQUARE + """vn 0 0 1
+f -4//-1 -3//-1 -2//-1
+v 0 0 1
+f -5//1 -3//1 -1//1
+"""
+    assert_same(*parse_both(tmp_path, obj))
+
+def test_ngon_fans(tmp_path):
+    obj = SQUARE + """v 0.5 1.5 0
+f 1 2 3 5 4
+f 1 2 3 4
+f 2 3 4
+"""
+    text, bulk = parse_both(tmp_path, obj)
+    assert_same(text, bulk)
+    assert len(bulk[1]) == 3 * (3 + 2 + 1)
+
+def test_normals_without_uvs(tmp_path):
+    obj = SQUARE + """vn 0 0 1
+vn 0 0 -1
+f 1//1 2//1 3//2 4//2
+"""
+    assert_same(*parse_both(tmp_path, obj))
+
+def test_uvs_without_normals(tmp_path):
+    obj = SQUARE + """vt 0 0
+vt 1 1
+f 1/1 2/2 3/1
+"""
+    assert_same(*parse_both(tmp_path, obj))
+
+def test_positions_only_crlf(tmp_path):
+    obj = "# comment\n" + SQUARE + "f 1 2 3\nf 1 3 4\n"
+    assert_same(*parse_both(tmp_path, obj, newline='\r\n'))
+
+def test_optional_w(tmp_path):
+    obj = "v 0 0 0 1\nv 1 0 0\nv 1 1 0 1\nf 1 2 3\n"
+    assert_same(*parse_both(tmp_path, obj))
+
+def test_malformed_face_raises(tmp_path):
+    path = tmp_path / 'bad.obj'
+    path.write_bytes((SQUARE + "f 1 2 x3\n").encode())
+    with pytest.raises(ValueError):
+        OBJ(str(path), upload=False, parser='numpy')
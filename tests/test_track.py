@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from collision import CollisionIndex
+from levelgen import LANES, LaneGrid, check, generate, model_bounds, validate
+from simulation import COIN_HEIGHT, LANE_WIDTH
+from track import TrackStreamer, track_rules
+
+def place(lane, distance, y=0.0):
+    return [lane, y, -distance]
+
+def stream(seed, length):
+    cones = CollisionIndex(*model_bounds('traffic'), [])
+    coins = CollisionIndex(*model_bounds('SimpleGoldCoin'), [])
+    track = TrackStreamer(cones, coins, np.random.default_rng(seed), length, ahead=np.inf)
+    track.update(0)
+    cone_places = np.concatenate([cones.positions[c[2]] for c in track.chunks]).reshape(-1, 3)
+    coin_places = np.concatenate([coins.positions[c[3]] for c in track.chunks]).reshape(-1, 3)
+    return cone_places, coin_places
+
+########################################### Lane Grid ####################################################
+def test_grid_cells():
+    grid = LaneGrid(600)
+    assert grid.row == 20 and grid.rows == 31
+    assert (LaneGrid.lanes(np.array([place(lane, 0) for lane in LANES])) == np.arange(len(LANES))).all()
+    blocked = grid.blocked(np.array([[place(-10, 100)]]))[0]
+    rows = np.flatnonzero(blocked.any(axis=1))
+    assert (np.flatnonzero(blocked.any(axis=0)) == [1]).all()
+    assert grid.row * rows[0] <= 100 + grid.cone_range[0]
+    assert grid.row * (rows[-1] + 1) > 100 + grid.cone_range[1]
+    assert grid.coin_rows(np.array([[place(0, 100, COIN_HEIGHT)]]))[0, 0] == (100 + grid.coin_middle) // 20
+
+########################################### Validation ####################################################
+# A wall of cones across every lane cannot be passed
+def test_wall_blocks_the_finish():
+    cones = np.array([[place(lane, 300) for lane in LANES]])
+    coins = np.array([[place(0, 100, COIN_HEIGHT)]])
+    reachable, best, end_best = check(cones, coins)
+    assert reachable.all() and best[0] == -1
+    assert (end_best < 0).all()
+    assert not validate(cones, coins, win=0)[0]
+
+# A car moves one lane per row: a coin two lanes over right after the start
+#   cannot be reached, and a cone in the centre lane forces a move
+def test_lane_changes_per_row():
+    cones = np.array([[place(0, 200)]])
+    coins = np.array([[place(2 * LANE_WIDTH, 5, COIN_HEIGHT), place(LANE_WIDTH, 400, COIN_HEIGHT)]])
+    reachable, best, end_best = check(cones, coins)
+    assert reachable[0].tolist() == [False, True]
+    assert best[0] == 1
+    assert (end_best[0] >= 0).all()
+    assert validate(cones, coins, win=0)[0] == False    # not every coin is reachable
+
+# Checking two sections with the state carried over gives the same answer as
+#   checking them as one track
+def test_sections_check_like_one_track():
+    rng = np.random.default_rng(3)
+    first = generate(rng, 120, 4, win=2)
+    _, _, end_best = check(first[0][None], first[1][None], 120)
+    second = generate(rng, 240, 4, start=120, win=0, start_best=end_best[0])
+    reachable, best, end = check(second[0][None], second[1][None], 240, 120, start_best=end_best[0])
+    whole = [np.concatenate([a, b])[None] for a, b in zip(first, second)]
+    whole_reachable, whole_best, whole_end = check(*whole, 240)
+    assert whole_reachable[0, 4:].tolist() == reachable[0].tolist()
+    assert whole_best[0] == best[0]
+    assert (whole_end == end).all()
+
+########################################### Streaming ####################################################
+# However the chunks fall, one run can collect the coins needed to win
+@pytest.mark.parametrize('length', [600, 1200, 3000])
+def test_streamed_race_is_winnable(length):
+    win = track_rules(length)[1]
+    for seed in range(20):
+        cones, coins = stream(seed, length)
+        assert validate(cones[None], coins[None], length, win=win)[0], seed
@@ -0,0 +1,36 @@
+import math
+import numpy as np
+
+import transforms
+from transforms import rotate_point, rotation3
+
+def reference(angle, axis):
+    c, s = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+    x, y, z = np.asarray(axis, dtype=float) / np.linalg.norm(axis)
+    t = 1 - c
+    return np.array([[t*x*x + c,   t*x*y - s*z, t*x*z + s*y],
+                     [t*x*y + s*z, t*y*y + c,   t*y*z - s*x],
+                     [t*x*z - s*y, t*y*z + s*x, t*z*z + c  ]])
+
+# Fractional angles are exact, not rounded to the cached whole degrees
+def test_angles_are_not_quantized():
+    for angle in (0.0, 30.0, 30.4, -725.25, 359.999, 1e-3):
+        for axis in ("X", "Y", (1.0, 2.0, 3.0)):
+            direction = transforms.AXES[axis] if isinstance(axis, str) else axis
+            np.testing.assert_allclose(rotation3(angle, axis), reference(angle, direction), atol=1e-12)
+        np.testing.assert_allclose(rotate_point((1.0, 2.0, 3.0), angle, "Z"),
+                                   reference(angle, (0, 0, 1)) @ (1.0, 2.0, 3.0), atol=1e-12)
+
+# Only whole degrees are cached, so a sweep through fractional angles leaves
+#   the caches alone
+def test_only_whole_degrees_are_cached():
+    transforms._cos_sin_whole.cache_clear()
+    transforms._rotation3.cache_clear()
+    for step in range(1000):
+        rotate_point((1.0, 0.0, 0.0), step * 0.37, "Y")
+        rotation3(step * 0.37, "Y")
+    # 0.37 * step is only whole for steps that are multiples of 100
+    assert transforms._cos_sin_whole.cache_info().currsize <= 10
+    assert transforms._rotation3.cache_info().currsize <= 10
+    rotation3(90, "Y")
+    assert rotation3(450.0, "Y") is rotation3(90, "Y")
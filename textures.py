@@ -0,0 +1,128 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from OpenGL.GL import *
+
+########################################### Texture Manager ####################################################
+# Decode an image file into bottom-up RGBA bytes, as glTexImage2D expects
+#   Safe to call from worker threads: no GL calls are made here
+def decode_image(image_path):
+    surf = pygame.image.load(image_path)
+    width, height = surf.get_rect().size
+    return width, height, pygame.image.tobytes(surf, 'RGBA', 1)
+
+# Process-wide texture cache keyed by absolute file path
+#   Images are decoded on a thread pool while the calling (GL) thread uploads
+#   them, each texture is uploaded once with a full mipmap chain, and loads are
+#   reference counted so shared textures are only deleted by their last user.
+class TextureManager:
+    def __init__(self, workers=4, mipmaps=True):
+        self.mipmaps = mipmaps
+        self.hits = 0
+        self.misses = 0
+        self.bytes_resident = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='texture-decode')
+        self._pending = {}  # path -> Future of decode_image()
+        self._textures = {} # path -> texture id
+        self._info = {}     # texture id -> [path, reference count, bytes]
+        self._failed = {}   # path -> decoding error, so missing files are not retried
+
+    # Start decoding images in the background; already loaded or pending paths are skipped
+    def prefetch(self, paths):
+        for path in paths:
+            path = os.path.abspath(path)
+            if path not in self._textures and path not in self._pending and path not in self._failed:
+                self._pending[path] = self._pool.submit(decode_image, path)
+
+    # True when load() would not have to wait for a decode
+    def ready(self, path):
+        future = self._pending.get(os.path.abspath(path))
+        return future is None or future.done()
+
+    # Texture id for an image file, decoding and uploading it on first use
+    #   Raises the decoding error (FileNotFoundError, pygame.error) on failure
+    def load(self, path):
+        path = os.path.abspath(path)
+        texid = self._textures.get(path)
+        if texid is not None:
+            self.hits += 1
+        else:
+            if path in self._failed:
+                raise self._failed[path]
+            self.misses += 1
+            future = self._pending.pop(path, None)
+            try:
+                image = future.result() if future else decode_image(path)
+            except (pygame.error, OSError) as e:
+                self._failed[path] = e
+                raise
+            texid = self.upload(*image)
+            self._textures[path] = texid
+            self._info[texid][0] = path
+        self._info[texid][1] += 1
+        return texid
+
+    # Decode all images in parallel and upload them in order
+    def load_many(self, paths):
+        self.prefetch(paths)
+        return [self.load(path) for path in paths]
+
+    # Upload decoded RGBA pixels into a new mipmapped texture (trilinear filtering)
+    def upload(self, width, height, pixels):
+        texid = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_2D, texid)
+        glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+        if self.mipmaps:
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR)
+            if not bool(glGenerateMipmap):
+                # GL < 3.0: let the driver build the chain during the upload
+                glTexParameteri(GL_TEXTURE_2D, GL_GENERATE_MIPMAP, GL_TRUE)
+        else:
+            glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+        glTexImage2D(GL_TEXTURE_2D, 0, GL_RGBA, width, height, 0, GL_RGBA,
+                     GL_UNSIGNED_BYTE, pixels)
+        if self.mipmaps and bool(glGenerateMipmap):
+            glGenerateMipmap(GL_TEXTURE_2D)
+
+        size = width * height * 4
+        if self.mipmaps:
+            size = size * 4 // 3 # a full mipmap chain adds a third
+        self.bytes_resident += size
+        self._info[texid] = [None, 0, size]
+        return texid
+
+    # Drop one reference to a texture, deleting it when nobody uses it anymore
+    def release(self, texid):
+        info = self._info.get(texid)
+        if info is None:
+            return
+        info[1] -= 1
+        if info[1] <= 0:
+            path, _, size = self._info.pop(texid)
+            self._textures.pop(path, None)
+            self.bytes_resident -= size
+            glDeleteTextures([texid])
+
+    # Delete every texture, e.g. before the GL context goes away
+    def clear(self):
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        if self._info:
+            glDeleteTextures(list(self._info))
+        self._info.clear()
+        self._textures.clear()
+        self._failed.clear()
+        self.bytes_resident = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'textures': len(self._textures),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'bytes_resident': self.bytes_resident,
+        }
+
+texture_manager = TextureManager()
@@ -0,0 +1,98 @@
+from collections import deque
+import numpy as np
+
+from simulation import FINISH, TIME_LIMIT, WIN_COINS
+from levelgen import LANES, check, generate
+
+# Object density of the original track: 10 cones and 10 coins over FINISH units
+OBJECTS_PER_UNIT = 10 / FINISH
+ENDLESS_WIN = 10 * WIN_COINS # coins to collect before time runs out in endless mode
+
+# Time limit and coins needed to win for a track of the given length
+#   (None for endless), scaled from the original 600 unit track
+def track_rules(length=FINISH):
+    if length is None:
+        return TIME_LIMIT, ENDLESS_WIN
+    scale = length / FINISH
+    return TIME_LIMIT * scale, max(1, round(WIN_COINS * scale))
+
+########################################### Track Streaming ####################################################
+# Generates the track in fixed-length chunks just ahead of the car and drops
+#   chunks once they are behind the camera, so the number of live obstacles
+#   (and the work to draw and test them) does not depend on the track length.
+#   Objects live in the cones/coins CollisionIndex; removed slots go on its
+#   free list and are reused by the next chunks, which makes the index the pool.
+#   Each chunk is a levelgen layout checked from where the previous ones left
+#   the car: the most coins one run can have collected on its way into each
+#   lane. After every chunk a single run must be able to have its share of the
+#   coins needed to win, and all of them at the finish, so a race is always
+#   winnable as a whole. A pre-made level (cone places, coin places) can be
+#   streamed instead.
+class TrackStreamer:
+    def __init__(self, cones, coins, rng, length=FINISH, chunk=120, ahead=1000, behind=60,
+                 level=None):
+        self.cones = cones
+        self.coins = coins
+        self.rng = rng
+        self.length = np.inf if length is None else length
+        self.chunk = chunk
+        self.ahead = ahead      # distance in front of the car kept generated
+        self.behind = behind    # distance behind the car before a chunk is dropped
+        self.level = level
+        self.generated = 0      # the track exists up to here
+        self.chunks = deque()   # (start, end, cone slots, coin slots), oldest first
+        self.win = None if length is None else track_rules(length)[1]
+        self._carry = 0.0       # fractional objects owed by earlier chunks
+        self._coins = 0         # coins generated so far
+        # Most coins a run can have on entering each lane of the next chunk
+        #   (levelgen.check's start_best), -1 where it cannot be
+        self._best = np.where(LANES == 0, 0, -1)
+
+    # Generate and drop chunks for the car's distance down the track
+    def update(self, movement):
+        horizon = min(movement + self.ahead, self.length)
+        while self.generated < horizon:
+            self._add_chunk(self.generated, min(self.generated + self.chunk, self.length))
+        while self.chunks and self.chunks[0][1] < movement - self.behind:
+            self._drop_chunk(*self.chunks.popleft())
+
+    # Objects of the pre-made level between start and end
+    def _level_chunk(self, start, end):
+        return [places[(-places[:, 2] > start) & (-places[:, 2] <= end)] for places in self.level]
+
+    def _add_chunk(self, start, end):
+        if self.level is not None:
+            cone_places, coin_places = self._level_chunk(start, end)
+        else:
+            # Carry the remainder so short chunks keep the average density
+            self._carry += (end - start) * OBJECTS_PER_UNIT
+            count = int(self._carry)
+            self._carry -= count
+            self._coins += count
+            # Coins one run must be able to have by the end of the chunk: the
+            #   race's share so far (the density's share in endless mode)
+            if self.win is None:
+                need = self._coins * WIN_COINS // 10
+            elif end >= self.length:
+                need = self.win
+            else:
+                need = int(self.win * end // self.length)
+            cone_places, coin_places = generate(self.rng, int(end), count, start=int(start),
+                                                win=need, start_best=self._best)
+            self._best = check(cone_places[None], coin_places[None], int(end), int(start),
+                               start_best=self._best)[2][0]
+        cone_slots = [self.cones.add(place) for place in cone_places]
+        coin_slots = [self.coins.add(place) for place in coin_places]
+        self.chunks.append((start, end, cone_slots, coin_slots))
+        self.generated = end
+
+    def _drop_chunk(self, start, end, cone_slots, coin_slots):
+        for index, slots in ((self.cones, cone_slots), (self.coins, coin_slots)):
+            for slot in slots:
+                # A hit object's slot may already hold an object of a later chunk
+                if index.alive[slot] and start < -index.positions[slot][2] <= end:
+                    index.remove(slot)
+
+    # Number of live objects, bounded by the generated window
+    def __len__(self):
+        return len(self.cones) + len(self.coins)
@@ -0,0 +1,102 @@
+import math
+from functools import lru_cache
+import numpy as np
+
+########################################### Transform Math ####################################################
+# 4x4 homogeneous matrices acting on column vectors, composed like the GL
+#   matrix stack: compose(A, B) applies B first, then A.
+AXES = {"X": (1.0, 0.0, 0.0), "Y": (0.0, 1.0, 0.0), "Z": (0.0, 0.0, 1.0)}
+
+def identity():
+    return np.identity(4)
+
+def translation(offset):
+    m = np.identity(4)
+    m[:3, 3] = offset
+    return m
+
+def scaling(factors):
+    m = np.identity(4)
+    m[[0, 1, 2], [0, 1, 2]] = factors
+    return m
+
+# cos/sin of a whole number of degrees come up every frame (spinning coins,
+#   crash spins), so those are cached, keyed on the degrees reduced to
+#   [0, 360). Other angles (the finish screen's camera sweep) are computed
+#   each time rather than filling the cache with values seen once.
+def _cos_sin(angle_degrees):
+    angle_degrees = float(angle_degrees) % 360.0
+    if angle_degrees.is_integer():
+        return _cos_sin_whole(int(angle_degrees))
+    radians = math.radians(angle_degrees)
+    return math.cos(radians), math.sin(radians)
+
+@lru_cache(maxsize=360)
+def _cos_sin_whole(degrees):
+    radians = math.radians(degrees)
+    return math.cos(radians), math.sin(radians)
+
+# 3x3 rotation by angle_degrees around an axis, as glRotatef builds it
+#   axis: "X", "Y", "Z" or an (x, y, z) direction. The returned matrix is
+#   shared between callers and must not be modified. Cached like _cos_sin:
+#   rotation3 only looks up whole degrees.
+@lru_cache(maxsize=1024)
+def _rotation3(angle_degrees, axis):
+    x, y, z = axis
+    length = math.sqrt(x*x + y*y + z*z)
+    if length == 0:
+        r = np.identity(3)
+    else:
+        x, y, z = x / length, y / length, z / length
+        c, s = _cos_sin(angle_degrees)
+        t = 1 - c
+        r = np.array([[t*x*x + c,   t*x*y - s*z, t*x*z + s*y],
+                      [t*x*y + s*z, t*y*y + c,   t*y*z - s*x],
+                      [t*x*z - s*y, t*y*z + s*x, t*z*z + c  ]])
+    r.flags.writeable = False
+    return r
+
+def rotation3(angle_degrees, axis):
+    angle_degrees = float(angle_degrees) % 360.0
+    axis = tuple(map(float, AXES[axis] if isinstance(axis, str) else axis))
+    if angle_degrees.is_integer():
+        return _rotation3(int(angle_degrees), axis)
+    return _rotation3.__wrapped__(angle_degrees, axis)
+
+def rotation(angle_degrees, axis):
+    m = np.identity(4)
+    m[:3, :3] = rotation3(angle_degrees, axis)
+    return m
+
+def compose(*matrices):
+    result = np.identity(4)
+    for m in matrices:
+        result = result @ m
+    return result
+
+# Apply a 4x4 matrix to a whole (N, 3) array of points in one operation
+def apply(matrix, points):
+    points = np.asarray(points, dtype=float)
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+# Directions (normals) under a matrix: inverse-transpose of its linear part,
+#   renormalized so non-uniform scales keep them perpendicular to the surface
+def apply_normals(matrix, normals):
+    normals = np.asarray(normals, dtype=float)
+    result = normals @ np.linalg.inv(matrix[:3, :3])
+    lengths = np.linalg.norm(result, axis=1, keepdims=True)
+    return np.divide(result, lengths, out=result, where=lengths > 0)
+
+########################################### Scalar Fast Path ####################################################
+# Rotating a single 3-vector in plain floats: building and multiplying small
+#   NumPy arrays costs several times more than the arithmetic itself
+def rotate_point(vector, angle_degrees, rot_axis):
+    x, y, z = float(vector[0]), float(vector[1]), float(vector[2])
+    c, s = _cos_sin(angle_degrees)
+    if rot_axis == "Y":
+        return np.array((c*x + s*z, y, -s*x + c*z))
+    if rot_axis == "X":
+        return np.array((x, c*y - s*z, s*y + c*z))
+    if rot_axis == "Z":
+        return np.array((c*x - s*y, s*x + c*y, z))
+    return rotation3(angle_degrees, rot_axis) @ (x, y, z)